@@ -0,0 +1,30 @@
+"""game sessions list indexes
+
+Revision ID: 3f9c2a7d1b64
+Revises: 0614a347ab6c
+Create Date: 2026-10-19 13:02:11.412305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b64'
+down_revision = '0614a347ab6c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_game_sessions_chat_id_id', 'game_sessions', ['chat_id', 'id'], unique=False)
+    op.create_index('ix_game_sessions_creator_id', 'game_sessions', ['creator', 'id'], unique=False)
+    op.create_index('ix_session_states_state_name_session_id', 'session_states', ['state_name', 'session_id'], unique=False)
+    op.create_index(op.f('ix_association_players_sessions_session_id'), 'association_players_sessions', ['session_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_association_players_sessions_session_id'), table_name='association_players_sessions')
+    op.drop_index('ix_session_states_state_name_session_id', table_name='session_states')
+    op.drop_index('ix_game_sessions_creator_id', table_name='game_sessions')
+    op.drop_index('ix_game_sessions_chat_id_id', table_name='game_sessions')
@@ -0,0 +1,35 @@
+"""outbox
+
+Revision ID: 5a1f3c9e7b20
+Revises: e4b8d2c61f07
+Create Date: 2026-10-19 16:40:27.102935
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1f3c9e7b20'
+down_revision = 'e4b8d2c61f07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('keyboard', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_chat_id'), 'outbox', ['chat_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_outbox_chat_id'), table_name='outbox')
+    op.drop_table('outbox')
@@ -0,0 +1,31 @@
+"""title search indexes
+
+Revision ID: 7c2e9f4b1d58
+Revises: d3a7c1e95b42
+Create Date: 2026-10-19 20:31:16.902154
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e9f4b1d58'
+down_revision = 'd3a7c1e95b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in ('questions', 'themes'):
+        op.create_index(f'ix_{table}_title_trgm', table, ['title'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+        op.create_index(f'ix_{table}_title_tsv', table, [sa.text("to_tsvector('simple'::regconfig, title)")],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    for table in ('questions', 'themes'):
+        op.drop_index(f'ix_{table}_title_tsv', table_name=table)
+        op.drop_index(f'ix_{table}_title_trgm', table_name=table)
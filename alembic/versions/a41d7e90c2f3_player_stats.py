@@ -0,0 +1,34 @@
+"""player stats
+
+Revision ID: a41d7e90c2f3
+Revises: 3f9c2a7d1b64
+Create Date: 2026-10-19 13:40:52.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d7e90c2f3'
+down_revision = '3f9c2a7d1b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('player_stats',
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('player_id', sa.BigInteger(), nullable=False),
+    sa.Column('games', sa.Integer(), nullable=False),
+    sa.Column('wins', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('chat_id', 'player_id')
+    )
+    op.create_index('ix_player_stats_chat_id_points', 'player_stats', ['chat_id', sa.text('points DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_player_stats_chat_id_points', table_name='player_stats')
+    op.drop_table('player_stats')
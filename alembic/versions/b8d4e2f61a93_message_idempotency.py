@@ -0,0 +1,26 @@
+"""message idempotency
+
+Revision ID: b8d4e2f61a93
+Revises: 5a1f3c9e7b20
+Create Date: 2026-10-19 17:55:03.614208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4e2f61a93'
+down_revision = '5a1f3c9e7b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('session_states', sa.Column('sequence', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('outbox', sa.Column('random_id', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('outbox', 'random_id')
+    op.drop_column('session_states', 'sequence')
@@ -0,0 +1,39 @@
+"""archived game sessions
+
+Revision ID: c7e5b3a9d820
+Revises: a41d7e90c2f3
+Create Date: 2026-10-19 14:12:37.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e5b3a9d820'
+down_revision = 'a41d7e90c2f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('session_states', sa.Column('ended_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_table('archived_game_sessions',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('creator', sa.BigInteger(), nullable=False),
+    sa.Column('ended_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('players', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('questions', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archived_game_sessions_chat_id_id', 'archived_game_sessions', ['chat_id', 'id'], unique=False)
+    op.create_index('ix_archived_game_sessions_players', 'archived_game_sessions', ['players'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_archived_game_sessions_players', table_name='archived_game_sessions', postgresql_using='gin')
+    op.drop_index('ix_archived_game_sessions_chat_id_id', table_name='archived_game_sessions')
+    op.drop_table('archived_game_sessions')
+    op.drop_column('session_states', 'ended_at')
@@ -0,0 +1,35 @@
+"""question media
+
+Revision ID: d3a7c1e95b42
+Revises: b8d4e2f61a93
+Create Date: 2026-10-19 19:12:48.305571
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7c1e95b42'
+down_revision = 'b8d4e2f61a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('questions', sa.Column('media_type', sa.String(), nullable=True))
+    op.add_column('questions', sa.Column('media_url', sa.String(), nullable=True))
+    op.create_table('media_attachments',
+    sa.Column('question_id', sa.BigInteger(), nullable=False),
+    sa.Column('tenant', sa.Integer(), nullable=False),
+    sa.Column('attachment', sa.String(), nullable=False),
+    sa.Column('uploaded_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('question_id', 'tenant')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('media_attachments')
+    op.drop_column('questions', 'media_url')
+    op.drop_column('questions', 'media_type')
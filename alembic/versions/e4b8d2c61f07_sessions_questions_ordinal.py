@@ -0,0 +1,24 @@
+"""sessions questions ordinal
+
+Revision ID: e4b8d2c61f07
+Revises: c7e5b3a9d820
+Create Date: 2026-10-19 15:02:11.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8d2c61f07'
+down_revision = 'c7e5b3a9d820'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('association_sessions_questions', sa.Column('ordinal', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('association_sessions_questions', 'ordinal')
@@ -0,0 +1,28 @@
+"""cache versions
+
+Revision ID: f1b6a8d3c274
+Revises: 7c2e9f4b1d58
+Create Date: 2026-10-19 21:47:05.518340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b6a8d3c274'
+down_revision = '7c2e9f4b1d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('cache_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cache_versions')
@@ -5,6 +5,7 @@ from hashlib import sha256
 
 from app.admin.schemes import AdminSchema, AdminLoginSchema
 from app.web.app import View
+from app.web.auth import TOKEN_COOKIE_NAME, sign_token
 from app.web.utils import json_response
 from app.web.mixins import AuthRequiredMixin
 
@@ -24,6 +25,13 @@ class AdminLoginView(View):
             raise HTTPForbidden(reason='wrong password')
 
         raw_admin = AdminSchema().dump(existed_admin)
+        config = self.request.app.config.session
+        if config.mode == "token":
+            token = sign_token(existed_admin, config.key, config.token_ttl)
+            response = json_response(data={**raw_admin, "token": token})
+            response.set_cookie(TOKEN_COOKIE_NAME, token, max_age=config.token_ttl, httponly=True)
+            return response
+
         session = await new_session(request=self.request)
         session['admin'] = raw_admin
         return json_response(data=raw_admin)
@@ -9,8 +9,11 @@ class BaseAccessor:
     def __init__(self, app: "Application", *args, **kwargs):
         self.app = app
         self.logger = getLogger("accessor")
-        app.on_startup.append(self.connect)
-        app.on_cleanup.append(self.disconnect)
+        # only overridden hooks are registered, accessors without them may be built after the app is frozen
+        if type(self).connect is not BaseAccessor.connect:
+            app.startup_pipeline.add(self.connect)
+        if type(self).disconnect is not BaseAccessor.disconnect:
+            app.on_cleanup.append(self.disconnect)
 
     async def connect(self, app: "Application"):
         return
@@ -0,0 +1,147 @@
+import random
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.game_session.models import LiveSession
+
+# state of a chat without a running game
+IDLE = "idle"
+
+STATES = (IDLE, "preparing", "just_started", "question_asked", "answered_wrong", "answered_right", "ended")
+EVENTS = ("start", "join", "run", "ask", "answer_right", "answer_wrong", "finish")
+FINAL_STATES = ("ended",)
+PLAYING_STATES = ("just_started", "question_asked", "answered_wrong", "answered_right")
+
+
+@dataclass(frozen=True)
+class Guard:
+    """
+    :param check: (live, context) -> whether the transition may happen
+    :param rejected: reason reported when it may not, a BotManager message type
+    """
+    check: Callable[[Optional[LiveSession], dict], bool]
+    rejected: str
+
+
+@dataclass(frozen=True)
+class Transition:
+    source: str
+    event: str
+    target: str
+    guards: tuple[Guard, ...] = ()
+
+
+@dataclass(frozen=True)
+class FiredEvent:
+    """
+    Result of GameMachine.fire: transition taken, or rejected reason if the event is not accepted
+    """
+    transition: Optional[Transition] = None
+    rejected: Optional[str] = None
+
+    @property
+    def changed(self) -> bool:
+        return self.transition is not None and self.transition.source != self.transition.target
+
+
+class GameMachine:
+    """
+    Declared game flow. Transitions are compiled into a (state, event) dict, so dispatch is one lookup
+    plus guard checks. The machine keeps no per-game data: state of a game is LiveSession.state,
+    so any number of games share one machine.
+    """
+
+    def __init__(self, transitions: list[Transition], unhandled: str = "unhandled"):
+        """
+        :param unhandled: reason reported for events not accepted in the current state
+        """
+        self.unhandled = unhandled
+        self._table: dict[tuple[str, str], Transition] = {}
+        for transition in transitions:
+            if transition.source not in STATES or transition.target not in STATES:
+                raise ValueError(f"unknown state in {transition}")
+            if transition.event not in EVENTS:
+                raise ValueError(f"unknown event in {transition}")
+            key = (transition.source, transition.event)
+            if key in self._table:
+                raise ValueError(f"duplicate transition for {key}")
+            self._table[key] = transition
+
+    @staticmethod
+    def state_of(live: Optional[LiveSession]) -> str:
+        return live.state if live else IDLE
+
+    def accepts(self, state: str, event: str) -> bool:
+        """
+        Whether the event has a transition from the state, regardless of guards
+        """
+        return (state, event) in self._table
+
+    def fire(self, live: Optional[LiveSession], event: str, **context) -> FiredEvent:
+        """
+        Finds the transition for the event and checks its guards. Does not change live,
+        applying and persisting the transition is up to the caller.
+        """
+        transition = self._table.get((self.state_of(live), event))
+        if transition is None:
+            return FiredEvent(rejected=self.unhandled)
+        for guard in transition.guards:
+            if not guard.check(live, context):
+                return FiredEvent(rejected=guard.rejected)
+        return FiredEvent(transition=transition)
+
+
+def _is_creator(live: LiveSession, context: dict) -> bool:
+    return live.creator == context.get("player_id")
+
+
+def _enough_players(live: LiveSession, context: dict) -> bool:
+    return len(live.players) > 1
+
+
+def _is_new_player(live: LiveSession, context: dict) -> bool:
+    return context.get("player_id") not in live.players
+
+
+GAME_MACHINE = GameMachine([
+    Transition(IDLE, "start", "preparing"),
+    Transition("preparing", "join", "preparing", guards=(Guard(_is_new_player, "player_already_added"),)),
+    Transition("preparing", "run", "just_started", guards=(Guard(_is_creator, "not_creator_to_run"),
+                                                            Guard(_enough_players, "not_enough_players"))),
+    Transition("preparing", "finish", "ended"),
+    Transition("just_started", "ask", "question_asked"),
+    Transition("answered_wrong", "ask", "question_asked"),
+    Transition("answered_right", "ask", "question_asked"),
+    Transition("question_asked", "answer_right", "answered_right"),
+    Transition("question_asked", "answer_wrong", "answered_wrong"),
+    Transition("answered_wrong", "answer_right", "answered_right"),
+    Transition("answered_wrong", "answer_wrong", "answered_wrong"),
+    *(Transition(state, "finish", "ended") for state in PLAYING_STATES),
+])
+
+
+def fire_random_events(seed: int, games: int, events: int) -> list[list[tuple[str, str, str]]]:
+    """
+    Fires a random stream of events from random players at many games sharing the machine,
+    for the FSM property test and benchmarks.bench_fsm
+
+    :return: per game history of (state before, event, state after)
+    """
+    rng = random.Random(seed)
+    lives: list[LiveSession] = [None] * games
+    history = [[] for _ in range(games)]
+    for _ in range(events):
+        game = rng.randrange(games)
+        live, event = lives[game], rng.choice(EVENTS)
+        player_id = rng.randrange(1, 5)
+        before = GAME_MACHINE.state_of(live)
+        fired = GAME_MACHINE.fire(live, event, player_id=player_id)
+        if fired.transition:
+            if live is None:
+                live = lives[game] = LiveSession(session_id=game, chat_id=game, creator=player_id,
+                                                 players={player_id: 0})
+            live.state = fired.transition.target
+            if event == "join":
+                live.players[player_id] = 0
+        history[game].append((before, event, GAME_MACHINE.state_of(live)))
+    return history
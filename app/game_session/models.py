@@ -1,11 +1,17 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.quiz.models import Answer, QuestionMedia
 from app.store.database.sqlalchemy_base import db
 from sqlalchemy.orm import relationship, backref
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import (
     Column,
     BigInteger,
     Boolean,
+    DateTime,
     ForeignKey,
+    Index,
     Integer,
     Text,
     Table
@@ -29,6 +35,63 @@ class GameSession:
     creator: Player
 
 
+@dataclass
+class GameSessionSummary:
+    id: int
+    chat_id: int
+    creator: int
+    state: str
+    players_count: int
+
+
+@dataclass
+class LiveSession:
+    """
+    Volatile part of a running session, kept in the game state store, see app.store.game_state
+    """
+    session_id: int
+    chat_id: int
+    creator: int
+    state: str = "preparing"
+    current_question: Optional[int] = None
+    current_answerer: Optional[int] = None
+    # player id -> points
+    players: dict[int, int] = field(default_factory=dict)
+    # state changes so far, part of the random_id of messages announcing them
+    sequence: int = 0
+
+
+@dataclass
+class PlannedQuestion:
+    question_id: int
+    title: str
+    points: int
+    answers: list[Answer]
+    # normalized titles of correct answers, see app.web.utils.normalize_answer
+    match_keys: frozenset[str]
+    media: Optional[QuestionMedia] = None
+
+
+@dataclass
+class QuestionPlan:
+    """
+    Questions of a session in asking order, computed once when the game starts.
+    Moving to the next round is a pointer advance.
+    """
+    session_id: int
+    questions: list[PlannedQuestion]
+    position: int = -1
+
+    @property
+    def current(self) -> Optional[PlannedQuestion]:
+        if 0 <= self.position < len(self.questions):
+            return self.questions[self.position]
+
+    def advance(self) -> Optional[PlannedQuestion]:
+        self.position += 1
+        return self.current
+
+
 class ChatModel(db):
     __tablename__ = "chats"
     id = Column(BigInteger, primary_key=True)
@@ -41,6 +104,10 @@ class SessionStateModel(db):
     current_question = Column(BigInteger, ForeignKey("questions.id", ondelete="CASCADE"), nullable=True)
     current_answerer = Column(BigInteger, ForeignKey("players.id", ondelete="CASCADE"), nullable=True)
     ended = Column(Text, nullable=True)
+    ended_at = Column(DateTime(timezone=True), nullable=True)
+    sequence = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (Index("ix_session_states_state_name_session_id", "state_name", "session_id"),)
 
     session = relationship("GameSessionModel", back_populates="state", uselist=False)
     session_questions = relationship(
@@ -56,6 +123,7 @@ class SessionStateModel(db):
               "answered_wrong": 4,
               "answered_right": 5,
               "ended": 9}
+    state_names = {value: name for name, value in states.items()}
 
 
 class SessionsQuestions(db):
@@ -63,6 +131,7 @@ class SessionsQuestions(db):
     session_state_id = Column(BigInteger, ForeignKey("session_states.session_id", ondelete="CASCADE"), primary_key=True)
     question_id = Column(BigInteger, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
     is_answered = Column(Boolean, nullable=False)
+    ordinal = Column(Integer, nullable=True)
 
     game_session_state = relationship(SessionStateModel, back_populates="session_questions")
 
@@ -70,7 +139,7 @@ class SessionsQuestions(db):
 class PlayersSessions(db):
     __tablename__ = 'association_players_sessions'
     player_id = Column(BigInteger, ForeignKey("players.id", ondelete="CASCADE"), primary_key=True)
-    session_id = Column(BigInteger, ForeignKey("game_sessions.id", ondelete="CASCADE"), primary_key=True)
+    session_id = Column(BigInteger, ForeignKey("game_sessions.id", ondelete="CASCADE"), primary_key=True, index=True)
     points = Column(Integer, nullable=False, default=0)
 
     players = relationship("PlayerModel", back_populates="association_players_sessions")
@@ -89,6 +158,29 @@ class GameSessionModel(db):
     chat_id = Column(BigInteger, ForeignKey('chats.id', ondelete="CASCADE"), nullable=False)
     creator = Column(BigInteger, ForeignKey('players.id', ondelete="CASCADE"), nullable=False)
 
+    __table_args__ = (
+        Index("ix_game_sessions_chat_id_id", "chat_id", "id"),
+        Index("ix_game_sessions_creator_id", "creator", "id"),
+    )
+
     state = relationship(SessionStateModel, back_populates="session", uselist=False)
     association_players_sessions = relationship("PlayersSessions", back_populates="sessions")
 
+
+class ArchivedGameSessionModel(db):
+    """
+    Compact copy of an ended session, written by ArchiveAccessor before the session is deleted
+    from the hot tables. players maps player id to points, questions is a list of asked question ids.
+    """
+    __tablename__ = "archived_game_sessions"
+    id = Column(BigInteger, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    creator = Column(BigInteger, nullable=False)
+    ended_at = Column(DateTime(timezone=True), nullable=True)
+    players = Column(JSONB, nullable=False)
+    questions = Column(JSONB, nullable=False)
+
+    __table_args__ = (
+        Index("ix_archived_game_sessions_chat_id_id", "chat_id", "id"),
+        Index("ix_archived_game_sessions_players", "players", postgresql_using="gin"),
+    )
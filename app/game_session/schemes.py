@@ -1,10 +1,24 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+
+from app.game_session.models import SessionStateModel
 
 
 class GameSessionSchema(Schema):
     id = fields.Int(required=False)
     chat_id = fields.Int(required=True)
+    creator = fields.Int()
+    state = fields.Str()
+    players_count = fields.Int()
+
+
+class GameSessionListQuerySchema(Schema):
+    limit = fields.Int(required=False, validate=validate.Range(min=1, max=1000))
+    after_id = fields.Int(required=False)
+    chat_id = fields.Int(required=False)
+    creator_id = fields.Int(required=False)
+    state = fields.Str(required=False, validate=validate.OneOf(list(SessionStateModel.states)))
 
 
 class GameSessionListSchema(Schema):
-    themes = fields.Nested(GameSessionSchema, many=True)
+    game_sessions = fields.Nested(GameSessionSchema, many=True)
+    next_after_id = fields.Int(allow_none=True)
@@ -1,13 +1,42 @@
-from aiohttp_apispec import request_schema, json_schema, response_schema, docs
+from aiohttp.web import StreamResponse
+from aiohttp_apispec import docs, querystring_schema, response_schema
 
-from app.game_session.schemes import GameSessionListSchema
+from app.game_session.schemes import GameSessionListQuerySchema, GameSessionListSchema, GameSessionSchema
+from app.web import codec
 from app.web.app import View
-from app.web.utils import json_response
 from app.web.mixins import AuthRequiredMixin
 
+# rows are written to the response in chunks of this size
+CHUNK_SIZE = 100
+
 
 class GameSessionListView(AuthRequiredMixin, View):
+    @docs(tags=["game_session"], summary="List game sessions",
+          description="Newest first, pass next_after_id from the response as after_id to get the next page")
+    @querystring_schema(GameSessionListQuerySchema)
     @response_schema(GameSessionListSchema)
     async def get(self):
-        game_sessions = await self.store.game_sessions.list_game_sessions()
-        return json_response(data=GameSessionListSchema().dump({'game_sessions': game_sessions}))
+        limit = self.data.get("limit", 100)
+        # the page is read before the response starts, so a failed query still gets an error response
+        game_sessions = [game_session async for game_session in self.store.game_sessions.iter_game_sessions(
+            limit=limit,
+            after_id=self.data.get("after_id"),
+            chat_id=self.data.get("chat_id"),
+            state=self.data.get("state"),
+            creator_id=self.data.get("creator_id"),
+        )]
+
+        response = StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(self.request)
+        await response.write(b'{"status": "ok", "data": {"game_sessions": [')
+        schema = GameSessionSchema()
+        for start in range(0, len(game_sessions), CHUNK_SIZE):
+            chunk = game_sessions[start:start + CHUNK_SIZE]
+            await response.write((b"," if start else b"")
+                                 + b",".join(codec.dumps_bytes(schema.dump(game_session)) for game_session in chunk))
+
+        # a short page means there is nothing left
+        next_after_id = game_sessions[-1].id if len(game_sessions) == limit else None
+        await response.write(b'], "next_after_id": ' + codec.dumps_bytes(next_after_id) + b"}}")
+        await response.write_eof()
+        return response
@@ -0,0 +1,42 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+from app.store.database.sqlalchemy_base import db
+from sqlalchemy import (
+    Column,
+    BigInteger,
+    ForeignKey,
+    Index,
+    Integer,
+)
+
+# chat_id of the rows holding all-time stats across every chat
+GLOBAL_SCOPE = 0
+
+
+@dataclass
+class PlayerStats:
+    chat_id: int
+    player_id: int
+    games: int
+    wins: int
+    points: int
+
+
+@dataclass
+class PlayedGame:
+    session_id: int
+    chat_id: int
+    points: int
+    ended_at: Optional[datetime.datetime]
+
+
+class PlayerStatsModel(db):
+    __tablename__ = "player_stats"
+    chat_id = Column(BigInteger, primary_key=True)
+    player_id = Column(BigInteger, ForeignKey("players.id", ondelete="CASCADE"), primary_key=True)
+    games = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    points = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_player_stats_chat_id_points", "chat_id", points.desc()),)
@@ -0,0 +1,13 @@
+import typing
+
+
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+def setup_routes(app: "Application"):
+    from app.leaderboard.views import LeaderboardView, PlayerStatsView
+
+    app.router.add_view("/leaderboard.get", LeaderboardView)
+    app.router.add_view("/leaderboard.player", PlayerStatsView)
@@ -0,0 +1,35 @@
+from marshmallow import Schema, fields, validate
+
+
+class PlayerStatsSchema(Schema):
+    player_id = fields.Int()
+    games = fields.Int()
+    wins = fields.Int()
+    points = fields.Int()
+
+
+class LeaderboardQuerySchema(Schema):
+    chat_id = fields.Int(required=False)
+    limit = fields.Int(required=False, validate=validate.Range(min=1, max=100))
+
+
+class LeaderboardSchema(Schema):
+    chat_id = fields.Int(allow_none=True)
+    players = fields.Nested(PlayerStatsSchema, many=True)
+
+
+class PlayedGameSchema(Schema):
+    session_id = fields.Int()
+    chat_id = fields.Int()
+    points = fields.Int()
+    ended_at = fields.DateTime(allow_none=True)
+
+
+class PlayerQuerySchema(Schema):
+    player_id = fields.Int(required=True)
+    chat_id = fields.Int(required=False)
+
+
+class PlayerSchema(Schema):
+    stats = fields.Nested(PlayerStatsSchema, allow_none=True)
+    history = fields.Nested(PlayedGameSchema, many=True)
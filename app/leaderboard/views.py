@@ -0,0 +1,27 @@
+from aiohttp_apispec import docs, querystring_schema, response_schema
+
+from app.leaderboard.schemes import LeaderboardQuerySchema, LeaderboardSchema, PlayerQuerySchema, PlayerSchema
+from app.web.app import View
+from app.web.mixins import AuthRequiredMixin
+from app.web.utils import json_response
+
+
+class LeaderboardView(AuthRequiredMixin, View):
+    @docs(tags=["leaderboard"], summary="Top players", description="Global top if chat_id is not given")
+    @querystring_schema(LeaderboardQuerySchema)
+    @response_schema(LeaderboardSchema)
+    async def get(self):
+        chat_id = self.data.get("chat_id")
+        players = await self.store.leaderboard.get_top(chat_id=chat_id, limit=self.data.get("limit", 10))
+        return json_response(data=LeaderboardSchema().dump({"chat_id": chat_id, "players": players}))
+
+
+class PlayerStatsView(AuthRequiredMixin, View):
+    @docs(tags=["leaderboard"], summary="Player stats and history of ended games, archived ones included")
+    @querystring_schema(PlayerQuerySchema)
+    @response_schema(PlayerSchema)
+    async def get(self):
+        player_id = self.data["player_id"]
+        stats = await self.store.leaderboard.get_player_stats(player_id, chat_id=self.data.get("chat_id"))
+        history = await self.store.leaderboard.get_player_history(player_id)
+        return json_response(data=PlayerSchema().dump({"stats": stats, "history": history}))
@@ -0,0 +1,12 @@
+import typing
+
+
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+def setup_routes(app: "Application"):
+    from app.metrics.views import MetricsView
+
+    app.router.add_view("/metrics", MetricsView)
@@ -0,0 +1,15 @@
+from aiohttp.web import HTTPNotFound, Response
+from aiohttp_apispec import docs
+
+from app.web.app import View
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsView(View):
+    @docs(tags=["metrics"], summary="Prometheus metrics", description="Metrics in Prometheus text format")
+    async def get(self):
+        if not self.store.metrics.enabled:
+            raise HTTPNotFound(reason="metrics are disabled")
+        body = await self.store.metrics.render()
+        return Response(body=body.encode(), headers={"Content-Type": CONTENT_TYPE})
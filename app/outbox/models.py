@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from app.store.database.sqlalchemy_base import db
+from sqlalchemy import (
+    Column,
+    BigInteger,
+    DateTime,
+    Integer,
+    Text,
+    func,
+)
+
+
+@dataclass
+class OutboxMessage:
+    """
+    Messages with a template and a session are keyed by app.store.vk_api.idempotency.message_random_id,
+    the session and sequence are set by the game state accessor when the state changes
+    """
+    chat_id: int
+    message: str
+    keyboard: Optional[str] = None
+    template: Optional[str] = None
+    session_id: Optional[int] = None
+    sequence: int = 0
+
+
+@dataclass
+class PendingMessage:
+    """
+    Outbox row claimed for delivery
+    """
+    id: int
+    chat_id: int
+    message: str
+    keyboard: Optional[str]
+    random_id: int
+    attempts: int
+
+
+class OutboxModel(db):
+    """
+    Bot messages committed together with the state change they announce and deleted once VK accepted them.
+    random_id is derived from the message's session, sequence and template, the row id is used for
+    messages without them; either way it is the same in every delivery, so VK drops a repeated one.
+    """
+    __tablename__ = "outbox"
+    id = Column(BigInteger, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False, index=True)
+    message = Column(Text, nullable=False)
+    keyboard = Column(Text, nullable=True)
+    random_id = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # a sender claims rows until then, rows whose claim expired are delivered again
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
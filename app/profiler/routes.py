@@ -0,0 +1,13 @@
+import typing
+
+
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+def setup_routes(app: "Application"):
+    from app.profiler.views import ProfilerStatsView, ProfilerProfileView
+
+    app.router.add_view("/profiler.stats", ProfilerStatsView)
+    app.router.add_view("/profiler.profile", ProfilerProfileView)
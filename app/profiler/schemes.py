@@ -0,0 +1,23 @@
+from marshmallow import Schema, fields, validate
+
+
+class SlowCallbackSampleSchema(Schema):
+    detected_at = fields.Float()
+    duration = fields.Float()
+    stack = fields.List(fields.Str())
+
+
+class ProfilerStatsSchema(Schema):
+    last_lag = fields.Float()
+    max_lag = fields.Float()
+    slow_callbacks = fields.Nested(SlowCallbackSampleSchema, many=True)
+
+
+class ProfileRequestSchema(Schema):
+    seconds = fields.Float(required=True, validate=validate.Range(min=0, min_inclusive=False))
+    sort = fields.Str(required=False, validate=validate.OneOf(["cumulative", "tottime", "calls"]))
+    limit = fields.Int(required=False, validate=validate.Range(min=1))
+
+
+class ProfileResponseSchema(Schema):
+    report = fields.Str()
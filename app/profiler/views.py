@@ -0,0 +1,42 @@
+from aiohttp.web import HTTPBadRequest, HTTPConflict, HTTPNotFound
+from aiohttp_apispec import docs, querystring_schema, response_schema
+
+from app.profiler.schemes import ProfileRequestSchema, ProfileResponseSchema, ProfilerStatsSchema
+from app.web.app import View
+from app.web.mixins import AuthRequiredMixin
+from app.web.utils import json_response
+
+
+class ProfilerStatsView(AuthRequiredMixin, View):
+    @docs(tags=["profiler"], summary="Event loop lag and slow callback samples")
+    @response_schema(ProfilerStatsSchema)
+    async def get(self):
+        profiler = self.store.profiler
+        if not profiler.config.enabled:
+            raise HTTPNotFound(reason="profiler is disabled")
+        return json_response(data=ProfilerStatsSchema().dump({
+            "last_lag": profiler.last_lag,
+            "max_lag": profiler.max_lag,
+            "slow_callbacks": list(profiler.samples),
+        }))
+
+
+class ProfilerProfileView(AuthRequiredMixin, View):
+    @docs(tags=["profiler"], summary="Profile the event loop for a time window")
+    @querystring_schema(ProfileRequestSchema)
+    @response_schema(ProfileResponseSchema)
+    async def post(self):
+        profiler = self.store.profiler
+        if not profiler.config.enabled:
+            raise HTTPNotFound(reason="profiler is disabled")
+        seconds = self.data["seconds"]
+        if seconds > profiler.config.max_profile_seconds:
+            raise HTTPBadRequest(reason=f"window is limited to {profiler.config.max_profile_seconds} seconds")
+        if profiler.profiling:
+            raise HTTPConflict(reason="profiling is already running")
+        report = await profiler.profile(
+            seconds=seconds,
+            sort=self.data.get("sort", "cumulative"),
+            limit=self.data.get("limit", 50),
+        )
+        return json_response(data={"report": report})
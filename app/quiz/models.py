@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Union
+from typing import Optional, Union
 
 from sqlalchemy.orm import relationship
 
@@ -10,7 +10,10 @@ from sqlalchemy import (
     BigInteger,
     String,
     Boolean,
+    DateTime,
     ForeignKey,
+    PrimaryKeyConstraint,
+    func,
 )
 
 
@@ -20,6 +23,16 @@ class Theme:
     title: str
 
 
+@dataclass
+class QuestionMedia:
+    """
+    Picture or audio of a question, fetched from url when it is uploaded to VK
+    """
+    # "photo" or "audio"
+    type: str
+    url: str
+
+
 @dataclass
 class Question:
     id: Union[int, None]
@@ -27,6 +40,17 @@ class Question:
     theme_id: int
     points: int
     answers: list["Answer"]
+    media: Optional[QuestionMedia] = None
+
+
+@dataclass
+class SearchHit:
+    id: int
+    title: str
+    # pg_trgm similarity or full-text rank of the title, whichever is higher
+    score: float
+    # theme of a question, None for themes
+    theme_id: Optional[int] = None
 
 
 @dataclass
@@ -46,11 +70,15 @@ class ThemeModel(db):
 
 
 class QuestionModel(db):
+    # titles of questions and themes also have trigram and full-text GIN indexes, created by
+    # migration 7c2e9f4b1d58 as they need the pg_trgm extension
     __tablename__ = "questions"
     id = Column(BigInteger, primary_key=True)
     theme_id = Column(BigInteger, ForeignKey('themes.id', onupdate="CASCADE", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False, unique=True)
     points = Column(Integer, nullable=False)
+    media_type = Column(String, nullable=True)
+    media_url = Column(String, nullable=True)
     answers = relationship("AnswerModel",
                            backref="question",
                            cascade="all, delete",
@@ -69,4 +97,17 @@ class AnswerModel(db):
     id = Column(BigInteger, primary_key=True)
     question_id = Column(BigInteger, ForeignKey('questions.id', onupdate="CASCADE", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False, unique=False)
-    is_correct = Column(Boolean, nullable=False)
\ No newline at end of file
+    is_correct = Column(Boolean, nullable=False)
+
+
+class MediaAttachmentModel(db):
+    """
+    VK attachment string of a question's media, per community, as uploads are usable by their community only
+    """
+    __tablename__ = "media_attachments"
+    question_id = Column(BigInteger, ForeignKey('questions.id', onupdate="CASCADE", ondelete="CASCADE"), nullable=False)
+    tenant = Column(Integer, nullable=False)
+    attachment = Column(String, nullable=False)
+    uploaded_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (PrimaryKeyConstraint("question_id", "tenant"),)
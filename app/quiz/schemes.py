@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class ThemeSchema(Schema):
@@ -11,6 +11,14 @@ class QuestionSchema(Schema):
     title = fields.Str(required=True)
     theme_id = fields.Int(required=True)
     answers = fields.Nested("AnswerSchema", many=True, required=True)
+    media = fields.Nested("QuestionMediaSchema", required=False, allow_none=True)
+    # add the question even if similar ones exist
+    force = fields.Bool(required=False, load_only=True)
+
+
+class QuestionMediaSchema(Schema):
+    type = fields.Str(required=True, validate=validate.OneOf(["photo", "audio"]))
+    url = fields.Url(required=True)
 
 
 class AnswerSchema(Schema):
@@ -28,3 +36,28 @@ class ThemeIdSchema(Schema):
 
 class ListQuestionSchema(Schema):
     questions = fields.Nested(QuestionSchema, many=True)
+
+
+class SearchQuerySchema(Schema):
+    q = fields.Str(required=True, validate=validate.Length(min=1, max=200))
+    kind = fields.Str(required=False, validate=validate.OneOf(["questions", "themes"]))
+    theme_id = fields.Int(required=False)
+    page = fields.Int(required=False, validate=validate.Range(min=1))
+    page_size = fields.Int(required=False, validate=validate.Range(min=1, max=100))
+
+
+class SearchHitSchema(Schema):
+    id = fields.Int()
+    title = fields.Str()
+    theme_id = fields.Int(allow_none=True)
+    score = fields.Float()
+
+
+class SearchResultSchema(Schema):
+    hits = fields.Nested(SearchHitSchema, many=True)
+    page = fields.Int()
+    next_page = fields.Int(allow_none=True)
+
+
+class DuplicatesSchema(Schema):
+    duplicates = fields.Nested(SearchHitSchema, many=True)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiohttp_apispec import docs, request_schema, response_schema, querystring_schema
 from app.web.mixins import AuthRequiredMixin
 from app.quiz.schemes import (
@@ -7,10 +9,15 @@ from app.quiz.schemes import (
     ThemeListSchema,
     ThemeSchema,
     AnswerSchema,
+    QuestionMediaSchema,
+    DuplicatesSchema,
+    SearchQuerySchema,
+    SearchResultSchema,
     )
+from app.quiz.models import QuestionMedia
 from app.web.app import View
 from app.web.schemes import OkResponseSchema
-from app.web.utils import json_response, check_answers
+from app.web.utils import json_response, json_body, cached_json_response, check_answers, error_json_response
 
 
 from aiohttp.web_exceptions import (
@@ -36,8 +43,12 @@ class ThemeAddView(AuthRequiredMixin, View):
 class ThemeListView(AuthRequiredMixin, View):
     @response_schema(ThemeListSchema)
     async def get(self):
+        body, etag = await self.store.read_cache.get("themes", self._body)
+        return cached_json_response(self.request, body, etag)
+
+    async def _body(self) -> bytes:
         themes = await self.store.quizzes.list_themes()
-        return json_response(data=ThemeListSchema().dump({'themes': themes}))
+        return json_body(data=ThemeListSchema().dump({'themes': themes}))
 
 
 class QuestionAddView(AuthRequiredMixin, View):
@@ -56,17 +67,27 @@ class QuestionAddView(AuthRequiredMixin, View):
         answers = self.data["answers"]
         if not check_answers(answers):
             raise HTTPBadRequest
+        if not self.data.get("force"):
+            duplicates = await self.store.search.duplicates(title)
+            if duplicates:
+                return error_json_response(http_status=409, status="conflict", message="similar questions exist",
+                                           data=DuplicatesSchema().dump({"duplicates": duplicates}))
 
         answers_list = await self.store.quizzes.create_answers_list(answers=answers)
         points = self.data["points"]
+        media = QuestionMedia(**self.data["media"]) if self.data.get("media") else None
         question = await self.store.quizzes.create_question(
                                                             title=title,
                                                             theme_id=theme_id,
                                                             points=points,
-                                                            answers=answers_list
+                                                            answers=answers_list,
+                                                            media=media,
                                                             )
         raw_answers = [AnswerSchema().dump(answer) for answer in answers_list]
-        return json_response(data={"id": question.id, "theme_id": theme_id, "answers": raw_answers, "title": title})
+        data = {"id": question.id, "theme_id": theme_id, "answers": raw_answers, "title": title}
+        if media:
+            data["media"] = QuestionMediaSchema().dump(media)
+        return json_response(data=data)
 
 
 class QuestionListView(AuthRequiredMixin, View):
@@ -78,10 +99,32 @@ class QuestionListView(AuthRequiredMixin, View):
             theme_id = int(self.request.query["id"])
         except:
             pass
+        body, etag = await self.store.read_cache.get(f"questions:{theme_id}", lambda: self._body(theme_id))
+        return cached_json_response(self.request, body, etag)
+
+    async def _body(self, theme_id: Optional[int]) -> bytes:
         questions = await self.store.quizzes.list_questions(theme_id)
         data = {"questions": []}
         for q in questions:
             raw_answers = [AnswerSchema().dump(answer) for answer in q.answers]
             question = {"id": q.id, "theme_id": q.theme_id, "answers": raw_answers, "title": q.title}
+            if q.media:
+                question["media"] = QuestionMediaSchema().dump(q.media)
             data["questions"].append(question)
-        return json_response(data=data)
+        return json_body(data=data)
+
+
+class SearchView(AuthRequiredMixin, View):
+    @docs(tags=["quiz"], summary="Search questions or themes by title",
+          description="Ranked by trigram similarity and full-text rank, pass next_page as page to get the next page")
+    @querystring_schema(SearchQuerySchema)
+    @response_schema(SearchResultSchema)
+    async def get(self):
+        result = await self.store.search.search(
+            self.data["q"],
+            kind=self.data.get("kind", "questions"),
+            theme_id=self.data.get("theme_id"),
+            page=self.data.get("page", 1),
+            page_size=self.data.get("page_size"),
+        )
+        return json_response(data=SearchResultSchema().dump(result))
@@ -0,0 +1,15 @@
+from app.store.database.sqlalchemy_base import db
+from sqlalchemy import (
+    Column,
+    BigInteger,
+    String,
+)
+
+
+class CacheVersionModel(db):
+    """
+    Version of a group of cached reads, bumped in the transaction that changes the data they are built from
+    """
+    __tablename__ = "cache_versions"
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -1,28 +1,99 @@
+import importlib
 import typing
 
 from app.store.database.database import Database
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application
+    from app.store.admin.accessor import AdminAccessor
+    from app.store.archive.accessor import ArchiveAccessor
+    from app.store.bot.manager import BotManager
+    from app.store.game_session.accessor import GameSessionAccessor
+    from app.store.game_state.accessor import GameStateAccessor
+    from app.store.leaderboard.accessor import LeaderboardAccessor
+    from app.store.media.accessor import MediaAccessor
+    from app.store.metrics.accessor import MetricsAccessor
+    from app.store.outbox.accessor import OutboxAccessor
+    from app.store.profiler.accessor import ProfilerAccessor
+    from app.store.quiz.accessor import QuizAccessor
+    from app.store.read_cache.accessor import ReadCacheAccessor
+    from app.store.search.accessor import SearchAccessor
+    from app.store.vk_api.accessor import VkApiAccessor
+    from app.store.write_behind.accessor import WriteBehindAccessor
+
+# "api" serves the admin REST API, "bot" polls VK and runs games, "all" does both in one process
+API, BOT, ALL = "api", "bot", "all"
+ROLES = (API, BOT, ALL)
 
 
 class Store:
-    def __init__(self, app: "Application"):
-        from app.store.bot.manager import BotManager
-        from app.store.admin.accessor import AdminAccessor
-        from app.store.quiz.accessor import QuizAccessor
-        from app.store.game_session.accessor import GameSessionAccessor
-        from app.store.vk_api.accessor import VkApiAccessor
+    # name -> (accessor class, roles it is wired in, whether it is built on first use);
+    # eager accessors are built in this order, lazy ones must have no startup or cleanup hooks
+    accessors = {
+        "metrics": ("app.store.metrics.accessor:MetricsAccessor", (API, BOT), False),
+        "profiler": ("app.store.profiler.accessor:ProfilerAccessor", (API, BOT), False),
+        "game_sessions": ("app.store.game_session.accessor:GameSessionAccessor", (API, BOT), True),
+        "write_behind": ("app.store.write_behind.accessor:WriteBehindAccessor", (BOT,), False),
+        "outbox": ("app.store.outbox.accessor:OutboxAccessor", (BOT,), False),
+        "game_state": ("app.store.game_state.accessor:GameStateAccessor", (BOT,), False),
+        "quizzes": ("app.store.quiz.accessor:QuizAccessor", (API,), True),
+        "search": ("app.store.search.accessor:SearchAccessor", (API,), True),
+        "read_cache": ("app.store.read_cache.accessor:ReadCacheAccessor", (API,), True),
+        "leaderboard": ("app.store.leaderboard.accessor:LeaderboardAccessor", (API, BOT), True),
+        "archive": ("app.store.archive.accessor:ArchiveAccessor", (API,), False),
+        "admins": ("app.store.admin.accessor:AdminAccessor", (API,), True),
+        "vk_api": ("app.store.vk_api.accessor:VkApiAccessor", (BOT,), False),
+        "media": ("app.store.media.accessor:MediaAccessor", (BOT,), True),
+        "bots_manager": ("app.store.bot.manager:BotManager", (BOT,), False),
+    }
+
+    metrics: "MetricsAccessor"
+    profiler: "ProfilerAccessor"
+    game_sessions: "GameSessionAccessor"
+    write_behind: "WriteBehindAccessor"
+    outbox: "OutboxAccessor"
+    game_state: "GameStateAccessor"
+    quizzes: "QuizAccessor"
+    search: "SearchAccessor"
+    read_cache: "ReadCacheAccessor"
+    leaderboard: "LeaderboardAccessor"
+    archive: "ArchiveAccessor"
+    admins: "AdminAccessor"
+    vk_api: "VkApiAccessor"
+    media: "MediaAccessor"
+    bots_manager: "BotManager"
+
+    def __init__(self, app: "Application", role: str = ALL):
+        self.app = app
+        self.role = role
+        self.wired = {name for name, (_, roles, _) in self.accessors.items() if role == ALL or role in roles}
+        for name, (path, _, lazy) in self.accessors.items():
+            if name in self.wired and not lazy:
+                setattr(self, name, self._build(path))
+
+    def _build(self, path: str):
+        module, cls = path.split(":")
+        return getattr(importlib.import_module(module), cls)(self.app)
+
+    def __getattr__(self, name: str):
+        if name not in self.accessors:
+            raise AttributeError(name)
+        if name not in self.wired:
+            raise AttributeError(f"{name} is not wired in the {self.role} role")
+        accessor = self._build(self.accessors[name][0])
+        setattr(self, name, accessor)
+        return accessor
+
 
-        self.game_sessions = GameSessionAccessor(app)
-        self.quizzes = QuizAccessor(app)
-        self.admins = AdminAccessor(app)
-        self.vk_api = VkApiAccessor(app)
-        self.bots_manager = BotManager(app)
+async def ensure_admin(app: "Application"):
+    await app.store.admins.ensure_admin(email=app.config.admin.email, password=app.config.admin.password)
 
 
 def setup_store(app: "Application"):
     app.database = Database(app)
-    app.on_startup.append(app.database.connect)
+    app.startup_pipeline.add(app.database.connect, phase="database")
+    app.store = Store(app, app.role)
+    if "admins" in app.store.wired:
+        app.startup_pipeline.defer(ensure_admin)
+    # after accessors, so they can write pending data on cleanup
     app.on_cleanup.append(app.database.disconnect)
-    app.store = Store(app)
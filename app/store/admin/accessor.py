@@ -7,18 +7,29 @@ from sqlalchemy import select, delete
 
 from app.admin.models import Admin, AdminModel
 from app.base.base_accessor import BaseAccessor
+from app.store.metrics.accessor import timed
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application
 
 
 class AdminAccessor(BaseAccessor):
-    async def connect(self, app: "Application"):
-        await self.delete_admin(email=self.app.config.admin.email)
-        await self.create_admin(
-            email=app.config.admin.email,
-            password=app.config.admin.password)
+    @timed("db_query_duration_seconds")
+    async def ensure_admin(self, email: str, password: str) -> None:
+        """
+        Creates the admin if missing and updates its password if it changed, keeping its id
+        """
+        password = sha256(password.encode()).hexdigest()
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stmt = select(AdminModel).where(AdminModel.email == email)
+                admin = (await session.execute(stmt)).scalars().first()
+                if admin is None:
+                    session.add(AdminModel(email=email, password=password))
+                elif admin.password != password:
+                    admin.password = password
 
+    @timed("db_query_duration_seconds")
     async def get_by_email(self, email: str) -> typing.Optional[Admin]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -28,6 +39,7 @@ class AdminAccessor(BaseAccessor):
                 for admin in curr:
                     return Admin(admin.id, admin.email, admin.password)
 
+    @timed("db_query_duration_seconds")
     async def create_admin(self, email: str, password: str) -> Admin:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -35,6 +47,7 @@ class AdminAccessor(BaseAccessor):
                 admin = AdminModel(email=email, password=password)
                 session.add(admin)
 
+    @timed("db_query_duration_seconds")
     async def delete_admin(self, email: str) -> Admin:
         async with self.app.database.session() as session:
             async with session.begin():
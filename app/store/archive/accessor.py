@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import typing
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.base.base_accessor import BaseAccessor
+from app.game_session.models import SessionStateModel
+from app.store.metrics.accessor import timed
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+# pg_try_advisory_xact_lock key, so only one process archives at a time
+ARCHIVE_LOCK_ID = 7_310_045
+
+# Picks a batch of ended sessions (skipping rows somebody else holds), copies each of them into one
+# archived_game_sessions row and deletes it from game_sessions, cascading to the state and association tables.
+ARCHIVE_BATCH_SQL = text("""
+WITH batch AS (
+    SELECT s.session_id
+    FROM session_states s
+    WHERE s.state_name = :ended AND s.ended_at < :ended_before
+    ORDER BY s.session_id
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+), archived AS (
+    INSERT INTO archived_game_sessions (id, chat_id, creator, ended_at, players, questions)
+    SELECT g.id, g.chat_id, g.creator, s.ended_at,
+           COALESCE((SELECT jsonb_object_agg(p.player_id::text, p.points)
+                     FROM association_players_sessions p WHERE p.session_id = g.id), '{}'::jsonb),
+           COALESCE((SELECT jsonb_agg(q.question_id)
+                     FROM association_sessions_questions q WHERE q.session_state_id = g.id), '[]'::jsonb)
+    FROM game_sessions g JOIN session_states s ON s.session_id = g.id
+    WHERE g.id IN (SELECT session_id FROM batch)
+    ON CONFLICT (id) DO NOTHING
+)
+DELETE FROM game_sessions WHERE id IN (SELECT session_id FROM batch)
+RETURNING id
+""")
+
+
+class ArchiveAccessor(BaseAccessor):
+    """
+    Background job moving ended sessions out of the hot game session tables.
+    Every run archives up to max_batches batches of batch_size sessions, each batch is its own short
+    transaction with a lock_timeout, and the job sleeps between batches. Runs are skipped during peak_hours.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.archive
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self, app: "Application"):
+        if self.config.enabled:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def disconnect(self, app: "Application"):
+        if self._task:
+            self._task.cancel()
+
+    def is_peak(self, now: Optional[datetime.datetime] = None) -> bool:
+        now = now or datetime.datetime.now()
+        return now.hour in self.config.peak_hours
+
+    async def _run_forever(self):
+        while True:
+            await asyncio.sleep(self.config.interval)
+            if self.is_peak():
+                continue
+            try:
+                archived = await self.archive_ended_sessions()
+            except Exception as e:
+                self.logger.error("Exception in session archival", exc_info=e)
+            else:
+                if archived:
+                    self.logger.info("archived %s ended sessions", archived)
+
+    async def archive_ended_sessions(self) -> int:
+        """
+        :return: number of sessions moved to archive during this run
+        """
+        total = 0
+        for _ in range(self.config.max_batches):
+            moved = await self.archive_batch()
+            if moved is None:
+                break
+            total += moved
+            if moved < self.config.batch_size:
+                break
+            await asyncio.sleep(self.config.pause)
+        return total
+
+    @timed("db_query_duration_seconds")
+    async def archive_batch(self) -> Optional[int]:
+        """
+        :return: number of archived sessions, None if another process holds the archive lock
+        """
+        ended_before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.config.min_age)
+        async with self.app.database.session() as session:
+            async with session.begin():
+                await session.execute(text(f"SET LOCAL lock_timeout = '{int(self.config.lock_timeout_ms)}ms'"))
+                locked = await session.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ARCHIVE_LOCK_ID})
+                if not locked.scalar():
+                    return None
+                result = await session.execute(ARCHIVE_BATCH_SQL, {
+                    "ended": SessionStateModel.states["ended"],
+                    "ended_before": ended_before,
+                    "batch_size": self.config.batch_size,
+                })
+                return len(result.all())
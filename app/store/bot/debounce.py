@@ -0,0 +1,60 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+# (chat_id, player_id, command)
+ClickKey = tuple[int, int, str]
+
+
+class ClickDebouncer:
+    """
+    Collapses repeated clicks of the same button by the same user in the same chat.
+    A click arriving while the first one is being handled waits for it, a click arriving
+    within window seconds after it gets the cached outcome; in both cases the handler is not run.
+    """
+
+    def __init__(self, window: float, size: int = 10000):
+        self.window = window
+        self.size = size
+        # key -> (outcome future, time the outcome stops being reused)
+        self._clicks: OrderedDict[ClickKey, tuple[asyncio.Future, float]] = OrderedDict()
+
+    async def run(self, key: ClickKey, handler: Callable[[], Awaitable[Optional[str]]]) -> tuple[Optional[str], bool]:
+        """
+        :param handler: coroutine function handling the click, returns its outcome (type of the reply)
+        :return: outcome and False if the click was a repeat absorbed without running the handler
+        """
+        item = self._clicks.get(key)
+        if item is not None:
+            future, expires_at = item
+            if not future.done() or expires_at > time.monotonic():
+                return await asyncio.shield(future), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._clicks[key] = (future, float("inf"))
+        self._clicks.move_to_end(key)
+        try:
+            outcome = await handler()
+        except BaseException as e:
+            self._clicks.pop(key, None)
+            future.set_exception(e)
+            # nobody may be waiting for it
+            future.exception()
+            raise
+        future.set_result(outcome)
+        if self._clicks.get(key, (None,))[0] is future:
+            self._clicks[key] = (future, time.monotonic() + self.window)
+        while len(self._clicks) > self.size:
+            self._clicks.popitem(last=False)
+        return outcome, True
+
+    def invalidate(self, chat_id: int, keep: Optional[ClickKey] = None) -> None:
+        """
+        Forgets finished outcomes of a chat, when its game changed and they may not hold anymore
+
+        :param keep: click whose outcome stays, usually the one that changed the game
+        """
+        for key, (future, _) in list(self._clicks.items()):
+            if key[0] == chat_id and key != keep and future.done():
+                del self._clicks[key]
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Awaitable, Callable, Optional
+
+
+@dataclass
+class Lobby:
+    conversation_message_id: int
+    players: list[int]
+    edited_at: float
+    pending: Optional[asyncio.Task] = None
+
+
+class LobbyView:
+    """
+    One lobby message per chat in the preparing phase, posted once and then edited with the current players.
+    Updates arriving within interval seconds after an edit are coalesced into one edit with the latest players.
+    """
+
+    def __init__(self, post: Callable[[int, list[int]], Awaitable[Optional[int]]],
+                 edit: Callable[[int, int, list[int]], Awaitable[None]],
+                 interval: float):
+        """
+        :param post: posts the lobby of a chat, returns its conversation_message_id
+        :param edit: edits the lobby message of a chat
+        """
+        self._post = post
+        self._edit = edit
+        self.interval = interval
+        self.logger = getLogger("handler")
+        self._lobbies: dict[int, Lobby] = {}
+
+    async def show(self, chat_id: int, players: list[int]) -> None:
+        """
+        Posts the lobby if the chat has none yet, otherwise schedules an edit
+        """
+        lobby = self._lobbies.get(chat_id)
+        if lobby is None:
+            conversation_message_id = await self._post(chat_id, list(players))
+            if conversation_message_id:
+                self._lobbies[chat_id] = Lobby(conversation_message_id, list(players), time.monotonic())
+            return
+        lobby.players = list(players)
+        if lobby.pending is None:
+            lobby.pending = asyncio.create_task(self._edit_later(chat_id, lobby))
+
+    async def _edit_later(self, chat_id: int, lobby: Lobby) -> None:
+        await asyncio.sleep(max(0.0, lobby.edited_at + self.interval - time.monotonic()))
+        # updates from now on need another edit
+        lobby.pending = None
+        lobby.edited_at = time.monotonic()
+        try:
+            await self._edit(chat_id, lobby.conversation_message_id, lobby.players)
+        except Exception as e:
+            self.logger.error("Exception in lobby edit", exc_info=e, extra={"chat_id": chat_id})
+
+    def close(self, chat_id: int) -> None:
+        lobby = self._lobbies.pop(chat_id, None)
+        if lobby and lobby.pending:
+            lobby.pending.cancel()
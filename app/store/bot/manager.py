@@ -1,153 +1,332 @@
+import time
 import typing
 import json
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from functools import partial
 from logging import getLogger
 from sqlalchemy.exc import IntegrityError
 
-from app.store.vk_api.dataclasses import Update
+from app.store.bot.debounce import ClickDebouncer
+from app.store.bot.lobby import LobbyView
+from app.store.bot.router import Command, CommandRouter
+from app.store.metrics.accessor import timed
+from app.store.vk_api.dataclasses import Update, UpdateEvent
+from app.game_session.models import LiveSession
+from app.outbox.models import OutboxMessage
 from app.web.utils import get_keyboard_json
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application
 
 
+@dataclass
+class EventReply:
+    """
+    Callback button click being handled: replies to the clicker are collected for its snackbar
+    """
+    event: UpdateEvent
+    snackbar: list[str] = field(default_factory=list)
+
+
+_event_reply: ContextVar[typing.Optional[EventReply]] = ContextVar("event_reply", default=None)
+
+
 
 class BotManager:
     messagetext = {
         "initial": "Игра пока не начата. Чтобы начать игру, нажмите кнопку 'Старт'",
         "started": "Игрок nameplaceholder нажал 'Старт'! nameplaceholder, дождись других игроков, прежде чем продолжить",
-        "restart": "Бот был перезагружен",
         "bot_added_to_chat": "Бот был добавлен в чат",
         "preparing": "Для участия в игре нажмите кнопку 'Участвовать'\n Когда все будут готовы, нажмите 'Поехали'",
+        "lobby": "Для участия в игре нажмите кнопку 'Участвовать'\n Когда все будут готовы, нажмите 'Поехали'",
         "new_player_added": "Добавлен игрок nameplaceholder",
         "player_already_added": "Игрок nameplaceholder уже добавлен",
         "start_quiz": "Игра началась!",
         "wrong_start": "Чтобы начать новую игру, завершите текущюю",
         "no_preparing_session":  "Игра либо уже начата, либо ещё не начата, дождитесь начала новой",
         "not_creator_to_run": "nameplaceholder, запустить игру может тот, кто нажал 'Старт'",
-        "not_enough_players": "Слишком мало игроков!"}
+        "not_enough_players": "Слишком мало игроков!",
+        "leaderboard": "Рейтинг игроков чата:",
+        "leaderboard_empty": "В этом чате ещё никто не набрал очков"}
+
+    # outcomes after which cached outcomes of other clicks in the chat may be stale
+    changing_outcomes = ("started", "new_player_added", "start_quiz")
+    # messages sent only to show their keyboard
+    keyboard_only = ("preparing",)
+    # replies meant for the user who clicked, shown in a snackbar on callback button clicks
+    snackbar_types = ("new_player_added", "player_already_added", "wrong_start", "no_preparing_session",
+                      "not_creator_to_run", "not_enough_players")
+    # VK limit for snackbar text
+    snackbar_length = 90
 
     def __init__(self, app: "Application"):
         self.app = app
         self.logger = getLogger("handler")
-
-
+        self.debouncer = ClickDebouncer(window=app.config.bot.click_window)
+        self.callback_buttons = app.config.bot.callback_buttons
+        # chat id -> keyboard the chat currently shows
+        self._keyboards: dict[int, str] = {}
+        # chat id -> (conversation_message_id, type) of the last message with an inline keyboard
+        self._inline: dict[int, tuple[int, str]] = {}
+        self.lobby = LobbyView(post=self._post_lobby, edit=self._edit_lobby,
+                               interval=app.config.bot.lobby_edit_interval)
+
+        # names are the payload commands of callback buttons, see app.web.utils.BUTTON_COMMANDS
+        self.router = CommandRouter(*(group.group_id for group in app.config.bot.all_groups))
+        self.router.add("start", "Старт", self.on_start,
+                        event="start", rejected=("wrong_start",))
+        self.router.add("participate", "Участвовать", self.on_participate,
+                        event="join", rejected=("no_preparing_session",))
+        self.router.add("run", "Поехали", self.on_run,
+                        event="run", rejected=("no_preparing_session",))
+        self.router.add("rating", "Рейтинг", self.on_leaderboard, prefix=True)
+
+
+    @timed("bot_handler_duration_seconds", label="handler")
     async def on_chat_inviting(self, chat_id: int) -> None:
+        messages = [await self.compose(chat_id, "bot_added_to_chat"), await self.compose(chat_id, "initial")]
         chat_ids = await self.app.store.game_sessions.list_chats(id_only=True, id=chat_id)
         if chat_id not in chat_ids:
-            chat = await self.app.store.game_sessions.add_chat_to_db(chat_id)
-
+            await self.app.store.game_sessions.add_chat_to_db(chat_id, messages=messages)
         else:
             self.logger.info("bot added to an already existed in DB chat")
-        await self.send_message(peer_id=chat.id, type="bot_added_to_chat")
-        await self.send_message(peer_id=chat.id, type="initial")
-
-
-    async def on_start(self, chat_id: int, player_id: int) -> None:
-        chat_running_sessions = await self.app.store.game_sessions.list_sessions(chat_id=chat_id,
-                                                                                 creator_id=player_id,
-                                                                                 req_cnds=["preparing",
-                                                                                           "just_started",
-                                                                                           "question_asked",
-                                                                                           "answered_wrong",
-                                                                                           "answered_right"])
-        if chat_running_sessions:
-            await self.send_message(peer_id=chat_id, type="wrong_start")
-        else:
-            session = await self.app.store.game_sessions.create_game_session(chat_id, player_id)
-            await self.app.store.game_sessions.add_player_to_game_session(session.creator, session.id)
-            await self.send_message(peer_id=chat_id, type="started", user_id=player_id)
-            await self.send_message(peer_id=chat_id, type="preparing")
-
-
-    async def on_participate(self, chat_id: int, player_id: int) -> None:
-        chat_sessions = await self.app.store.game_sessions.list_sessions(chat_id=chat_id, req_cnds=["preparing"])
-        if chat_sessions:
-            session = chat_sessions[0]
-            session_players = await self.app.store.game_sessions.list_players(id_only=True, session_id=session.id)
-            if player_id not in session_players:
-                await self.app.store.game_sessions.add_player_to_game_session(player_id, session.id)
-                await self.send_message(peer_id=chat_id, type="new_player_added", user_id=player_id)
-            else:
-                await self.send_message(peer_id=chat_id, type="player_already_added", user_id=player_id)
-        else:
-            await self.send_message(peer_id=chat_id, type="no_preparing_session")
-        await self.send_message(peer_id=chat_id, type="preparing")
-
-
-    async def on_run(self, chat_id: int, player_id: int) -> None:
-        chat_sessions = await self.app.store.game_sessions.list_sessions(chat_id=chat_id, req_cnds=["preparing"])
-        if chat_sessions:
-            session = chat_sessions[0]
-            if session.creator == player_id:
-                session_players = await self.app.store.game_sessions.list_players(id_only=True, session_id=session.id)
-                if len(session_players) > 1:
-                    await self.app.store.game_sessions.set_session_state(session.id, "just_started")
-                    await self.send_message(peer_id=chat_id, type="start_quiz")
-                    await self.app.store.game_sessions.add_questions_to_session(session.id)
-                else:
-                    await self.send_message(peer_id=chat_id, type="not_enough_players")
-                    await self.send_message(peer_id=chat_id, type="preparing")
-            else:
-                await self.send_message(peer_id=chat_id, type="not_creator_to_run", user_id=player_id)
-                await self.send_message(peer_id=chat_id, type="preparing")
-        else:
-            await self.send_message(peer_id=chat_id, type="no_preparing_session")
-            await self.send_message(peer_id=chat_id, type="preparing")
-
-
-    async def send_message(self, peer_id: int, type: str, **kwargs) -> None:
-        params = {"peer_id": peer_id, "message": self.messagetext[type]}
-        keyboard = get_keyboard_json(type=type)
+            await self.app.store.outbox.enqueue(messages)
+        await self.app.store.outbox.deliver(chat_id)
+
+
+    async def on_start(self, chat_id: int, player_id: int, live: typing.Optional[LiveSession]) -> str:
+        started = await self.compose(chat_id, "started", user_id=player_id)
+        live = await self.app.store.game_state.start(chat_id, player_id, announce=[started])
+        await self.app.store.outbox.deliver(chat_id)
+        await self.lobby.show(chat_id, list(live.players))
+        return "started"
+
+
+    async def on_participate(self, chat_id: int, player_id: int, live: LiveSession) -> str:
+        fired = await self.app.store.game_state.fire(live, "join", player_id=player_id)
+        if fired.rejected:
+            await self.send_message(peer_id=chat_id, type=fired.rejected, user_id=player_id)
+            return fired.rejected
+        await self.app.store.game_state.join(live, player_id)
+        # the lobby lists players, so the reply is only a snackbar for callback buttons
+        await self.send_message(peer_id=chat_id, type="new_player_added", user_id=player_id, snackbar_only=True)
+        await self.lobby.show(chat_id, list(live.players))
+        return "new_player_added"
+
+
+    async def on_run(self, chat_id: int, player_id: int, live: LiveSession) -> str:
+        start_quiz = await self.compose(chat_id, "start_quiz")
+        fired = await self.app.store.game_state.fire(live, "run", announce=[start_quiz], player_id=player_id)
+        if fired.rejected:
+            await self.send_message(peer_id=chat_id, type=fired.rejected, user_id=player_id)
+            return fired.rejected
+        self.lobby.close(chat_id)
+        await self.app.store.outbox.deliver(chat_id)
+        plan = await self.app.store.game_sessions.add_questions_to_session(live.session_id)
+        # pictures and audio are uploaded before the first round, not when each question is asked
+        await self.app.store.media.prefetch(chat_id, plan.questions)
+        return "start_quiz"
+
+
+    async def on_leaderboard(self, chat_id: int, player_id: int, live: typing.Optional[LiveSession]) -> str:
+        top = await self.app.store.leaderboard.get_top(chat_id=chat_id, limit=10)
+        if not top:
+            await self.send_message(peer_id=chat_id, type="leaderboard_empty")
+            return "leaderboard_empty"
+        names = await self.app.store.vk_api.get_user_names([stats.player_id for stats in top])
+        lines = [
+            f"{place}. {names.get(stats.player_id, stats.player_id)}: {stats.points} очк., "
+            f"побед {stats.wins} из {stats.games}"
+            for place, stats in enumerate(top, start=1)
+        ]
+        await self.send_message(peer_id=chat_id, type="leaderboard", lines=lines)
+        return "leaderboard"
+
+
+    async def send_message(self, peer_id: int, type: str, **kwargs) -> typing.Optional[int]:
+        """
+        :param kwargs: user_id to put the user's name in, lines to append,
+            snackbar_only to send the message only as a snackbar of the callback button click being handled
+        :return: conversation_message_id of the posted message
+        """
+        reply = _event_reply.get()
+        if reply and reply.event.peer_id != peer_id:
+            reply = None
+        if kwargs.get("snackbar_only") and not reply:
+            return None
+        params = {"peer_id": peer_id, "message": await self._text(type, **kwargs)}
+        keyboard = get_keyboard_json(type=type, callback=self.callback_buttons)
+        if reply:
+            if type in self.keyboard_only:
+                await self._edit_in_place(reply.event, type, params["message"], keyboard)
+                return None
+        # persistent keyboards are not sent again while the chat shows them
+        elif not self.callback_buttons and keyboard and self._keyboards.get(peer_id) == keyboard:
+            if type in self.keyboard_only:
+                return None
+            keyboard = None
         if keyboard:
             params["keyboard"] = keyboard
-        if "user_id" in kwargs:
+        if reply and type in self.snackbar_types:
+            reply.snackbar.append(params["message"])
+            return None
+        conversation_message_id = await self.app.store.vk_api.send_message(**params)
+        if keyboard and self.callback_buttons:
+            self._inline[peer_id] = (conversation_message_id, type)
+        elif keyboard:
+            self._keyboards[peer_id] = keyboard
+        return conversation_message_id
+
+    async def compose(self, peer_id: int, type: str, **kwargs) -> OutboxMessage:
+        """
+        Message for the outbox, for replies announcing a state change. Takes the kwargs of send_message
+        but snackbar_only; the persistent keyboard is assumed to be shown from now on.
+        """
+        keyboard = get_keyboard_json(type=type, callback=self.callback_buttons)
+        if keyboard and not self.callback_buttons:
+            if self._keyboards.get(peer_id) == keyboard:
+                keyboard = None
+            else:
+                self._keyboards[peer_id] = keyboard
+        return OutboxMessage(chat_id=peer_id, message=await self._text(type, **kwargs), keyboard=keyboard,
+                             template=type)
+
+    async def _text(self, type: str, **kwargs) -> str:
+        message = self.messagetext[type]
+        if "lines" in kwargs:
+            message = "\n".join([message, *kwargs["lines"]])
+        if "user_id" in kwargs and 'nameplaceholder' in message:
             name = await self.app.store.vk_api.get_user_name(kwargs["user_id"])
-            params["message"] = params["message"].replace('nameplaceholder', name)
-        await self.app.store.vk_api.send_message(**params)
+            message = message.replace('nameplaceholder', name)
+        return message
+
+    async def _lobby_lines(self, players: list[int]) -> list[str]:
+        names = await self.app.store.vk_api.get_user_names(players)
+        return ["Игроки:", *(f"{place}. {names.get(player_id, player_id)}"
+                             for place, player_id in enumerate(players, start=1))]
+
+    async def _post_lobby(self, chat_id: int, players: list[int]) -> typing.Optional[int]:
+        return await self.send_message(peer_id=chat_id, type="lobby", lines=await self._lobby_lines(players))
+
+    async def _edit_lobby(self, chat_id: int, conversation_message_id: int, players: list[int]) -> None:
+        # persistent keyboards belong to the chat, not to the message, only inline ones are sent with edits
+        keyboard = get_keyboard_json(type="lobby", callback=True) if self.callback_buttons else None
+        message = "\n".join([self.messagetext["lobby"], *await self._lobby_lines(players)])
+        # the next edit shows the players anyway
+        await self.app.store.vk_api.edit_message(peer_id=chat_id,
+                                                 conversation_message_id=conversation_message_id,
+                                                 message=message,
+                                                 keyboard=keyboard,
+                                                 optional=True)
+
+    async def _edit_in_place(self, event: UpdateEvent, type: str, message: str, keyboard: typing.Optional[str]) -> None:
+        """
+        Replaces the message the clicked button belongs to, unless it already is a message of that type
+        """
+        if not event.conversation_message_id or self._inline.get(event.peer_id) == (event.conversation_message_id, type):
+            return
+        await self.app.store.vk_api.edit_message(peer_id=event.peer_id,
+                                                 conversation_message_id=event.conversation_message_id,
+                                                 message=message,
+                                                 keyboard=keyboard)
+        self._inline[event.peer_id] = (event.conversation_message_id, type)
+
+    async def on_click(self, chat_id: int, player_id: int, command: str,
+                       handler: typing.Callable[[], typing.Awaitable[str]]) -> None:
+        """
+        Runs a button handler through the debouncer, repeated clicks get the outcome of the first one
+        """
+        key = (chat_id, player_id, command)
+        outcome, handled = await self.debouncer.run(key, handler)
+        if not handled:
+            self.logger.debug("repeated click of %s absorbed, outcome %s", command, outcome,
+                              extra={"chat_id": chat_id})
+            metrics = self.app.store.metrics
+            if metrics.enabled:
+                metrics.clicks_absorbed.inc(command=command)
+        elif outcome in self.changing_outcomes:
+            self.debouncer.invalidate(chat_id, keep=key)
+
+    async def run_command(self, command: Command, chat_id: int, player_id: int) -> str:
+        """
+        Checks that the game accepts the command's event and runs its handler, recording the latency under the command name
+        """
+        started = time.perf_counter()
+        try:
+            live = None
+            if command.event:
+                live = await self.app.store.game_state.get(chat_id)
+                machine = self.app.store.game_state.machine
+                if not machine.accepts(machine.state_of(live), command.event):
+                    for type in command.rejected:
+                        await self.send_message(peer_id=chat_id, type=type)
+                    return command.rejected[0] if command.rejected else None
+            return await command.handler(chat_id=chat_id, player_id=player_id, live=live)
+        finally:
+            metrics = self.app.store.metrics
+            if metrics.enabled:
+                metrics.handler_latency.observe(time.perf_counter() - started, handler=command.name)
+
+    async def dispatch(self, command: Command, chat_id: int, player_id: int) -> None:
+        handler = partial(self.run_command, command, chat_id, player_id)
+        if command.debounce:
+            await self.on_click(chat_id, player_id, command.name, handler)
+        else:
+            await handler()
+
+    async def on_event(self, event: UpdateEvent) -> None:
+        """
+        Callback button click: dispatched by payload command, acknowledged with a snackbar of replies to the clicker
+        """
+        command = self.router.get(event.payload.get("c"))
+        reply = EventReply(event=event)
+        token = _event_reply.set(reply)
+        try:
+            if command:
+                await self.dispatch(command, event.peer_id, event.user_id)
+        finally:
+            _event_reply.reset(token)
+            text = "\n".join(reply.snackbar)[:self.snackbar_length]
+            await self.app.store.vk_api.send_message_event_answer(event.event_id, event.user_id, event.peer_id,
+                                                                  text=text or None)
 
     async def handle_updates(self, updates: list[Update]) -> None:
+        metrics = self.app.store.metrics
         for update in updates:
+            if metrics.enabled:
+                metrics.updates_received.inc(type=update.type, group=update.group_id or "")
 
-            chat_id = update.object.message.peer_id
-            text = update.object.message.text.split()
-            if len(text) > 1:
-                text = text[1]
-            player_id = update.object.message.from_id
-
-            if update.object.message.action_type == "chat_invite_user": # If true, the bot has been added to a new chat
-                await self.on_chat_inviting(chat_id=chat_id)
-
-            elif text == 'Старт':
-                await self.on_start(chat_id=chat_id, player_id=player_id)
-
-            elif text == 'Участвовать':
-                await self.on_participate(chat_id=chat_id, player_id=player_id)
-
-            elif text == 'Поехали':
-                await self.on_run(chat_id=chat_id, player_id=player_id)
-
-
+            if update.type == "message_event":
+                self.logger.debug("event from %s", update.object.event.user_id,
+                                  extra={"chat_id": update.object.event.peer_id, "update_type": update.type})
+                await self.on_event(update.object.event)
+                continue
 
+            message = update.object.message
+            self.logger.debug("update from %s", message.from_id,
+                              extra={"chat_id": message.peer_id, "update_type": update.type})
 
+            if message.action_type == "chat_invite_user": # If true, the bot has been added to a new chat
+                await self.on_chat_inviting(chat_id=message.peer_id)
+                continue
 
+            command = self.router.resolve(message.text)
+            if command:
+                await self.dispatch(command, message.peer_id, message.from_id)
 
     async def do_things_on_start(self):
-        # Firstly, send to all message that bot was restarted
-
-        chats = await self.app.store.game_sessions.list_chats(id_only=True)
-        for chat_id in chats:
-            await self.send_message(peer_id=chat_id, type="restart")
-
-        chats = await self.app.store.game_sessions.list_chats(id_only=True, req_cnd="chats_session_needed")
-        print(chats)
+        # Replies lost in a restart are delivered from the outbox, only lobbies are posted again,
+        # as their message ids are not stored.
+        # only chats of communities this process serves
+        tenants = list(self.app.store.vk_api.groups)
+        chats = await self.app.store.game_sessions.list_chats(id_only=True, req_cnd="preparing", tenants=tenants)
         for chat_id in chats:
-            await self.send_message(peer_id=chat_id, type="initial")
-
-        chats = await self.app.store.game_sessions.list_chats(id_only=True, req_cnd="preparing")
-        print(chats)
-        for chat_id in chats:
-            await self.send_message(peer_id=chat_id, type="preparing")
+            live = await self.app.store.game_state.get(chat_id)
+            if live:
+                await self.lobby.show(chat_id, list(live.players))
+            else:
+                await self.send_message(peer_id=chat_id, type="preparing")
 
 
 
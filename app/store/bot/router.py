@@ -0,0 +1,68 @@
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+@dataclass
+class Command:
+    """
+    :param name: command name, also sent in payloads of callback buttons
+    :param handler: coroutine function (chat_id, player_id, live) -> outcome
+    :param event: event of app.game_session.fsm.GAME_MACHINE the command fires, None if it does not change the game
+    :param rejected: types of messages sent instead of running the handler when the game does not accept the event
+    :param debounce: whether repeated clicks are absorbed by the debouncer
+    :param prefix: whether the command also matches texts starting with its trigger and a space
+    """
+    name: str
+    handler: Callable[..., Awaitable[str]]
+    event: Optional[str] = None
+    rejected: tuple[str, ...] = ()
+    debounce: bool = True
+    prefix: bool = False
+
+
+class CommandRouter:
+    """
+    Resolves message texts to commands: the bot mention is stripped and the text normalized once,
+    then looked up in a dict of exact triggers and, failing that, in the list of prefix triggers.
+    """
+
+    def __init__(self, *group_ids: int):
+        """
+        :param group_ids: communities the bot serves, mentions of any of them are stripped
+        """
+        clubs = "|".join(str(group_id) for group_id in group_ids)
+        self._mention = re.compile(rf"^\[club(?:{clubs})\|[^\]]*\][\s,]*")
+        self._exact: dict[str, Command] = {}
+        self._names: dict[str, Command] = {}
+        # longest trigger first
+        self._prefixes: list[tuple[str, Command]] = []
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split()).casefold()
+
+    def add(self, name: str, trigger: str, handler: Callable[..., Awaitable[str]], **meta) -> Command:
+        """
+        :param trigger: text of the command, usually the label of its button
+        :param meta: other Command fields
+        """
+        command = Command(name=name, handler=handler, **meta)
+        trigger = self.normalize(trigger)
+        self._exact[trigger] = command
+        self._names[name] = command
+        if command.prefix:
+            self._prefixes.append((trigger, command))
+            self._prefixes.sort(key=lambda item: -len(item[0]))
+        return command
+
+    def get(self, name: str) -> Optional[Command]:
+        return self._names.get(name)
+
+    def resolve(self, text: str) -> Optional[Command]:
+        text = self.normalize(self._mention.sub("", text.strip(), count=1))
+        command = self._exact.get(text)
+        if command is None:
+            for trigger, candidate in self._prefixes:
+                if text.startswith(trigger + " "):
+                    return candidate
+        return command
@@ -1,3 +1,6 @@
 from app.admin.models import *
 from app.quiz.models import *
 from app.game_session.models import *
+from app.leaderboard.models import *
+from app.outbox.models import *
+from app.read_cache.models import *
@@ -27,7 +27,7 @@ class Database:
 
     async def connect(self, *_: list, **__: dict) -> None:
         self._db = db
-        self._engine = create_async_engine(self._build_async_db_uri(), echo=True, future=True)
+        self._engine = create_async_engine(self._build_async_db_uri(), echo=self.app.config.database.echo, future=True)
         self.session = sessionmaker(
             self._engine, expire_on_commit=False, class_=AsyncSession
         )
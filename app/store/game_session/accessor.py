@@ -1,17 +1,35 @@
-from typing import Optional, Union
+import typing
+from dataclasses import replace
+from typing import AsyncIterator, Optional, Sequence, Union
 import logging
-from sqlalchemy import select, join, delete, text, or_, and_
+from sqlalchemy import select, join, delete, text, or_, and_, func, update
+from sqlalchemy.orm import selectinload
 from app.base.base_accessor import BaseAccessor
+from app.store.metrics.accessor import timed
+from app.store.outbox.accessor import OutboxAccessor
+from app.store.vk_api.groups import tenant_bounds
 from app.game_session.models import (
-    GameSession, GameSessionModel,
+    GameSession, GameSessionModel, GameSessionSummary,
     Chat, ChatModel,
     Player, PlayerModel,
     SessionStateModel,
-    PlayersSessions
+    PlayersSessions,
+    SessionsQuestions,
+    PlannedQuestion, QuestionPlan,
 )
+from app.outbox.models import OutboxMessage
+from app.quiz.models import Answer, QuestionMedia, QuestionModel
+from app.web.utils import normalize_answer
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
 
 
 class GameSessionAccessor(BaseAccessor):
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        # question plans of running sessions, session_id -> plan
+        self._plans: dict[int, QuestionPlan] = {}
 
     # Conditions for sqlalchemy filters
     chats_with_sessions = select(GameSessionModel.chat_id)
@@ -37,14 +55,20 @@ class GameSessionAccessor(BaseAccessor):
             condition = ChatModel.id.in_(self.chats_with_sessions.join(SessionStateModel).filter(condition))
         return condition
 
-    async def add_chat_to_db(self, chat_id: int) -> Chat:
+    @timed("db_query_duration_seconds")
+    async def add_chat_to_db(self, chat_id: int, messages: Sequence[OutboxMessage] = ()) -> Chat:
+        """
+        :param messages: queued in the outbox in the same transaction
+        """
         async with self.app.database.session() as session:
             async with session.begin():
                 chat = ChatModel(id=chat_id)
                 session.add(chat)
+                await OutboxAccessor.add(session, messages)
         chat = Chat(id=chat.id)
         return chat
 
+    @timed("db_query_duration_seconds")
     async def add_player_to_db(self, player_id: int) -> Player:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -53,7 +77,12 @@ class GameSessionAccessor(BaseAccessor):
         player = Player(id=player.id)
         return player
 
-    async def create_game_session(self, chat_id: int, creator_id: int) -> GameSession:
+    @timed("db_query_duration_seconds")
+    async def create_game_session(self, chat_id: int, creator_id: int,
+                                  messages: Sequence[OutboxMessage] = ()) -> GameSession:
+        """
+        :param messages: queued in the outbox in the same transaction, keyed by the new session
+        """
         async with self.app.database.session() as session:
             async with session.begin():
                 creator = await self.get_player_by_id(id=creator_id, dc=False)
@@ -64,17 +93,80 @@ class GameSessionAccessor(BaseAccessor):
                                                   state_name=SessionStateModel.states["preparing"])
                 session.add(game_session)
                 session.add(session_state)
+                if messages:
+                    await session.flush()
+                    await OutboxAccessor.add(session, [replace(message, session_id=game_session.id)
+                                                       for message in messages])
         game_session = GameSession(id=game_session.id,
                                    chat_id=game_session.chat_id,
                                    creator=game_session.creator)
         return game_session
 
-    async def set_session_state(self, session_id: int, new_state: str) -> None:
+    @timed("db_query_duration_seconds")
+    async def set_session_state(self, session_id: int, new_state: str, sequence: Optional[int] = None,
+                                messages: Sequence[OutboxMessage] = ()) -> None:
+        """
+        :param sequence: LiveSession.sequence after the change, the stored one is kept if None
+        :param messages: announcing the change, queued in the outbox in the same transaction
+        """
         async with self.app.database.session() as session:
             async with session.begin():
-                game_session = await self.get_game_session_by_id(id=session_id, dc=True)
-                game_session
+                stmt = (
+                    update(SessionStateModel)
+                    .where(SessionStateModel.session_id == session_id)
+                    .values(state_name=SessionStateModel.states[new_state])
+                )
+                if sequence is not None:
+                    stmt = stmt.values(sequence=sequence)
+                if new_state == "ended":
+                    stmt = stmt.values(ended_at=func.now())
+                await session.execute(stmt)
+                await OutboxAccessor.add(session, messages)
 
+    @timed("db_query_duration_seconds")
+    async def award_points(self, session_id: int, chat_id: int, player_id: int, points: int) -> None:
+        """
+        Adds points to the player's session score and to the player's chat and global stats in one transaction
+        """
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stmt = (
+                    update(PlayersSessions)
+                    .where(PlayersSessions.session_id == session_id, PlayersSessions.player_id == player_id)
+                    .values(points=PlayersSessions.points + points)
+                )
+                await session.execute(stmt)
+                stats = await self.app.store.leaderboard.add_to_stats(session, chat_id, [(player_id, 0, 0, points)])
+        self.app.store.leaderboard.update_cache(stats)
+
+    @timed("db_query_duration_seconds")
+    async def finish_game_session(self, session_id: int, chat_id: int) -> list[int]:
+        """
+        Sets session state to ended and counts the game (and the win for the best scored players)
+        in stats of every participant, in one transaction.
+
+        :return: IDs of winners
+        """
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stmt = (
+                    update(SessionStateModel)
+                    .where(SessionStateModel.session_id == session_id)
+                    .values(state_name=SessionStateModel.states["ended"], ended_at=func.now())
+                )
+                await session.execute(stmt)
+                stmt = select(PlayersSessions.player_id, PlayersSessions.points).where(
+                    PlayersSessions.session_id == session_id)
+                scores = (await session.execute(stmt)).all()
+                best = max((row.points for row in scores), default=0)
+                winners = [row.player_id for row in scores if best > 0 and row.points == best]
+                rows = [(row.player_id, 1, int(row.player_id in winners), 0) for row in scores]
+                stats = await self.app.store.leaderboard.add_to_stats(session, chat_id, rows)
+        self.app.store.leaderboard.update_cache(stats)
+        self._plans.pop(session_id, None)
+        return winners
+
+    @timed("db_query_duration_seconds")
     async def add_player_to_game_session(self, player_id: int, session_id: int) -> None:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -103,12 +195,15 @@ class GameSessionAccessor(BaseAccessor):
             condition = self.filter_by_states([req_cnd], selecting="chats")
         return condition
 
+    @timed("db_query_duration_seconds")
     async def list_chats(self, id_only: bool = False,
                          req_cnd: Optional[str] = None,
-                         id: Optional[int] = None) -> Union[list[Chat], list[int]]:
+                         id: Optional[int] = None,
+                         tenants: Optional[list[int]] = None) -> Union[list[Chat], list[int]]:
         """
         :param: id_only: if True, function returns list with int IDs of chats, else list with Chat dataclass instances.
         :param: req_cnd: arg for make_chat_filter_condition function.
+        :param: tenants: only chats of these communities, see app.store.vk_api.groups.
 
         :return: list with integer IDs of chats or list with Chat dataclass instances.
         """
@@ -120,6 +215,8 @@ class GameSessionAccessor(BaseAccessor):
                     stmt = stmt.filter(condition)
                 if id:
                     stmt = stmt.filter(ChatModel.id == id)
+                if tenants is not None:
+                    stmt = stmt.filter(or_(*(ChatModel.id.between(*tenant_bounds(tenant)) for tenant in tenants)))
                 result = await session.execute(stmt)
                 curr = result.scalars()
                 if id_only:
@@ -127,6 +224,7 @@ class GameSessionAccessor(BaseAccessor):
                 else:
                     return [Chat(id=chat.id) for chat in curr]
 
+    @timed("db_query_duration_seconds")
     async def list_sessions(self, id_only: bool = False,
                             req_cnds: Optional[list[str]] = None,
                             chat_id: Optional[int] = None,
@@ -156,6 +254,7 @@ class GameSessionAccessor(BaseAccessor):
                         for game_session in curr
                     ]
 
+    @timed("db_query_duration_seconds")
     async def list_players(self, id_only: bool = False,
                            session_id: Optional[int] = None) -> Union[list[Player], list[int]]:
         async with self.app.database.session() as session:
@@ -170,6 +269,7 @@ class GameSessionAccessor(BaseAccessor):
                 else:
                     return [Player(id=player.id) for player in curr]
 
+    @timed("db_query_duration_seconds")
     async def get_player_by_id(self, id: int, dc=True) -> Union[Player, PlayerModel]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -182,6 +282,7 @@ class GameSessionAccessor(BaseAccessor):
                     else:
                         return Player(id=player.id)
 
+    @timed("db_query_duration_seconds")
     async def get_game_session_by_id(self, id: int, dc=True) -> Union[GameSession, GameSessionModel]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -198,5 +299,127 @@ class GameSessionAccessor(BaseAccessor):
                                 creator=game_session.creator,
                         )
 
-    async def add_questions_to_session(self, session_id):
-        pass
+    async def iter_game_sessions(self, limit: int = 100,
+                                 after_id: Optional[int] = None,
+                                 chat_id: Optional[int] = None,
+                                 state: Optional[str] = None,
+                                 creator_id: Optional[int] = None) -> AsyncIterator[GameSessionSummary]:
+        """
+        Keyset pagination over game sessions, newest first: pass id of the last received session
+        as after_id to get the next page. State and players count come from the same query,
+        rows are streamed from a server-side cursor.
+
+        :param state: name of a state from SessionStateModel.states
+        """
+        players_count = (
+            select(func.count(PlayersSessions.player_id))
+            .where(PlayersSessions.session_id == GameSessionModel.id)
+            .correlate(GameSessionModel)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(GameSessionModel.id,
+                   GameSessionModel.chat_id,
+                   GameSessionModel.creator,
+                   SessionStateModel.state_name,
+                   players_count.label("players_count"))
+            .join(SessionStateModel, SessionStateModel.session_id == GameSessionModel.id)
+            .order_by(GameSessionModel.id.desc())
+            .limit(limit)
+        )
+        if after_id:
+            stmt = stmt.where(GameSessionModel.id < after_id)
+        if chat_id:
+            stmt = stmt.where(GameSessionModel.chat_id == chat_id)
+        if creator_id:
+            stmt = stmt.where(GameSessionModel.creator == creator_id)
+        if state:
+            stmt = stmt.where(SessionStateModel.state_name == SessionStateModel.states[state])
+
+        async with self.app.database.session() as session:
+            async with session.begin():
+                result = await session.stream(stmt)
+                async for row in result:
+                    yield GameSessionSummary(
+                        id=row.id,
+                        chat_id=row.chat_id,
+                        creator=row.creator,
+                        state=SessionStateModel.state_names[row.state_name],
+                        players_count=row.players_count,
+                    )
+
+    @timed("db_query_duration_seconds")
+    async def count_running_sessions(self) -> int:
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stmt = select(func.count(SessionStateModel.session_id)).filter(self.filter_running_states)
+                result = await session.execute(stmt)
+                return result.scalar_one()
+
+    @staticmethod
+    def _planned_question(question: QuestionModel) -> PlannedQuestion:
+        return PlannedQuestion(
+            question_id=question.id,
+            title=question.title,
+            points=question.points,
+            answers=[Answer(title=a.title, is_correct=a.is_correct) for a in question.answers],
+            match_keys=frozenset(normalize_answer(a.title) for a in question.answers if a.is_correct),
+            media=QuestionMedia(type=question.media_type, url=question.media_url) if question.media_type else None,
+        )
+
+    @timed("db_query_duration_seconds")
+    async def add_questions_to_session(self, session_id: int) -> QuestionPlan:
+        """
+        Draws questions for the whole game at once, stores their order in association_sessions_questions.ordinal
+        and keeps the plan in memory, so rounds need no queries.
+        """
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stmt = (
+                    select(QuestionModel)
+                    .options(selectinload(QuestionModel.answers))
+                    .order_by(func.random())
+                    .limit(self.app.config.game.questions_per_game)
+                )
+                questions = (await session.execute(stmt)).scalars().all()
+                session.add_all([
+                    SessionsQuestions(session_state_id=session_id, question_id=q.id, is_answered=False, ordinal=ordinal)
+                    for ordinal, q in enumerate(questions)
+                ])
+                plan = QuestionPlan(session_id=session_id, questions=[self._planned_question(q) for q in questions])
+        self._plans[session_id] = plan
+        return plan
+
+    @timed("db_query_duration_seconds")
+    async def get_question_plan(self, session_id: int) -> QuestionPlan:
+        """
+        Plan from memory, or restored from association_sessions_questions after a restart:
+        the pointer is put on the last answered question.
+        """
+        plan = self._plans.get(session_id)
+        if plan:
+            return plan
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stmt = (
+                    select(SessionsQuestions, QuestionModel)
+                    .join(QuestionModel, QuestionModel.id == SessionsQuestions.question_id)
+                    .options(selectinload(QuestionModel.answers))
+                    .where(SessionsQuestions.session_state_id == session_id)
+                    .order_by(SessionsQuestions.ordinal)
+                )
+                rows = (await session.execute(stmt)).all()
+        plan = QuestionPlan(
+            session_id=session_id,
+            questions=[self._planned_question(question) for _, question in rows],
+            position=sum(1 for session_question, _ in rows if session_question.is_answered) - 1,
+        )
+        self._plans[session_id] = plan
+        return plan
+
+    async def next_question(self, session_id: int) -> Optional[PlannedQuestion]:
+        """
+        :return: next question of the session plan, None when the plan is over
+        """
+        plan = await self.get_question_plan(session_id)
+        return plan.advance()
@@ -0,0 +1,172 @@
+import typing
+from dataclasses import replace
+from typing import Optional, Sequence
+
+from app.base.base_accessor import BaseAccessor
+from app.game_session.fsm import FINAL_STATES, GAME_MACHINE, FiredEvent
+from app.game_session.models import LiveSession
+from app.outbox.models import OutboxMessage
+from app.store.game_state.backends import (
+    KeyValueStateBackend,
+    MemoryStateBackend,
+    PostgresStateBackend,
+    StateBackend,
+)
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+BACKENDS = ("postgres", "memory", "kv")
+
+# transitions after which Postgres must already hold everything that happened before
+CRITICAL_STATES = ("just_started", "ended")
+
+
+class GameStateAccessor(BaseAccessor):
+    """
+    Volatile state of running games (state, current question and answerer, players with points)
+    kept in a pluggable backend, so bot handlers read and change it without queries.
+    Durable facts (session players, scores, state names for listings) go to Postgres through
+    the write-behind buffer, flushed right away with the Postgres backend, which reads them back.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.state
+        self.backend: Optional[StateBackend] = None
+        self.machine = GAME_MACHINE
+
+    def _make_backend(self) -> StateBackend:
+        if self.config.backend == "memory":
+            return MemoryStateBackend()
+        if self.config.backend == "kv":
+            return KeyValueStateBackend(self.config.host, self.config.port, self.config.db, self.config.prefix)
+        if self.config.backend == "postgres":
+            return PostgresStateBackend(self.app)
+        raise ValueError(f"unknown state backend {self.config.backend}, expected one of {BACKENDS}")
+
+    async def connect(self, app: "Application"):
+        self.backend = self._make_backend()
+        await self.backend.connect()
+        if not self.backend.durable:
+            await self.warm_up()
+
+    async def disconnect(self, app: "Application"):
+        if self.backend:
+            await self.backend.disconnect()
+
+    async def warm_up(self) -> None:
+        """
+        Copies running sessions from Postgres to the backend, keeping ones the backend already has,
+        so a miss in the backend means the chat has no running game.
+        """
+        for live in await PostgresStateBackend(self.app).load_running():
+            if await self.backend.get(live.chat_id) is None:
+                await self.backend.put(live)
+
+    async def _written(self) -> None:
+        # with the Postgres backend reads come from the tables, so they must see the write
+        if self.backend.durable:
+            await self.app.store.write_behind.flush()
+
+    async def get(self, chat_id: int) -> Optional[LiveSession]:
+        """
+        :return: running session of the chat
+        """
+        live = await self.backend.get(chat_id)
+        if live and live.state not in FINAL_STATES:
+            return live
+
+    async def start(self, chat_id: int, creator_id: int, announce: Sequence[OutboxMessage] = ()) -> LiveSession:
+        """
+        Creates the session in Postgres right away, as its id is needed, with the creator as the first player
+
+        :param announce: messages queued in the outbox in the transaction creating the session
+        """
+        game_sessions = self.app.store.game_sessions
+        session = await game_sessions.create_game_session(chat_id, creator_id, messages=announce)
+        await game_sessions.add_player_to_game_session(session.creator, session.id)
+        live = LiveSession(session_id=session.id, chat_id=chat_id, creator=creator_id,
+                           players={creator_id: 0})
+        await self.backend.put(live)
+        return live
+
+    async def join(self, live: LiveSession, player_id: int) -> bool:
+        """
+        :return: False if the player is already in the session
+        """
+        if not await self.backend.add_player(live, player_id):
+            return False
+        self.app.store.write_behind.add_player(live.session_id, live.chat_id, player_id)
+        await self._written()
+        return True
+
+    async def set_state(self, live: LiveSession, state: str, announce: Sequence[OutboxMessage] = ()) -> None:
+        """
+        :param announce: messages queued in the outbox with the new state, keyed by the session's sequence
+            after it. With the Postgres backend the state row and the messages are written in one
+            transaction; otherwise they are buffered before the flush that writes the state, so both
+            land together.
+        """
+        sequence = live.sequence + 1
+        messages = [replace(message, session_id=live.session_id, sequence=sequence) for message in announce]
+        if self.backend.durable:
+            await self.app.store.game_sessions.set_session_state(live.session_id, state, sequence,
+                                                                 messages=messages)
+            live.state, live.sequence = state, sequence
+        else:
+            live.state, live.sequence = state, sequence
+            for message in messages:
+                self.app.store.write_behind.add_message(message)
+            await self.backend.put(live)
+            self.app.store.write_behind.set_state(live.session_id, state, sequence)
+        if state in CRITICAL_STATES or (messages and not self.backend.durable):
+            await self.app.store.write_behind.flush()
+
+    async def fire(self, live: LiveSession, event: str, announce: Sequence[OutboxMessage] = (),
+                   **context) -> FiredEvent:
+        """
+        Fires an event of the game machine, the new state is stored only if the transition changes it
+
+        :param announce: messages queued in the outbox if the transition happens, see set_state;
+            keyed by the current sequence if the state stays the same
+        :param context: data for guards, e.g. player_id
+        """
+        fired = self.machine.fire(live, event, **context)
+        if fired.transition is None:
+            return fired
+        if fired.changed:
+            await self.set_state(live, fired.transition.target, announce)
+        elif announce:
+            for message in announce:
+                self.app.store.write_behind.add_message(
+                    replace(message, session_id=live.session_id, sequence=live.sequence))
+            await self.app.store.write_behind.flush()
+        return fired
+
+    async def set_question(self, live: LiveSession, question_id: Optional[int],
+                           answerer_id: Optional[int] = None) -> None:
+        live.current_question = question_id
+        live.current_answerer = answerer_id
+        await self.backend.put(live)
+
+    async def award(self, live: LiveSession, player_id: int, points: int) -> None:
+        await self.backend.add_points(live, player_id, points)
+        self.app.store.write_behind.add_points(live.session_id, live.chat_id, player_id, points)
+        await self._written()
+
+    async def mark_answered(self, live: LiveSession, question_id: int) -> None:
+        self.app.store.write_behind.mark_answered(live.session_id, question_id)
+        await self._written()
+
+    async def finish(self, live: LiveSession) -> list[int]:
+        """
+        Writes pending facts, ends the session in Postgres and removes it from the backend
+
+        :return: IDs of winners
+        """
+        await self.app.store.write_behind.flush()
+        winners = await self.app.store.game_sessions.finish_game_session(live.session_id, live.chat_id)
+        live.state = "ended"
+        await self.backend.delete(live.chat_id)
+        return winners
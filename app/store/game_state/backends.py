@@ -0,0 +1,276 @@
+import asyncio
+import typing
+from typing import Any, Optional
+
+from sqlalchemy import select, update
+
+from app.game_session.models import GameSessionModel, LiveSession, PlayersSessions, SessionStateModel
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+class StateBackend:
+    """
+    Storage of LiveSession of running games, at most one per chat
+    """
+
+    # True if the backend keeps state in Postgres itself, so state changes need no separate flush
+    durable = False
+
+    async def connect(self) -> None:
+        return
+
+    async def disconnect(self) -> None:
+        return
+
+    async def get(self, chat_id: int) -> Optional[LiveSession]:
+        raise NotImplementedError
+
+    async def put(self, live: LiveSession) -> None:
+        raise NotImplementedError
+
+    async def delete(self, chat_id: int) -> None:
+        raise NotImplementedError
+
+    async def add_player(self, live: LiveSession, player_id: int) -> bool:
+        """
+        Adds the player with no points, backends shared by processes do it atomically
+
+        :return: False if the player is already in the session
+        """
+        if player_id in live.players:
+            return False
+        live.players[player_id] = 0
+        await self.put(live)
+        return True
+
+    async def add_points(self, live: LiveSession, player_id: int, points: int) -> None:
+        """
+        Adds points to the player, backends shared by processes do it atomically
+        """
+        live.players[player_id] = live.players.get(player_id, 0) + points
+        await self.put(live)
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    Process-local dict, for tests and single-node deployments
+    """
+
+    def __init__(self):
+        self._sessions: dict[int, LiveSession] = {}
+
+    async def get(self, chat_id: int) -> Optional[LiveSession]:
+        return self._sessions.get(chat_id)
+
+    async def put(self, live: LiveSession) -> None:
+        self._sessions[live.chat_id] = live
+
+    async def delete(self, chat_id: int) -> None:
+        self._sessions.pop(chat_id, None)
+
+
+class PostgresStateBackend(StateBackend):
+    """
+    State read from and written to session_states and association_players_sessions directly
+    """
+
+    durable = True
+
+    running = SessionStateModel.state_name != SessionStateModel.states["ended"]
+
+    def __init__(self, app: "Application"):
+        self.app = app
+
+    async def _load(self, chat_id: Optional[int] = None) -> list[LiveSession]:
+        stmt = (
+            select(GameSessionModel.id, GameSessionModel.chat_id, GameSessionModel.creator,
+                   SessionStateModel.state_name, SessionStateModel.current_question,
+                   SessionStateModel.current_answerer, SessionStateModel.sequence)
+            .join(SessionStateModel, SessionStateModel.session_id == GameSessionModel.id)
+            .where(self.running)
+            .order_by(GameSessionModel.id)
+        )
+        if chat_id:
+            stmt = stmt.where(GameSessionModel.chat_id == chat_id)
+        async with self.app.database.session() as session:
+            async with session.begin():
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    return []
+                stmt = select(PlayersSessions).where(PlayersSessions.session_id.in_([row.id for row in rows]))
+                players = (await session.execute(stmt)).scalars().all()
+        # a newer session of a chat replaces an older one
+        sessions = {
+            row.chat_id: LiveSession(
+                session_id=row.id,
+                chat_id=row.chat_id,
+                creator=row.creator,
+                state=SessionStateModel.state_names[row.state_name],
+                current_question=row.current_question,
+                current_answerer=row.current_answerer,
+                sequence=row.sequence,
+            )
+            for row in rows
+        }
+        by_id = {live.session_id: live for live in sessions.values()}
+        for player in players:
+            if player.session_id in by_id:
+                by_id[player.session_id].players[player.player_id] = player.points
+        return list(sessions.values())
+
+    async def load_running(self) -> list[LiveSession]:
+        return await self._load()
+
+    async def get(self, chat_id: int) -> Optional[LiveSession]:
+        sessions = await self._load(chat_id)
+        return sessions[0] if sessions else None
+
+    async def put(self, live: LiveSession) -> None:
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stmt = (
+                    update(SessionStateModel)
+                    .where(SessionStateModel.session_id == live.session_id)
+                    .values(state_name=SessionStateModel.states[live.state],
+                            current_question=live.current_question,
+                            current_answerer=live.current_answerer,
+                            sequence=live.sequence)
+                )
+                await session.execute(stmt)
+
+    async def delete(self, chat_id: int) -> None:
+        # ended sessions are filtered out by state
+        return
+
+
+class KeyValueError(Exception):
+    pass
+
+
+class KeyValueStateBackend(StateBackend):
+    """
+    State kept as a hash per chat in a Redis-protocol server (Redis, KeyDB, a local stand-in),
+    spoken to over a single connection. Players are fields of the hash changed with HSETNX and
+    HINCRBY, so joins and points of concurrent handlers, of this or another bot process, are never lost.
+    """
+
+    scalars = ("session_id", "chat_id", "creator", "state", "current_question", "current_answerer", "sequence")
+    player_prefix = "player:"
+
+    def __init__(self, host: str, port: int, db: int = 0, prefix: str = "quiz:state:"):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.prefix = prefix
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.db:
+            await self.command("SELECT", self.db)
+
+    async def disconnect(self) -> None:
+        if self._writer:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(f"${len(arg)}\r\n".encode() + arg + b"\r\n")
+        return b"".join(parts)
+
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line:
+            raise KeyValueError("connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise KeyValueError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            return [await self._read_reply() for _ in range(int(payload))]
+        raise KeyValueError(f"unexpected reply {line!r}")
+
+    async def pipeline(self, *commands: tuple) -> list[Any]:
+        """
+        Sends commands in one write and reads all their replies, so an error leaves no reply unread
+        """
+        async with self._lock:
+            self._writer.write(b"".join(self._encode(*args) for args in commands))
+            await self._writer.drain()
+            replies = []
+            for _ in commands:
+                try:
+                    replies.append(await self._read_reply())
+                except KeyValueError as e:
+                    replies.append(e)
+        for reply in replies:
+            if isinstance(reply, KeyValueError):
+                raise reply
+        return replies
+
+    async def command(self, *args) -> Any:
+        return (await self.pipeline(args))[0]
+
+    def _key(self, chat_id: int) -> str:
+        return f"{self.prefix}{chat_id}"
+
+    async def get(self, chat_id: int) -> Optional[LiveSession]:
+        reply = await self.command("HGETALL", self._key(chat_id))
+        if not reply:
+            return None
+        fields = {name.decode(): value.decode() for name, value in zip(reply[::2], reply[1::2])}
+        players = {int(name[len(self.player_prefix):]): int(value) for name, value in fields.items()
+                   if name.startswith(self.player_prefix)}
+        return LiveSession(
+            session_id=int(fields["session_id"]),
+            chat_id=int(fields["chat_id"]),
+            creator=int(fields["creator"]),
+            state=fields["state"],
+            current_question=int(fields["current_question"]) if fields["current_question"] else None,
+            current_answerer=int(fields["current_answerer"]) if fields["current_answerer"] else None,
+            players=players,
+            sequence=int(fields["sequence"]),
+        )
+
+    async def put(self, live: LiveSession) -> None:
+        """
+        Overwrites the scalar fields; players are only added, points changed by others are kept
+        """
+        key = self._key(live.chat_id)
+        values = []
+        for name in self.scalars:
+            value = getattr(live, name)
+            values += [name, "" if value is None else value]
+        await self.pipeline(("HSET", key, *values),
+                            *(("HSETNX", key, f"{self.player_prefix}{player_id}", points)
+                              for player_id, points in live.players.items()))
+
+    async def delete(self, chat_id: int) -> None:
+        await self.command("DEL", self._key(chat_id))
+
+    async def add_player(self, live: LiveSession, player_id: int) -> bool:
+        added = await self.command("HSETNX", self._key(live.chat_id), f"{self.player_prefix}{player_id}", 0)
+        live.players.setdefault(player_id, 0)
+        return bool(added)
+
+    async def add_points(self, live: LiveSession, player_id: int, points: int) -> None:
+        live.players[player_id] = await self.command(
+            "HINCRBY", self._key(live.chat_id), f"{self.player_prefix}{player_id}", points)
@@ -0,0 +1,156 @@
+import time
+import typing
+from typing import Optional
+
+from sqlalchemy import Integer, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.base.base_accessor import BaseAccessor
+from app.game_session.models import ArchivedGameSessionModel, GameSessionModel, PlayersSessions, SessionStateModel
+from app.leaderboard.models import GLOBAL_SCOPE, PlayedGame, PlayerStats, PlayerStatsModel
+from app.store.metrics.accessor import timed
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+class LeaderboardAccessor(BaseAccessor):
+    """
+    Per-chat and global player aggregates. They are updated incrementally by GameSessionAccessor in the
+    transaction that awards points, so reading standings never aggregates over historical sessions.
+    Top of every scope is kept in memory after the first read and patched on every update,
+    in processes that run games only: elsewhere updates never reach the cache. Games of other bot
+    processes do not reach it either, so a cached top is read again after TOP_TTL.
+    """
+
+    # size of the top kept in memory per scope
+    TOP_SIZE = 100
+    # seconds a cached top is used
+    TOP_TTL = 30.0
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self._top: dict[int, list[PlayerStats]] = {}
+        # scope -> time.monotonic() of the read
+        self._read_at: dict[int, float] = {}
+        self._cache_top = "write_behind" in app.store.wired
+
+    async def add_to_stats(self, session: AsyncSession, chat_id: int,
+                           rows: list[tuple[int, int, int, int]]) -> list[PlayerStats]:
+        """
+        Adds increments to chat and global stats inside the caller's transaction.
+        Call update_cache with the result once the transaction is committed.
+
+        :param rows: (player_id, games, wins, points) increments
+        :return: updated stats rows
+        """
+        if not rows:
+            return []
+        stmt = insert(PlayerStatsModel).values([
+            {"chat_id": scope, "player_id": player_id, "games": games, "wins": wins, "points": points}
+            for scope in (chat_id, GLOBAL_SCOPE)
+            for player_id, games, wins, points in rows
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PlayerStatsModel.chat_id, PlayerStatsModel.player_id],
+            set_={
+                "games": PlayerStatsModel.games + stmt.excluded.games,
+                "wins": PlayerStatsModel.wins + stmt.excluded.wins,
+                "points": PlayerStatsModel.points + stmt.excluded.points,
+            },
+        ).returning(
+            PlayerStatsModel.chat_id,
+            PlayerStatsModel.player_id,
+            PlayerStatsModel.games,
+            PlayerStatsModel.wins,
+            PlayerStatsModel.points,
+        )
+        result = await session.execute(stmt)
+        return [PlayerStats(**row._mapping) for row in result]
+
+    def update_cache(self, stats: list[PlayerStats]) -> None:
+        for row in stats:
+            top = self._top.get(row.chat_id)
+            if top is None:
+                continue
+            top[:] = [s for s in top if s.player_id != row.player_id]
+            # aggregates only grow, so a row below a full top can never get into it
+            if len(top) < self.TOP_SIZE or row.points > top[-1].points:
+                top.append(row)
+                top.sort(key=lambda s: (-s.points, s.player_id))
+                del top[self.TOP_SIZE:]
+
+    def invalidate(self) -> None:
+        """
+        Drops cached tops, e.g. after the stats were changed bypassing add_to_stats
+        """
+        self._top.clear()
+        self._read_at.clear()
+
+    @timed("db_query_duration_seconds")
+    async def get_top(self, chat_id: Optional[int] = None, limit: int = 10) -> list[PlayerStats]:
+        """
+        :param chat_id: None for the global leaderboard
+        """
+        scope = chat_id or GLOBAL_SCOPE
+        top = self._top.get(scope)
+        if top is not None and time.monotonic() - self._read_at[scope] >= self.TOP_TTL:
+            top = None
+        if top is None:
+            async with self.app.database.session() as session:
+                async with session.begin():
+                    stmt = (
+                        select(PlayerStatsModel)
+                        .where(PlayerStatsModel.chat_id == scope)
+                        .order_by(PlayerStatsModel.points.desc(), PlayerStatsModel.player_id)
+                        .limit(self.TOP_SIZE)
+                    )
+                    result = await session.execute(stmt)
+                    top = [
+                        PlayerStats(chat_id=s.chat_id, player_id=s.player_id, games=s.games, wins=s.wins, points=s.points)
+                        for s in result.scalars()
+                    ]
+            if self._cache_top:
+                self._top[scope] = top
+                self._read_at[scope] = time.monotonic()
+        return top[:limit]
+
+    @timed("db_query_duration_seconds")
+    async def get_player_stats(self, player_id: int, chat_id: Optional[int] = None) -> Optional[PlayerStats]:
+        async with self.app.database.session() as session:
+            async with session.begin():
+                stats = await session.get(PlayerStatsModel, (chat_id or GLOBAL_SCOPE, player_id))
+                if stats:
+                    return PlayerStats(chat_id=stats.chat_id, player_id=stats.player_id,
+                                       games=stats.games, wins=stats.wins, points=stats.points)
+
+    @timed("db_query_duration_seconds")
+    async def get_player_history(self, player_id: int, limit: int = 20) -> list[PlayedGame]:
+        """
+        Ended games of a player, newest first, from both hot tables and archived_game_sessions
+        """
+        hot = (
+            select(GameSessionModel.id.label("session_id"),
+                   GameSessionModel.chat_id,
+                   PlayersSessions.points,
+                   SessionStateModel.ended_at)
+            .join(PlayersSessions, PlayersSessions.session_id == GameSessionModel.id)
+            .join(SessionStateModel, SessionStateModel.session_id == GameSessionModel.id)
+            .where(PlayersSessions.player_id == player_id,
+                   SessionStateModel.state_name == SessionStateModel.states["ended"])
+        )
+        key = str(player_id)
+        archived = (
+            select(ArchivedGameSessionModel.id.label("session_id"),
+                   ArchivedGameSessionModel.chat_id,
+                   ArchivedGameSessionModel.players[key].astext.cast(Integer).label("points"),
+                   ArchivedGameSessionModel.ended_at)
+            .where(ArchivedGameSessionModel.players.has_key(key))
+        )
+        games = union_all(hot, archived).subquery()
+        stmt = select(games).order_by(games.c.ended_at.desc().nulls_last()).limit(limit)
+        async with self.app.database.session() as session:
+            async with session.begin():
+                result = await session.execute(stmt)
+                return [PlayedGame(**row._mapping) for row in result]
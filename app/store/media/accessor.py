@@ -0,0 +1,165 @@
+import asyncio
+import os
+import time
+import typing
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+from aiohttp import ClientSession, ClientTimeout
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.base.base_accessor import BaseAccessor
+from app.game_session.models import PlannedQuestion
+from app.quiz.models import MediaAttachmentModel, QuestionMedia
+from app.store.vk_api.groups import split_chat_id
+from app.store.vk_api.resilience import VkApiError
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+class MediaAccessor(BaseAccessor):
+    """
+    VK attachments of question media. A file is uploaded once per community, its attachment kept in
+    media_attachments and in memory; one older than the configured ttl is uploaded again when next needed.
+    Concurrent requests for the same attachment share one upload.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.media
+        # (question id, tenant) -> attachment and its upload time as a unix timestamp
+        self._attachments: dict[tuple[int, int], tuple[str, float]] = {}
+        self._uploads: dict[tuple[int, int], asyncio.Future] = {}
+        # invalidated, so the attachment stored in the database is not used either
+        self._stale: set[tuple[int, int]] = set()
+
+    def _fresh(self, uploaded_at: float) -> bool:
+        return time.time() - uploaded_at < self.config.ttl
+
+    async def attachment(self, chat_id: int, question: PlannedQuestion) -> Optional[str]:
+        """
+        :return: attachment of the question's media for messages.send to the chat, None if it has no media
+        :raises VkApiError: when the upload fails
+        :raises ClientError, ValueError: when the file cannot be downloaded or is larger than max_size
+        """
+        if question.media is None:
+            return None
+        tenant, _ = split_chat_id(chat_id)
+        key = (question.question_id, tenant)
+        cached = self._attachments.get(key)
+        if cached and self._fresh(cached[1]):
+            self._count("memory")
+            return cached[0]
+        upload = self._uploads.get(key)
+        if upload is None:
+            upload = asyncio.ensure_future(self._load(key, chat_id, question.media))
+            self._uploads[key] = upload
+            upload.add_done_callback(lambda _: self._uploads.pop(key, None))
+        # a cancelled waiter does not cancel the upload others wait for
+        return await asyncio.shield(upload)
+
+    def invalidate(self, chat_id: int, question_id: int) -> None:
+        """
+        Makes the next attachment call upload the media again, e.g. after VK rejected the attachment
+        """
+        tenant, _ = split_chat_id(chat_id)
+        self._attachments.pop((question_id, tenant), None)
+        self._stale.add((question_id, tenant))
+
+    async def ask(self, chat_id: int, question: PlannedQuestion, message: str, **kwargs) -> Optional[int]:
+        """
+        Sends the message asking the question with its media attached. An attachment VK rejects, e.g.
+        deleted from the community, is invalidated and uploaded again once; the message goes without
+        the media if that fails too, or if the media cannot be uploaded.
+
+        :param kwargs: keyboard and random_id for send_message
+        :return: conversation_message_id of the sent message
+        """
+        for _ in range(2):
+            try:
+                attachment = await self.attachment(chat_id, question)
+            except Exception as e:
+                self.logger.error("media of question %s not uploaded", question.question_id, exc_info=e,
+                                  extra={"chat_id": chat_id})
+                break
+            try:
+                return await self.app.store.vk_api.send_message(peer_id=chat_id, message=message,
+                                                                attachment=attachment, **kwargs)
+            except VkApiError as e:
+                self.logger.warning("attachment of question %s rejected: %s", question.question_id, e,
+                                    extra={"chat_id": chat_id})
+                self.invalidate(chat_id, question.question_id)
+        return await self.app.store.vk_api.send_message(peer_id=chat_id, message=message, **kwargs)
+
+    async def prefetch(self, chat_id: int, questions: Iterable[PlannedQuestion]) -> None:
+        """
+        Makes sure attachments of the questions are uploaded, a few at a time; failures are logged
+        and retried when the question is asked
+        """
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+
+        async def fetch(question: PlannedQuestion):
+            async with semaphore:
+                try:
+                    await self.attachment(chat_id, question)
+                except Exception as e:
+                    self.logger.error("media of question %s not uploaded", question.question_id, exc_info=e,
+                                      extra={"chat_id": chat_id})
+
+        await asyncio.gather(*(fetch(question) for question in questions if question.media))
+
+    async def _load(self, key: tuple[int, int], chat_id: int, media: QuestionMedia) -> str:
+        question_id, tenant = key
+        if key not in self._stale:
+            async with self.app.database.session() as session:
+                async with session.begin():
+                    row = (await session.execute(
+                        select(MediaAttachmentModel.attachment, MediaAttachmentModel.uploaded_at)
+                        .where(MediaAttachmentModel.question_id == question_id,
+                               MediaAttachmentModel.tenant == tenant)
+                    )).first()
+            if row and self._fresh(row.uploaded_at.timestamp()):
+                self._attachments[key] = (row.attachment, row.uploaded_at.timestamp())
+                self._count("db")
+                return row.attachment
+
+        data = await self._fetch(media.url)
+        filename = os.path.basename(urlparse(media.url).path) or media.type
+        attachment = await self.app.store.vk_api.upload_media(chat_id, media.type, data, filename)
+        stmt = insert(MediaAttachmentModel).values(question_id=question_id, tenant=tenant, attachment=attachment)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MediaAttachmentModel.question_id, MediaAttachmentModel.tenant],
+            set_={"attachment": stmt.excluded.attachment, "uploaded_at": func.now()},
+        )
+        async with self.app.database.session() as session:
+            async with session.begin():
+                await session.execute(stmt)
+        self._attachments[key] = (attachment, time.time())
+        self._stale.discard(key)
+        self._count("upload")
+        return attachment
+
+    async def _fetch(self, url: str) -> bytes:
+        """
+        Downloads a file from an admin-supplied url, with certificates verified, unlike the VK session,
+        and no more than max_size bytes read whatever Content-Length says
+        """
+        too_large = ValueError(f"{url} is larger than {self.config.max_size} bytes")
+        async with ClientSession(timeout=ClientTimeout(total=self.config.fetch_timeout)) as session:
+            async with session.get(url) as resp:
+                resp.raise_for_status()
+                if resp.content_length is not None and resp.content_length > self.config.max_size:
+                    raise too_large
+                data = bytearray()
+                async for chunk in resp.content.iter_chunked(64 * 1024):
+                    data += chunk
+                    if len(data) > self.config.max_size:
+                        raise too_large
+        return bytes(data)
+
+    def _count(self, source: str) -> None:
+        metrics = self.app.store.metrics
+        if metrics.enabled:
+            metrics.media_attachments.inc(source=source)
@@ -0,0 +1,99 @@
+import time
+import typing
+from functools import wraps
+
+from sqlalchemy import event
+
+from app.base.base_accessor import BaseAccessor
+from app.store.metrics.registry import MetricsRegistry
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+class MetricsAccessor(BaseAccessor):
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.enabled = app.config.metrics.enabled
+        self.registry = MetricsRegistry()
+
+        self.updates_received = self.registry.counter(
+            "vk_updates_received_total", "Updates received from VK long poll", ("type", "group"))
+        self.clicks_absorbed = self.registry.counter(
+            "bot_clicks_absorbed_total", "Repeated button clicks answered without running the handler", ("command",))
+        self.handler_latency = self.registry.histogram(
+            "bot_handler_duration_seconds", "Time spent in bot command handlers", ("handler",))
+        self.vk_requests = self.registry.counter(
+            "vk_api_requests_total", "Requests made to VK API", ("method", "status", "group"))
+        self.vk_latency = self.registry.histogram(
+            "vk_api_request_duration_seconds", "VK API request latency", ("method", "group"))
+        self.vk_retries = self.registry.counter(
+            "vk_api_retries_total", "VK API requests retried after a retryable error", ("method", "kind"))
+        self.vk_shed = self.registry.counter(
+            "vk_api_shed_total", "Optional VK API requests dropped while the circuit was open", ("method", "group"))
+        self.vk_circuit_open = self.registry.gauge(
+            "vk_api_circuit_open", "Whether the circuit breaker of a community is open", ("group",))
+        self.vk_throttled = self.registry.histogram(
+            "vk_api_rate_limit_wait_seconds", "Time VK API requests waited for the community rate limit", ("group",))
+        self.db_sessions = self.registry.counter(
+            "db_sessions_total", "Database connections checked out by sessions")
+        self.db_connections_in_use = self.registry.gauge(
+            "db_connections_in_use", "Database connections currently checked out")
+        self.db_latency = self.registry.histogram(
+            "db_query_duration_seconds", "Time spent in store accessor methods", ("method",))
+        self.write_behind_flush_latency = self.registry.histogram(
+            "write_behind_flush_duration_seconds", "Time spent writing a write-behind batch")
+        self.write_behind_batch_size = self.registry.histogram(
+            "write_behind_batch_events", "Events written by a write-behind flush",
+            buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+        self.outbox_messages = self.registry.counter(
+            "outbox_messages_total", "Outbox messages by delivery result: sent, failed (retried later) or dropped",
+            ("result",))
+        self.media_attachments = self.registry.counter(
+            "media_attachments_total", "Question media attachments by where they came from: memory, db or upload",
+            ("source",))
+        self.active_games = self.registry.gauge(
+            "game_sessions_active", "Game sessions that are not ended")
+
+    async def connect(self, app: "Application"):
+        if not self.enabled:
+            return
+        pool = app.database._engine.sync_engine.pool
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+
+    def _on_checkout(self, *_) -> None:
+        self.db_sessions.inc()
+        self.db_connections_in_use.inc()
+
+    def _on_checkin(self, *_) -> None:
+        self.db_connections_in_use.dec()
+
+    async def render(self) -> str:
+        self.active_games.set(await self.app.store.game_sessions.count_running_sessions())
+        return self.registry.render()
+
+
+def timed(metric: str, label: str = "method"):
+    """
+    Decorator for accessor and handler coroutines: records call duration into the histogram
+    registered under the given metric name. Does nothing but a flag check when metrics are disabled.
+
+    :param metric: name of the histogram in MetricsAccessor.registry
+    :param label: label name to put the qualified name of the decorated function into
+    """
+    def decorator(func):
+        name = func.__qualname__
+
+        @wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            metrics = self.app.store.metrics
+            if not metrics.enabled:
+                return await func(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                metrics.registry.get(metric).observe(time.perf_counter() - started, **{label: name})
+        return wrapper
+    return decorator
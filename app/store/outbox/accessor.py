@@ -0,0 +1,155 @@
+import asyncio
+import datetime
+import typing
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, exists, insert, or_, select, update, func
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.base.base_accessor import BaseAccessor
+from app.outbox.models import OutboxMessage, OutboxModel, PendingMessage
+from app.store.vk_api.idempotency import message_random_id
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+class OutboxAccessor(BaseAccessor):
+    """
+    Durable queue of bot messages. Messages are inserted in the transaction of the state change they
+    announce, then delivered right after the commit by the handler that made the change; whatever is
+    left, e.g. after a crash or a VK outage, is delivered by the background sender. Delivery is
+    at-least-once: a message is deleted only after VK accepted it, and a repeated delivery reuses
+    its random_id, so VK drops it, or the send journal of VkApiAccessor skips it.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.outbox
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self, app: "Application"):
+        self._wakeup = asyncio.Event()
+        # the first run delivers what the previous process left
+        self._wakeup.set()
+        self._task = asyncio.create_task(self._deliver_forever())
+
+    async def disconnect(self, app: "Application"):
+        if self._task:
+            self._task.cancel()
+
+    @staticmethod
+    async def add(session: AsyncSession, messages: Iterable[OutboxMessage]) -> None:
+        """
+        Queues messages inside the caller's transaction
+        """
+        rows = [{"chat_id": m.chat_id, "message": m.message, "keyboard": m.keyboard, "attempts": 0,
+                 "random_id": None if m.template is None or m.session_id is None
+                 else message_random_id(m.chat_id, m.session_id, m.sequence, m.template)}
+                for m in messages]
+        if rows:
+            await session.execute(insert(OutboxModel), rows)
+
+    async def enqueue(self, messages: Iterable[OutboxMessage]) -> None:
+        """
+        Queues messages that announce no state change in a transaction of their own
+        """
+        async with self.app.database.session() as session:
+            async with session.begin():
+                await self.add(session, messages)
+
+    def wake(self) -> None:
+        """
+        Makes the background sender run now, e.g. after messages were committed without a delivery
+        """
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _deliver_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.config.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.deliver()
+            except Exception as e:
+                self.logger.error("Exception in outbox delivery", exc_info=e)
+
+    async def _claim(self, chat_id: Optional[int]) -> list[PendingMessage]:
+        """
+        Leases the oldest message of every chat; a message is never claimed while an older one of its
+        chat is queued, sent, leased after a failure or not, so the chat keeps its order
+        """
+        now = func.now()
+        older = aliased(OutboxModel)
+        candidates = (
+            select(OutboxModel.id)
+            .where(or_(OutboxModel.locked_until.is_(None), OutboxModel.locked_until < now))
+            .where(~exists().where(older.chat_id == OutboxModel.chat_id, older.id < OutboxModel.id))
+            .order_by(OutboxModel.id)
+            .limit(self.config.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if chat_id is not None:
+            candidates = candidates.where(OutboxModel.chat_id == chat_id)
+        stmt = (
+            update(OutboxModel)
+            .where(OutboxModel.id.in_(candidates.scalar_subquery()))
+            .values(locked_until=now + datetime.timedelta(seconds=self.config.lease),
+                    attempts=OutboxModel.attempts + 1)
+            .returning(OutboxModel.id, OutboxModel.chat_id, OutboxModel.message, OutboxModel.keyboard,
+                       func.coalesce(OutboxModel.random_id, OutboxModel.id).label("random_id"),
+                       OutboxModel.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.app.database.session() as session:
+            async with session.begin():
+                result = await session.execute(stmt)
+                return [PendingMessage(**row._mapping) for row in result]
+
+    async def deliver(self, chat_id: Optional[int] = None) -> int:
+        """
+        Sends queued messages, of one chat or of all chats, in order within every chat. Every round
+        sends the oldest message of each chat; a chat whose message failed waits for the lease to
+        expire, and its newer messages wait behind it
+
+        :return: number of messages claimed
+        """
+        claimed = 0
+        while True:
+            pending = await self._claim(chat_id)
+            if not pending:
+                break
+            claimed += len(pending)
+            results = await asyncio.gather(*(self._send(message) for message in pending))
+
+            sent = [message.id for message, ok in zip(pending, results) if ok]
+            failed = [message for message, ok in zip(pending, results) if not ok]
+            dropped = [message for message in failed if message.attempts >= self.config.max_attempts]
+            for message in dropped:
+                self.logger.error("outbox message %s dropped after %s attempts", message.id, message.attempts,
+                                  extra={"chat_id": message.chat_id})
+            done = sent + [message.id for message in dropped]
+            if done:
+                async with self.app.database.session() as session:
+                    async with session.begin():
+                        await session.execute(delete(OutboxModel).where(OutboxModel.id.in_(done)))
+
+            metrics = self.app.store.metrics
+            if metrics.enabled:
+                metrics.outbox_messages.inc(len(sent), result="sent")
+                metrics.outbox_messages.inc(len(failed) - len(dropped), result="failed")
+                metrics.outbox_messages.inc(len(dropped), result="dropped")
+            if not done:
+                break
+        return claimed
+
+    async def _send(self, message: PendingMessage) -> bool:
+        conversation_message_id = await self.app.store.vk_api.send_message(
+            peer_id=message.chat_id, message=message.message, keyboard=message.keyboard,
+            random_id=message.random_id)
+        return conversation_message_id is not None
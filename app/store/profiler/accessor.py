@@ -0,0 +1,115 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import traceback
+import typing
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from app.base.base_accessor import BaseAccessor
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+@dataclass
+class SlowCallbackSample:
+    detected_at: float
+    duration: float
+    stack: list[str]
+
+
+class ProfilerAccessor(BaseAccessor):
+    """
+    Loop lag monitor: a task sleeps for lag_interval and records how late it wakes up.
+    Slow callback detector: a watchdog thread notices when that task has not ticked for longer than
+    slow_callback_threshold and takes a stack sample of the loop thread while it is still blocked.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.profiler
+        self.samples: deque[SlowCallbackSample] = deque(maxlen=self.config.max_samples)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.profiling = False
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lag_histogram = None
+
+    async def connect(self, app: "Application"):
+        if not self.config.enabled:
+            return
+        self._lag_histogram = app.store.metrics.registry.histogram(
+            "event_loop_lag_seconds", "Delay of event loop wake-ups over the expected time")
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._monitor_task = asyncio.create_task(self._monitor_lag())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def disconnect(self, app: "Application"):
+        self._stopped.set()
+        if self._monitor_task:
+            self._monitor_task.cancel()
+        if self._watchdog:
+            self._watchdog.join()
+
+    async def _monitor_lag(self):
+        interval = self.config.lag_interval
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.last_lag = max(now - expected, 0.0)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            if self.app.store.metrics.enabled:
+                self._lag_histogram.observe(self.last_lag)
+
+    def _watch(self):
+        threshold = self.config.slow_callback_threshold
+        allowed = self.config.lag_interval + threshold
+        sampled_heartbeat = None
+        while not self._stopped.wait(threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat
+            # one sample per stall: the heartbeat does not move until the loop is free again
+            if stalled > allowed and heartbeat != sampled_heartbeat:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is None:
+                    continue
+                sampled_heartbeat = heartbeat
+                self.samples.append(SlowCallbackSample(
+                    detected_at=time.time(),
+                    duration=stalled - self.config.lag_interval,
+                    stack=traceback.format_stack(frame),
+                ))
+                self.logger.warning("event loop blocked for at least %.3fs", stalled - self.config.lag_interval)
+
+    async def profile(self, seconds: float, sort: str = "cumulative", limit: int = 50) -> str:
+        """
+        Runs cProfile on the loop thread for the given time window. Every coroutine and callback
+        executed by the loop during the window is included.
+
+        :return: pstats report as text
+        """
+        self.profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+            self.profiling = False
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
@@ -2,24 +2,31 @@ from typing import Optional
 import logging
 from sqlalchemy import select, delete, text
 from app.base.base_accessor import BaseAccessor
+from app.store.metrics.accessor import timed
+from app.store.read_cache.accessor import ReadCacheAccessor
 from app.quiz.models import (
     Answer, AnswerModel,
-    Question, QuestionModel,
+    Question, QuestionMedia, QuestionModel,
     Theme, ThemeModel
 )
 
 
 class QuizAccessor(BaseAccessor):
+    @timed("db_query_duration_seconds")
     async def create_theme(self, title: str) -> Theme:
         async with self.app.database.session() as session:
             async with session.begin():
                 theme = ThemeModel(title=title)
                 session.add(theme)
+                await ReadCacheAccessor.bump(session)
+        self.app.store.read_cache.invalidate()
 
         theme = Theme(id=theme.id, title=theme.title)
+        self.app.store.search.add_theme(theme)
         return theme
 
 
+    @timed("db_query_duration_seconds")
     async def get_theme_by_title(self, title: str) -> Optional[Theme]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -30,6 +37,7 @@ class QuizAccessor(BaseAccessor):
                     return Theme(id=theme.id, title=theme.title)
 
 
+    @timed("db_query_duration_seconds")
     async def get_theme_by_id(self, id: int) -> Optional[Theme]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -40,6 +48,7 @@ class QuizAccessor(BaseAccessor):
                     return Theme(id=theme.id, title=theme.title)
 
 
+    @timed("db_query_duration_seconds")
     async def list_themes(self) -> list[Theme]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -53,6 +62,7 @@ class QuizAccessor(BaseAccessor):
         return [Answer(title=a['title'], is_correct=a['is_correct']) for a in answers]
 
 
+    @timed("db_query_duration_seconds")
     async def create_answers(
         self, question_id: int, answers: list[Answer]
     ) -> list[Answer]:
@@ -64,24 +74,38 @@ class QuizAccessor(BaseAccessor):
                     is_correct=a.is_correct
                 ) for a in answers]
                 session.add_all(list_to_add)
+                # cached question lists must not show a question without its answers
+                await ReadCacheAccessor.bump(session)
+        self.app.store.read_cache.invalidate()
         return answers
 
 
+    @timed("db_query_duration_seconds")
     async def create_question(
-        self, title: str, theme_id: int, points: int, answers: list[Answer]
+        self, title: str, theme_id: int, points: int, answers: list[Answer], media: Optional[QuestionMedia] = None
     ) -> Question:
 
         async with self.app.database.session() as session:
             async with session.begin():
-                question = QuestionModel(title=title, points=points, theme_id=theme_id)
+                question = QuestionModel(title=title, points=points, theme_id=theme_id,
+                                         media_type=media.type if media else None,
+                                         media_url=media.url if media else None)
                 session.add(question)
 
         await self.create_answers(question_id=question.id, answers=answers)
-        question = Question(id=question.id, title=question.title, theme_id=question.theme_id, answers=answers)
+        question = Question(id=question.id, title=question.title, theme_id=question.theme_id, points=question.points,
+                            answers=answers, media=media)
+        self.app.store.search.add_question(question)
 
         return question
 
 
+    @staticmethod
+    def _media(question: QuestionModel) -> Optional[QuestionMedia]:
+        if question.media_type:
+            return QuestionMedia(type=question.media_type, url=question.media_url)
+
+    @timed("db_query_duration_seconds")
     async def get_question_by_title(self, title: str) -> Optional[Question]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -93,9 +117,11 @@ class QuizAccessor(BaseAccessor):
                     result = await session.execute(stmt)
                     curr = result.scalars()
                     answers = [Answer(is_correct=a.is_correct, title=a.title) for a in curr]
-                    return Question(id=q.id, title=q.title, theme_id=q.theme_id, answers=answers)
+                    return Question(id=q.id, title=q.title, theme_id=q.theme_id, points=q.points, answers=answers,
+                                    media=self._media(q))
 
 
+    @timed("db_query_duration_seconds")
     async def list_questions(self, theme_id: Optional[int] = None) -> list[Question]:
         async with self.app.database.session() as session:
             async with session.begin():
@@ -110,5 +136,6 @@ class QuizAccessor(BaseAccessor):
                     result = await session.execute(stmt)
                     curr = result.scalars()
                     answers = [Answer(is_correct=a.is_correct, title=a.title) for a in curr]
-                    question_list.append(Question(title=q.title, id=q.id, theme_id=q.theme_id, answers=answers))
+                    question_list.append(Question(title=q.title, id=q.id, theme_id=q.theme_id, points=q.points,
+                                                  answers=answers, media=self._media(q)))
                 return question_list
@@ -0,0 +1,92 @@
+import time
+import typing
+from hashlib import blake2b
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.base.base_accessor import BaseAccessor
+from app.read_cache.models import CacheVersionModel
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+# version row of the question bank: themes, questions and answers
+QUIZ = "quiz"
+
+
+class ReadCacheAccessor(BaseAccessor):
+    """
+    Serialized responses of rarely changing reads, kept as bytes with their ETag. Writers bump a version
+    row in their transaction; readers compare it with the version their entries were built at, rereading
+    the row at most every check_interval seconds, so other processes see a change within that time and
+    this process right away.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.read_cache
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        # key -> body and ETag, all built at self._version
+        self._entries: dict[str, tuple[bytes, str]] = {}
+
+    @staticmethod
+    async def bump(session: AsyncSession, name: str = QUIZ) -> None:
+        """
+        Increments the version inside the caller's transaction; call invalidate once it is committed
+        """
+        stmt = insert(CacheVersionModel).values(name=name, version=1)
+        stmt = stmt.on_conflict_do_update(index_elements=[CacheVersionModel.name],
+                                          set_={"version": CacheVersionModel.version + 1})
+        await session.execute(stmt)
+
+    def invalidate(self) -> None:
+        """
+        Makes the next read check the version
+        """
+        self._checked_at = 0.0
+
+    def clear(self) -> None:
+        """
+        Drops entries and the known version, e.g. after the tables were truncated and versions started over
+        """
+        self._entries.clear()
+        self._version = None
+        self._checked_at = 0.0
+
+    async def version(self) -> int:
+        if time.monotonic() - self._checked_at < self.config.check_interval and self._version is not None:
+            return self._version
+        async with self.app.database.session() as session:
+            async with session.begin():
+                version = (await session.execute(
+                    select(CacheVersionModel.version).where(CacheVersionModel.name == QUIZ))).scalar() or 0
+        self._checked_at = time.monotonic()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        return version
+
+    async def get(self, key: str, build: Callable[[], Awaitable[bytes]]) -> tuple[bytes, str]:
+        """
+        :param build: makes the response body when the entry is missing or outdated
+        :return: body and its ETag
+        """
+        if not self.config.enabled:
+            body = await build()
+            return body, f'"{blake2b(body, digest_size=8).hexdigest()}"'
+        version = await self.version()
+        entry = self._entries.get(key)
+        if entry is None:
+            body = await build()
+            # the digest keeps ETags apart when versions start over, e.g. on a new database
+            entry = (body, f'"{version}-{blake2b(body, digest_size=8).hexdigest()}"')
+            # built while another request saw a newer version
+            if version == self._version:
+                if len(self._entries) >= self.config.max_entries:
+                    self._entries.clear()
+                self._entries[key] = entry
+        return entry
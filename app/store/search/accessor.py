@@ -0,0 +1,67 @@
+import typing
+from dataclasses import dataclass
+from typing import Optional
+
+from app.base.base_accessor import BaseAccessor
+from app.quiz.models import Question, SearchHit, Theme
+from app.store.metrics.accessor import timed
+from app.store.search.backends import MemorySearchBackend, PostgresSearchBackend, SearchBackend
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+BACKENDS = ("postgres", "memory")
+
+
+@dataclass
+class SearchPage:
+    hits: list[SearchHit]
+    page: int
+    # None on the last page
+    next_page: Optional[int]
+
+
+class SearchAccessor(BaseAccessor):
+    """
+    Search over question and theme titles for admins, and near-duplicate detection of new questions.
+    Pages are fetched one hit past their size to tell whether another page exists, without counting matches.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.search
+        self.backend = self._make_backend()
+
+    def _make_backend(self) -> SearchBackend:
+        if self.config.backend == "postgres":
+            return PostgresSearchBackend(self.app)
+        if self.config.backend == "memory":
+            return MemorySearchBackend(self.app)
+        raise ValueError(f"unknown search backend {self.config.backend}, expected one of {BACKENDS}")
+
+    @timed("db_query_duration_seconds")
+    async def search(self, text: str, kind: str = "questions", theme_id: Optional[int] = None,
+                     page: int = 1, page_size: Optional[int] = None) -> SearchPage:
+        """
+        :param kind: "questions" or "themes"
+        :param theme_id: only questions of the theme
+        :param page: starting from 1
+        """
+        page_size = min(page_size or self.config.page_size, self.config.max_page_size)
+        hits = await self.backend.search(kind, text, theme_id, limit=page_size + 1, offset=(page - 1) * page_size)
+        more = len(hits) > page_size
+        return SearchPage(hits=hits[:page_size], page=page, next_page=page + 1 if more else None)
+
+    @timed("db_query_duration_seconds")
+    async def duplicates(self, title: str, limit: int = 5) -> list[SearchHit]:
+        """
+        :return: existing questions with titles similar enough to title to be the same question
+        """
+        return await self.backend.similar(title, self.config.duplicate_threshold, limit)
+
+    def add_question(self, question: Question) -> None:
+        self.backend.add("questions", SearchHit(id=question.id, title=question.title, score=0.0,
+                                                theme_id=question.theme_id))
+
+    def add_theme(self, theme: Theme) -> None:
+        self.backend.add("themes", SearchHit(id=theme.id, title=theme.title, score=0.0))
@@ -0,0 +1,175 @@
+import asyncio
+import re
+import typing
+from typing import Optional
+
+from sqlalchemy import func, literal_column, or_, select
+
+from app.quiz.models import QuestionModel, SearchHit, ThemeModel
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+# kind -> model with a searchable title
+KINDS = {"questions": QuestionModel, "themes": ThemeModel}
+
+_WORD = re.compile(r"\w+")
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """
+    Trigrams the way pg_trgm extracts them: of every lowercased word padded with two spaces in front
+    and one at the end
+    """
+    result = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SearchBackend:
+    """
+    Ranked title search over questions and themes. A title matches by trigram similarity, by containing
+    all words of the query, or by containing the query as a substring.
+    """
+
+    async def search(self, kind: str, text: str, theme_id: Optional[int], limit: int, offset: int) -> list[SearchHit]:
+        """
+        :return: hits best first
+        """
+        raise NotImplementedError
+
+    async def similar(self, title: str, threshold: float, limit: int) -> list[SearchHit]:
+        """
+        :return: questions whose titles have at least threshold trigram similarity to title, best first
+        """
+        raise NotImplementedError
+
+    def add(self, kind: str, hit: SearchHit) -> None:
+        """
+        Called after a question or theme is created
+        """
+        return
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    pg_trgm and full-text search; titles are matched through GIN indexes on the trigrams
+    and on to_tsvector('simple', title), see migration 7c2e9f4b1d58
+    """
+
+    # the index expression, spelled the same so the planner uses the index
+    TS_CONFIG = literal_column("'simple'::regconfig")
+
+    def __init__(self, app: "Application"):
+        self.app = app
+
+    async def search(self, kind: str, text: str, theme_id: Optional[int], limit: int, offset: int) -> list[SearchHit]:
+        model = KINDS[kind]
+        vector = func.to_tsvector(self.TS_CONFIG, model.title)
+        query = func.plainto_tsquery(self.TS_CONFIG, text)
+        score = func.greatest(func.similarity(model.title, text), func.ts_rank(vector, query)).label("score")
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        theme_column = model.theme_id if model is QuestionModel else literal_column("NULL")
+        stmt = (
+            select(model.id, model.title, theme_column.label("theme_id"), score)
+            .where(or_(model.title.op("%")(text), vector.op("@@")(query), model.title.ilike(f"%{escaped}%")))
+            .order_by(score.desc(), model.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        if theme_id is not None and model is QuestionModel:
+            stmt = stmt.where(QuestionModel.theme_id == theme_id)
+        async with self.app.database.session() as session:
+            async with session.begin():
+                rows = (await session.execute(stmt)).all()
+        return [SearchHit(id=row.id, title=row.title, score=row.score, theme_id=row.theme_id) for row in rows]
+
+    async def similar(self, title: str, threshold: float, limit: int) -> list[SearchHit]:
+        score = func.similarity(QuestionModel.title, title).label("score")
+        stmt = (
+            select(QuestionModel.id, QuestionModel.title, QuestionModel.theme_id, score)
+            .where(QuestionModel.title.op("%")(title))
+            .order_by(score.desc())
+            .limit(limit)
+        )
+        async with self.app.database.session() as session:
+            async with session.begin():
+                # the threshold of the % operator, which the index scan applies
+                await session.execute(select(func.set_config("pg_trgm.similarity_threshold", str(threshold), True)))
+                rows = (await session.execute(stmt)).all()
+        return [SearchHit(id=row.id, title=row.title, score=row.score, theme_id=row.theme_id) for row in rows]
+
+
+class MemorySearchBackend(SearchBackend):
+    """
+    Trigram index in process memory, for tests and databases without pg_trgm. Titles are read from
+    Postgres on first use and kept up to date only with questions and themes created by this process.
+    """
+
+    def __init__(self, app: "Application"):
+        self.app = app
+        # kind -> id -> hit with the title, its trigrams and words
+        self._entries: dict[str, dict[int, tuple[SearchHit, frozenset[str], frozenset[str]]]] = {
+            kind: {} for kind in KINDS
+        }
+        # kind -> trigram -> ids of titles having it
+        self._postings: dict[str, dict[str, set[int]]] = {kind: {} for kind in KINDS}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def _load(self) -> None:
+        async with self._lock:
+            if self._loaded:
+                return
+            async with self.app.database.session() as session:
+                async with session.begin():
+                    questions = (await session.execute(
+                        select(QuestionModel.id, QuestionModel.title, QuestionModel.theme_id))).all()
+                    themes = (await session.execute(select(ThemeModel.id, ThemeModel.title))).all()
+            for row in questions:
+                self.add("questions", SearchHit(id=row.id, title=row.title, score=0.0, theme_id=row.theme_id))
+            for row in themes:
+                self.add("themes", SearchHit(id=row.id, title=row.title, score=0.0))
+            self._loaded = True
+
+    def add(self, kind: str, hit: SearchHit) -> None:
+        grams = trigrams(hit.title)
+        self._entries[kind][hit.id] = (hit, grams, frozenset(_WORD.findall(hit.title.lower())))
+        for gram in grams:
+            self._postings[kind].setdefault(gram, set()).add(hit.id)
+
+    def _scored(self, kind: str, text: str, threshold: float) -> list[SearchHit]:
+        grams = trigrams(text)
+        words = frozenset(_WORD.findall(text.lower()))
+        lowered = text.lower()
+        postings = self._postings[kind]
+        candidates = set().union(*(postings.get(gram, ()) for gram in grams)) if grams else set()
+        hits = []
+        for id in candidates:
+            hit, title_grams, title_words = self._entries[kind][id]
+            score = similarity(grams, title_grams)
+            if score >= threshold or (words and words <= title_words) or lowered in hit.title.lower():
+                hits.append(SearchHit(id=hit.id, title=hit.title, score=score, theme_id=hit.theme_id))
+        hits.sort(key=lambda hit: (-hit.score, hit.id))
+        return hits
+
+    async def search(self, kind: str, text: str, theme_id: Optional[int], limit: int, offset: int) -> list[SearchHit]:
+        await self._load()
+        # pg_trgm.similarity_threshold default
+        hits = self._scored(kind, text, 0.3)
+        if theme_id is not None and kind == "questions":
+            hits = [hit for hit in hits if hit.theme_id == theme_id]
+        return hits[offset:offset + limit]
+
+    async def similar(self, title: str, threshold: float, limit: int) -> list[SearchHit]:
+        await self._load()
+        hits = [hit for hit in self._scored("questions", title, threshold) if hit.score >= threshold]
+        return hits[:limit]
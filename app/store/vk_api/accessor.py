@@ -1,13 +1,22 @@
+import asyncio
 import random
+import time
 import typing
 from typing import Optional
 
-from aiohttp import TCPConnector
+from urllib.parse import quote
+
+from aiohttp import ClientError, ClientTimeout, FormData, TCPConnector
 from aiohttp.client import ClientSession
 
 from app.base.base_accessor import BaseAccessor
+from app.web import codec
 from app.web.utils import make_update_from_raw
+from app.store.vk_api.dataclasses import Update
+from app.store.vk_api.groups import RateLimiter, VkGroup, scope_chat_id, split_chat_id
+from app.store.vk_api.idempotency import SendJournal
 from app.store.vk_api.poller import Poller
+from app.store.vk_api.resilience import ATTACHMENT_CODES, CircuitBreaker, CircuitShed, VkApiError, backoff
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application
@@ -16,115 +25,369 @@ API_PATH = "https://api.vk.com/method/"
 
 
 class VkApiAccessor(BaseAccessor):
+    """
+    Serves every configured community: one long poll server and poller per community, all sharing
+    one ClientSession connection pool. Chat ids passed to and from the rest of the app are scoped
+    by tenant, see app.store.vk_api.groups.
+    """
+
     def __init__(self, app: "Application", *args, **kwargs):
         super().__init__(app, *args, **kwargs)
         self.session: Optional[ClientSession] = None
-        self.key: Optional[str] = None
-        self.server: Optional[str] = None
-        self.poller: Optional[Poller] = None
-        self.ts: Optional[int] = None
+        # tenant -> community
+        client = app.config.vk_client
+        self.groups: dict[int, VkGroup] = {
+            config.tenant: VkGroup(config=config,
+                                   limiter=RateLimiter(config.rate_limit),
+                                   breaker=CircuitBreaker(client.failure_threshold, client.reset_timeout))
+            for config in app.config.bot.all_groups
+        }
+        self.journal: Optional[SendJournal] = (
+            SendJournal(client.journal, client.journal_retention) if client.journal else None
+        )
+        app.startup_pipeline.defer(self.start_polling)
 
     async def connect(self, app: "Application"):
         self.session = ClientSession(connector=TCPConnector(verify_ssl=False))
+        if self.journal:
+            self.journal.open()
+
+    async def start_polling(self, app: "Application"):
+        """
+        Deferred until the server is up: neither the long poll handshake nor restoring chats blocks startup
+        """
         await self.app.store.bots_manager.do_things_on_start()
+        await asyncio.gather(*(self._start_group(group) for group in self.groups.values()))
+
+    async def _start_group(self, group: VkGroup):
         try:
-            await self._get_long_poll_service()
+            await self._get_long_poll_service(group)
         except Exception as e:
             self.logger.error("Exception", exc_info=e)
-        self.poller = Poller(app.store)
-        self.logger.info("start polling")
-        await self.poller.start()
+        group.poller = Poller(self.app.store, group)
+        self.logger.info("start polling group %s", group.config.group_id)
+        await group.poller.start()
 
     async def disconnect(self, app: "Application"):
-        if self.poller:
-            await self.poller.stop()
+        for group in self.groups.values():
+            if group.poller:
+                await group.poller.stop()
         if self.session:
             await self.session.close()
+        if self.journal:
+            self.journal.close()
+
+    def group_of(self, chat_id: int) -> tuple[VkGroup, int]:
+        """
+        :return: community of a stored chat id and the chat's VK peer id
+        """
+        tenant, peer_id = split_chat_id(chat_id)
+        group = self.groups.get(tenant)
+        if group is None:
+            raise ValueError(f"chat {chat_id} belongs to tenant {tenant} which is not configured")
+        return group, peer_id
+
+    @property
+    def primary(self) -> VkGroup:
+        return self.groups[0]
 
     @staticmethod
     def _build_query(host: str, method: str, params: dict) -> str:
         url = host + method + "?"
         if "v" not in params:
             params["v"] = "5.131"
-        url += "&".join([f"{k}={v}" for k, v in params.items()])
+        url += "&".join([f"{k}={quote(str(v), safe='')}" for k, v in params.items()])
         return url
 
-    async def _get_long_poll_service(self):
-        async with self.session.get(
-            self._build_query(
-                host=API_PATH,
-                method="groups.getLongPollServer",
-                params={
-                    "group_id": self.app.config.bot.group_id,
-                    "access_token": self.app.config.bot.token,
-                },
-            )
-        ) as resp:
-            data = (await resp.json())["response"]
-            self.logger.info(data)
-            self.key = data["key"]
-            self.server = data["server"]
-            self.ts = data["ts"]
-            self.logger.info(self.server)
-
-    async def poll(self):
-        async with self.session.get(
-            self._build_query(
-                host=self.server,
-                method="",
-                params={
-                    "act": "a_check",
-                    "key": self.key,
-                    "ts": self.ts,
-                    "wait": 25,
-                },
-            )
-        ) as resp:
-            data = await resp.json()
-            self.logger.info(data)
-            self.ts = data["ts"]
-            raw_updates = data.get("updates", [])
-            updates = []
-            for update in raw_updates:
-
-                try:
-                    update = make_update_from_raw(update)
-                    updates.append(update)
-                except KeyError as e:
-                    self.logger.error("Error in function make_update_from_raw: some key not found.\n", e)
-            await self.app.store.bots_manager.handle_updates(updates)
-
-    async def get_user_name(self, id: int):
+    async def _request(self, host: str, method: str, params: dict, name: Optional[str] = None,
+                       group: Optional[VkGroup] = None, limited: bool = True, optional: bool = False) -> dict:
+        """
+        Makes GET request to VK and returns decoded json. Every attempt has the method's timeout, retryable
+        errors are retried with jittered exponential backoff. Latency and errors are recorded per method
+        and community if metrics are enabled.
+
+        :param name: method name for timeouts and metrics, defaults to method
+        :param group: community of the request, its circuit breaker counts the request's failures
+        :param limited: whether the request uses the community token and waits for its rate limit
+        :param optional: whether the request is shed while the community's circuit is open
+        :raises VkApiError: when the error is not retryable or retries are exhausted
+        :raises CircuitShed: when an optional request is shed
+        """
+        name = name or method
+        config = self.app.config.vk_client
+        metrics = self.app.store.metrics
+        if optional and group and not group.breaker.allow():
+            if metrics.enabled:
+                metrics.vk_shed.inc(method=name, group=group.config.group_id)
+            raise CircuitShed(name)
+        if group and limited:
+            params["access_token"] = group.config.token
+
+        attempt = 0
+        while True:
+            try:
+                data = await self._attempt(host, method, params, name, group, limited)
+            except VkApiError as e:
+                if group:
+                    group.breaker.record(not e.outage)
+                    if metrics.enabled:
+                        metrics.vk_circuit_open.set(int(group.breaker.is_open), group=group.config.group_id)
+                if not e.retryable or attempt >= config.retries:
+                    raise
+                if metrics.enabled:
+                    metrics.vk_retries.inc(method=name, kind=e.kind)
+                await asyncio.sleep(backoff(attempt, config.backoff_base, config.backoff_max))
+                attempt += 1
+                continue
+            if group:
+                group.breaker.record(True)
+                if metrics.enabled:
+                    metrics.vk_circuit_open.set(0, group=group.config.group_id)
+            return data
+
+    async def _attempt(self, host: str, method: str, params: dict, name: str,
+                       group: Optional[VkGroup], limited: bool) -> dict:
+        metrics = self.app.store.metrics
+        group_id = group.config.group_id if group else ""
+        if group and limited:
+            waited = await group.limiter.acquire()
+            if metrics.enabled:
+                metrics.vk_throttled.observe(waited, group=group_id)
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            timeout = ClientTimeout(total=self.app.config.vk_client.timeout(name))
+            async with self.session.get(self._build_query(host, method, params), timeout=timeout) as resp:
+                body = await resp.read()
+                if resp.status >= 500:
+                    raise VkApiError("server", f"HTTP {resp.status}")
+            data = codec.loads(body)
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise VkApiError("network", repr(e)) from e
+        except ValueError as e:
+            raise VkApiError("server", f"unreadable response: {e}") from e
+        else:
+            if "error" in data:
+                raise VkApiError.from_payload(data["error"])
+            if "failed" not in data:
+                status = "ok"
+            return data
+        finally:
+            if metrics.enabled:
+                metrics.vk_latency.observe(time.perf_counter() - started, method=name, group=group_id)
+                metrics.vk_requests.inc(method=name, status=status, group=group_id)
+
+    async def _get_long_poll_service(self, group: VkGroup):
+        data = await self._request(
+            host=API_PATH,
+            method="groups.getLongPollServer",
+            params={
+                "group_id": group.config.group_id,
+            },
+            group=group,
+        )
+        data = data["response"]
+        self.logger.info(data)
+        group.key = data["key"]
+        group.server = data["server"]
+        group.ts = data["ts"]
+        self.logger.info(group.server)
+
+    async def poll(self, group: VkGroup):
+        if group.server is None:
+            await self._get_long_poll_service(group)
+        data = await self._request(
+            host=group.server,
+            method="",
+            params={
+                "act": "a_check",
+                "key": group.key,
+                "ts": group.ts,
+                "wait": 25,
+            },
+            name="a_check",
+            group=group,
+            limited=False,
+        )
+        self.logger.debug("poll response: %s", data)
+        if "failed" in data:
+            # 1: events were lost, continue from the given ts; 2: key expired; 3: key and ts are lost
+            if data["failed"] == 1:
+                group.ts = data["ts"]
+            else:
+                self.logger.warning("long poll failed with %s, requesting a new server", data["failed"])
+                await self._get_long_poll_service(group)
+            return
+        group.ts = data["ts"]
+        raw_updates = data.get("updates", [])
+        updates = []
+        for update in raw_updates:
+
+            try:
+                update = make_update_from_raw(update)
+                self._scope(update, group.tenant)
+                updates.append(update)
+            except KeyError as e:
+                self.logger.error("Error in function make_update_from_raw: some key not found.\n", e)
+        await self.app.store.bots_manager.handle_updates(updates)
+
+    @staticmethod
+    def _scope(update: Update, tenant: int) -> None:
+        if update.object.event:
+            update.object.event.peer_id = scope_chat_id(tenant, update.object.event.peer_id)
+        if update.object.message:
+            update.object.message.peer_id = scope_chat_id(tenant, update.object.message.peer_id)
+
+    async def get_user_name(self, id: int) -> str:
+        """
+        :return: first name of the user, or the id in VK mention form if VK does not answer
+        """
+        names = await self.get_user_names([id])
+        return names.get(id, f"id{id}")
+
+    async def get_user_names(self, ids: list[int]) -> dict[int, str]:
+        """
+        :return: first names by user id, empty if VK does not answer
+        """
         params = {
-            "user_ids": id,
-            "access_token": self.app.config.bot.token,
+            "user_ids": ",".join(str(id) for id in ids),
         }
-        async with self.session.get(
-                self._build_query(
-                    API_PATH,
-                    "users.get",
-                    params=params,
-                )
-        ) as resp:
-            data = await resp.json()
-            self.logger.info(data)
-            return data["response"][0]["first_name"]
-
-    async def send_message(self, peer_id: int, message: str, keyboard: Optional[dict] = None) -> None:
+        try:
+            data = await self._request(API_PATH, "users.get", params=params, group=self.primary, optional=True)
+        except (VkApiError, CircuitShed) as e:
+            self.logger.warning("users.get failed: %s", e)
+            return {}
+        self.logger.debug("users.get response: %s", data)
+        return {user["id"]: user["first_name"] for user in data["response"]}
+
+    async def send_message(self, peer_id: int, message: str, keyboard: Optional[dict] = None,
+                           optional: bool = False, random_id: Optional[int] = None,
+                           attachment: Optional[str] = None) -> Optional[int]:
+        """
+        Retries are safe: random_id is picked once per call and VK drops repeated sends with the same random_id
+
+        :param optional: whether the message is dropped while VK is failing
+        :param random_id: stable id of a message that may be sent again, e.g. from the outbox, see
+            app.store.vk_api.idempotency.message_random_id; such messages are not sent again once
+            the send journal has them. Random by default.
+        :param attachment: e.g. from upload_media
+        :return: conversation_message_id of the sent message, needed to edit it later, None if it was not sent
+        :raises VkApiError: when VK rejects the message with an attachment for invalid parameters or access,
+            so the caller can upload the attachment again
+        """
+        if random_id and self.journal:
+            conversation_message_id = self.journal.get(peer_id, random_id)
+            if conversation_message_id is not None:
+                self.logger.info("messages.send skipped, already sent", extra={"chat_id": peer_id})
+                return conversation_message_id
+        group, vk_peer_id = self.group_of(peer_id)
         params = {
-                    "random_id": random.randint(1, 2**32),
-                    "peer_id": peer_id,
+                    "random_id": random_id or random.randint(1, 2**31 - 1),
+                    "peer_ids": vk_peer_id,
                     "message": message,
-                    "access_token": self.app.config.bot.token,
                 }
         if keyboard:
             params.update({"keyboard": keyboard})
-        async with self.session.get(
-            self._build_query(
-                API_PATH,
-                "messages.send",
-                params=params,
-            )
-        ) as resp:
-            data = await resp.json()
-            self.logger.info(data)
+        if attachment:
+            params["attachment"] = attachment
+        try:
+            data = await self._request(API_PATH, "messages.send", params=params, group=group, optional=optional)
+        except (VkApiError, CircuitShed) as e:
+            if attachment and isinstance(e, VkApiError) and e.code in ATTACHMENT_CODES:
+                raise
+            self.logger.error("messages.send failed: %s", e, extra={"chat_id": peer_id})
+            return None
+        self.logger.debug("messages.send response: %s", data, extra={"chat_id": peer_id})
+        try:
+            conversation_message_id = data["response"][0]["conversation_message_id"]
+        except (KeyError, IndexError, TypeError):
+            return None
+        if random_id and self.journal:
+            self.journal.record(peer_id, random_id, conversation_message_id)
+        return conversation_message_id
+
+    async def upload_media(self, peer_id: int, kind: str, data: bytes, filename: str) -> str:
+        """
+        Uploads a photo or an audio message for messages of the chat's community: upload server, upload, save
+
+        :param kind: "photo" or "audio"
+        :return: attachment for messages.send, e.g. photo-1_2_key
+        :raises VkApiError: when any of the steps fails
+        """
+        group, vk_peer_id = self.group_of(peer_id)
+        if kind == "photo":
+            server = await self._request(API_PATH, "photos.getMessagesUploadServer",
+                                         params={"peer_id": vk_peer_id}, group=group)
+            uploaded = await self._upload(server["response"]["upload_url"], "photo", data, filename)
+            saved = await self._request(API_PATH, "photos.saveMessagesPhoto",
+                                        params={key: uploaded[key] for key in ("server", "photo", "hash")},
+                                        group=group)
+            prefix, item = "photo", saved["response"][0]
+        else:
+            server = await self._request(API_PATH, "docs.getMessagesUploadServer",
+                                         params={"peer_id": vk_peer_id, "type": "audio_message"}, group=group)
+            uploaded = await self._upload(server["response"]["upload_url"], "file", data, filename)
+            saved = await self._request(API_PATH, "docs.save", params={"file": uploaded["file"]}, group=group)
+            prefix, item = "doc", saved["response"]["audio_message"]
+        attachment = f"{prefix}{item['owner_id']}_{item['id']}"
+        if item.get("access_key"):
+            attachment += f"_{item['access_key']}"
+        return attachment
+
+    async def _upload(self, url: str, field: str, data: bytes, filename: str) -> dict:
+        form = FormData()
+        form.add_field(field, data, filename=filename)
+        try:
+            timeout = ClientTimeout(total=self.app.config.vk_client.timeout("upload"))
+            async with self.session.post(url, data=form, timeout=timeout) as resp:
+                body = await resp.read()
+                if resp.status >= 500:
+                    raise VkApiError("server", f"upload HTTP {resp.status}")
+            uploaded = codec.loads(body)
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise VkApiError("network", repr(e)) from e
+        except ValueError as e:
+            raise VkApiError("server", f"unreadable upload response: {e}") from e
+        if "error" in uploaded:
+            raise VkApiError("fatal", f"upload: {uploaded['error']}")
+        return uploaded
+
+    async def edit_message(self, peer_id: int, conversation_message_id: int, message: str,
+                           keyboard: Optional[str] = None, optional: bool = False) -> None:
+        group, vk_peer_id = self.group_of(peer_id)
+        params = {
+            "peer_id": vk_peer_id,
+            "conversation_message_id": conversation_message_id,
+            "message": message,
+        }
+        if keyboard:
+            params["keyboard"] = keyboard
+        try:
+            data = await self._request(API_PATH, "messages.edit", params=params, group=group, optional=optional)
+        except (VkApiError, CircuitShed) as e:
+            self.logger.error("messages.edit failed: %s", e, extra={"chat_id": peer_id})
+            return
+        self.logger.debug("messages.edit response: %s", data, extra={"chat_id": peer_id})
+
+    async def send_message_event_answer(self, event_id: str, user_id: int, peer_id: int,
+                                        text: Optional[str] = None) -> None:
+        """
+        Acknowledges a callback button click, showing text in a snackbar to the user who clicked
+        """
+        group, vk_peer_id = self.group_of(peer_id)
+        params = {
+            "event_id": event_id,
+            "user_id": user_id,
+            "peer_id": vk_peer_id,
+        }
+        if text:
+            params["event_data"] = codec.dumps({"type": "show_snackbar", "text": text})
+        try:
+            # the click is handled anyway, the snackbar is a nicety
+            data = await self._request(API_PATH, "messages.sendMessageEventAnswer", params=params, group=group,
+                                       optional=True)
+        except (VkApiError, CircuitShed) as e:
+            self.logger.warning("messages.sendMessageEventAnswer failed: %s", e, extra={"chat_id": peer_id})
+            return
+        self.logger.debug("messages.sendMessageEventAnswer response: %s", data, extra={"chat_id": peer_id})
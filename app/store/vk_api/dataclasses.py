@@ -11,13 +11,28 @@ class UpdateMessage:
     action_type: Optional[str]
 
 
+@dataclass
+class UpdateEvent:
+    """
+    Click on a callback button, object of a message_event update
+    """
+    event_id: str
+    user_id: int
+    peer_id: int
+    conversation_message_id: Optional[int]
+    payload: dict
+
+
 @dataclass
 class UpdateObject:
-    message: UpdateMessage
+    message: Optional[UpdateMessage] = None
+    event: Optional[UpdateEvent] = None
 
 
 @dataclass
 class Update:
     type: str
     object: UpdateObject
+    # community the update came to
+    group_id: Optional[int] = None
 
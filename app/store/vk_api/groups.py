@@ -0,0 +1,79 @@
+import asyncio
+import time
+import typing
+from dataclasses import dataclass
+from typing import Optional
+
+from app.store.vk_api.resilience import CircuitBreaker
+from app.web.config import GroupConfig
+
+if typing.TYPE_CHECKING:
+    from app.store.vk_api.poller import Poller
+
+# Peer ids are unique only within a community, so chats of a community are stored with ids
+# tenant << TENANT_SHIFT | peer_id. Tenant 0 keeps plain peer ids.
+TENANT_SHIFT = 32
+PEER_MASK = (1 << TENANT_SHIFT) - 1
+
+
+def scope_chat_id(tenant: int, peer_id: int) -> int:
+    return tenant << TENANT_SHIFT | peer_id
+
+
+def split_chat_id(chat_id: int) -> tuple[int, int]:
+    """
+    :return: tenant and VK peer id of a stored chat id
+    """
+    return chat_id >> TENANT_SHIFT, chat_id & PEER_MASK
+
+
+def tenant_bounds(tenant: int) -> tuple[int, int]:
+    """
+    :return: smallest and largest chat id of a tenant
+    """
+    return scope_chat_id(tenant, 0), scope_chat_id(tenant, PEER_MASK)
+
+
+class RateLimiter:
+    """
+    Token bucket: up to burst calls at once, then rate calls per second. A call over the limit
+    reserves the next free slot before sleeping, so concurrent callers are spaced without a lock.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> float:
+        """
+        :return: seconds waited
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        delay = -self._tokens / self.rate
+        await asyncio.sleep(delay)
+        return delay
+
+
+@dataclass
+class VkGroup:
+    """
+    Community served by VkApiAccessor with its long poll server and poller
+    """
+    config: GroupConfig
+    limiter: RateLimiter
+    breaker: CircuitBreaker
+    key: Optional[str] = None
+    server: Optional[str] = None
+    ts: Optional[int] = None
+    poller: Optional["Poller"] = None
+
+    @property
+    def tenant(self) -> int:
+        return self.config.tenant
@@ -0,0 +1,101 @@
+import os
+import time
+from hashlib import blake2b
+from logging import getLogger
+from typing import IO, Optional
+
+# VK takes random_id as a signed 32-bit integer
+RANDOM_ID_MASK = (1 << 31) - 1
+
+
+def message_random_id(peer_id: int, session_id: int, sequence: int, template: str) -> int:
+    """
+    random_id of a message announcing the sequence-th state change of a session. The same message
+    gets the same id in every attempt and every process, so VK drops repeated sends.
+    """
+    key = f"{peer_id}:{session_id}:{sequence}:{template}".encode()
+    digest = int.from_bytes(blake2b(key, digest_size=8).digest(), "big")
+    return digest & RANDOM_ID_MASK or 1
+
+
+class SendJournal:
+    """
+    Append-only file of messages VK acknowledged, by peer and random_id. A message found in the journal
+    is not sent again, e.g. when the process died after the send but before the outbox row was deleted.
+    Lines are flushed after every send, so they survive a crash of the process, not of the host.
+    Entries older than retention are dropped when the journal is opened and on every record; the file
+    is rewritten once dropped entries make up most of it.
+    """
+
+    # lines of dropped entries the file may hold beyond the live ones before it is rewritten
+    COMPACT_SLACK = 1000
+
+    def __init__(self, path: str, retention: float):
+        self.path = path
+        self.retention = retention
+        self.logger = getLogger("vk_api")
+        # (peer_id, random_id) -> conversation_message_id and unix time of the send, oldest first
+        self._sent: dict[tuple[int, int], tuple[int, float]] = {}
+        self._file: Optional[IO[str]] = None
+        self._lines = 0
+
+    def open(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                for line in file:
+                    try:
+                        peer_id, random_id, conversation_message_id, sent_at = line.split()
+                        self._add((int(peer_id), int(random_id)), int(conversation_message_id), float(sent_at))
+                    except ValueError:
+                        # a line torn by a crash
+                        continue
+        self._prune()
+        self._compact()
+        self._file = open(self.path, "a")
+        self.logger.info("send journal %s: %d messages", self.path, len(self._sent))
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def get(self, peer_id: int, random_id: int) -> Optional[int]:
+        """
+        :return: conversation_message_id of the message if VK already acknowledged it
+        """
+        entry = self._sent.get((peer_id, random_id))
+        return entry[0] if entry else None
+
+    def record(self, peer_id: int, random_id: int, conversation_message_id: int) -> None:
+        sent_at = time.time()
+        self._add((peer_id, random_id), conversation_message_id, sent_at)
+        self._prune()
+        if self._file:
+            self._file.write(f"{peer_id} {random_id} {conversation_message_id} {sent_at:.0f}\n")
+            self._file.flush()
+            self._lines += 1
+            if self._lines > 2 * len(self._sent) + self.COMPACT_SLACK:
+                self._file.close()
+                self._compact()
+                self._file = open(self.path, "a")
+
+    def _add(self, key: tuple[int, int], conversation_message_id: int, sent_at: float) -> None:
+        # moved to the end, so entries stay ordered by the time of the send
+        self._sent.pop(key, None)
+        self._sent[key] = (conversation_message_id, sent_at)
+
+    def _prune(self) -> None:
+        expired = time.time() - self.retention
+        while self._sent:
+            key, (_, sent_at) = next(iter(self._sent.items()))
+            if sent_at >= expired:
+                break
+            del self._sent[key]
+
+    def _compact(self) -> None:
+        # a copy of the live entries, swapped in atomically
+        with open(self.path + ".tmp", "w") as file:
+            file.writelines(f"{peer_id} {random_id} {conversation_message_id} {sent_at:.0f}\n"
+                            for (peer_id, random_id), (conversation_message_id, sent_at) in self._sent.items())
+        os.replace(self.path + ".tmp", self.path)
+        self._lines = len(self._sent)
@@ -1,13 +1,18 @@
 import asyncio
 from asyncio import Task
+from logging import getLogger
 from typing import Optional
 
 from app.store import Store
+from app.store.vk_api.groups import VkGroup
+from app.store.vk_api.resilience import backoff
 
 
 class Poller:
-    def __init__(self, store: Store):
+    def __init__(self, store: Store, group: VkGroup):
         self.store = store
+        self.group = group
+        self.logger = getLogger("accessor")
         self.is_running = False
         self.poll_task: Optional[Task] = None
 
@@ -20,6 +25,17 @@ class Poller:
         await self.poll_task
 
     async def poll(self):
+        failures = 0
         while self.is_running:
-            await self.store.vk_api.poll()
+            try:
+                await self.store.vk_api.poll(self.group)
+                failures = 0
+            except Exception as e:
+                # the poller must outlive any failure, otherwise updates stop coming silently
+                config = self.store.app.config.vk_client
+                delay = backoff(failures, config.backoff_base, config.backoff_max)
+                failures += 1
+                self.logger.error("Exception in long poll of group %s, retrying in %.1fs",
+                                  self.group.config.group_id, delay, exc_info=e)
+                await asyncio.sleep(delay)
 
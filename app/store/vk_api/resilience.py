@@ -0,0 +1,102 @@
+import random
+import time
+from typing import Optional
+
+# VK error codes, https://dev.vk.com/reference/errors
+RATE_LIMIT_CODES = (6,)
+FLOOD_CODES = (9, 29)
+SERVER_CODES = (1, 10)
+# access denied and invalid parameters, what messages.send answers to an attachment VK no longer has
+ATTACHMENT_CODES = (15, 100)
+
+
+class VkApiError(Exception):
+    """
+    Failed VK call. kind is one of
+    "rate_limit": too many requests per second, retried after a backoff;
+    "flood": too many identical actions or the daily method limit, repeating only makes it worse;
+    "server": VK internal error, 5xx or unreadable response; "network": connection error or timeout;
+    "fatal": anything else, e.g. auth or permission errors.
+    """
+
+    def __init__(self, kind: str, message: str, code: Optional[int] = None):
+        super().__init__(f"{kind}: {message}" if code is None else f"{kind} ({code}): {message}")
+        self.kind = kind
+        self.code = code
+
+    @classmethod
+    def from_payload(cls, error: dict) -> "VkApiError":
+        code = error.get("error_code")
+        if code in RATE_LIMIT_CODES:
+            kind = "rate_limit"
+        elif code in FLOOD_CODES:
+            kind = "flood"
+        elif code in SERVER_CODES:
+            kind = "server"
+        else:
+            kind = "fatal"
+        return cls(kind, error.get("error_msg", ""), code)
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in ("rate_limit", "server", "network")
+
+    @property
+    def outage(self) -> bool:
+        """
+        Whether the error counts towards opening the circuit
+        """
+        return self.kind in ("server", "network")
+
+
+class CircuitShed(Exception):
+    """
+    Optional call dropped because the circuit of its community is open
+    """
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """
+    Full jitter: a random delay up to base * 2 ** attempt, capped
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Opens after threshold consecutive outage failures. While open, optional calls are shed; after
+    reset_timeout one call is let through as a probe and its result closes or reopens the circuit.
+    Required calls are always made, so they close the circuit as soon as VK is back.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """
+        Whether an optional call may be made now
+        """
+        if self.opened_at is None:
+            return True
+        if not self._probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, ok: bool) -> None:
+        self._probing = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
@@ -0,0 +1,221 @@
+import asyncio
+import time
+import typing
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.base.base_accessor import BaseAccessor
+from app.game_session.models import PlayerModel, PlayersSessions, SessionsQuestions, SessionStateModel
+from app.outbox.models import OutboxMessage
+from app.quiz.models import QuestionModel
+from app.store.outbox.accessor import OutboxAccessor
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+class WriteBehindAccessor(BaseAccessor):
+    """
+    Buffer of frequent game writes: session players with score increments, answered questions,
+    state names and outbox messages announcing them. Events are coalesced in memory and written in one transaction of multi-row
+    INSERT ... ON CONFLICT DO UPDATE statements every flush_interval_ms or once max_events are buffered.
+    Callers flush synchronously before state-critical transitions; the buffer is flushed on cleanup.
+    """
+
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.config = app.config.write_behind
+        # (session_id, player_id) -> (chat_id, points increment); an increment of 0 only adds the player
+        self._points: dict[tuple[int, int], tuple[int, int]] = {}
+        self._answered: set[tuple[int, int]] = set()
+        # session id -> state name and sequence
+        self._states: dict[int, tuple[str, Optional[int]]] = {}
+        self._messages: list[OutboxMessage] = []
+        self._events = 0
+        self._lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self, app: "Application"):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_forever())
+
+    async def disconnect(self, app: "Application"):
+        if self._task:
+            self._task.cancel()
+        await self.flush()
+
+    @property
+    def pending(self) -> int:
+        return self._events
+
+    def _added(self) -> None:
+        self._events += 1
+        if self._events >= self.config.max_events and self._wakeup:
+            self._wakeup.set()
+
+    def add_player(self, session_id: int, chat_id: int, player_id: int) -> None:
+        self.add_points(session_id, chat_id, player_id, 0)
+
+    def add_points(self, session_id: int, chat_id: int, player_id: int, points: int) -> None:
+        _, buffered = self._points.get((session_id, player_id), (chat_id, 0))
+        self._points[(session_id, player_id)] = (chat_id, buffered + points)
+        self._added()
+
+    def mark_answered(self, session_id: int, question_id: int) -> None:
+        self._answered.add((session_id, question_id))
+        self._added()
+
+    def set_state(self, session_id: int, state: str, sequence: Optional[int] = None) -> None:
+        """
+        :param sequence: LiveSession.sequence, the stored one is kept if None
+        """
+        self._states[session_id] = (state, sequence)
+        self._added()
+
+    def add_message(self, message: OutboxMessage) -> None:
+        self._messages.append(message)
+        self._added()
+
+    async def _flush_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.config.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.logger.error("Exception in write-behind flush", exc_info=e)
+
+    async def flush(self) -> int:
+        """
+        Writes everything buffered so far
+
+        :return: number of events written
+        """
+        async with self._lock:
+            if not self._events:
+                return 0
+            points, answered, states, messages = self._points, self._answered, self._states, self._messages
+            events = self._events
+            self._points, self._answered, self._states, self._messages, self._events = {}, set(), {}, [], 0
+
+            started = time.perf_counter()
+            try:
+                stats = await self._write(points, answered, states, messages)
+            except IntegrityError as e:
+                # rows of deleted or archived sessions would fail every retry: they are dropped,
+                # the rest of the batch is written
+                self.logger.warning("write-behind batch references deleted rows", exc_info=e)
+                try:
+                    kept = await self._existing(points, answered, states)
+                except Exception:
+                    self._restore(points, answered, states, messages, events)
+                    raise
+                dropped = len(points) + len(answered) + len(states) - sum(map(len, kept))
+                self.logger.error("dropped %s write-behind events of deleted sessions", dropped)
+                points, answered, states = kept
+                events -= dropped
+                try:
+                    stats = await self._write(points, answered, states, messages)
+                except Exception:
+                    self._restore(points, answered, states, messages, events)
+                    raise
+            except Exception:
+                self._restore(points, answered, states, messages, events)
+                raise
+            self.app.store.leaderboard.update_cache(stats)
+
+            metrics = self.app.store.metrics
+            if metrics.enabled:
+                metrics.write_behind_flush_latency.observe(time.perf_counter() - started)
+                metrics.write_behind_batch_size.observe(events)
+            return events
+
+    def _restore(self, points: dict, answered: set, states: dict, messages: list, events: int) -> None:
+        for (session_id, player_id), (chat_id, increment) in points.items():
+            self.add_points(session_id, chat_id, player_id, increment)
+        self._answered |= answered
+        # states set after the failed flush are newer
+        self._states = {**states, **self._states}
+        self._messages = messages + self._messages
+        self._events += events - len(points)
+
+    async def _existing(self, points: dict, answered: set, states: dict) -> tuple[dict, set, dict]:
+        """
+        :return: the buffered rows without rows of sessions and questions that no longer exist
+        """
+        session_ids = {session_id for session_id, _ in points} | {session_id for session_id, _ in answered} | set(states)
+        question_ids = {question_id for _, question_id in answered}
+        async with self.app.database.session() as session:
+            async with session.begin():
+                sessions = set((await session.execute(
+                    select(SessionStateModel.session_id).where(SessionStateModel.session_id.in_(session_ids))
+                )).scalars())
+                questions = set((await session.execute(
+                    select(QuestionModel.id).where(QuestionModel.id.in_(question_ids))
+                )).scalars()) if question_ids else set()
+        return (
+            {key: value for key, value in points.items() if key[0] in sessions},
+            {key for key in answered if key[0] in sessions and key[1] in questions},
+            {key: value for key, value in states.items() if key in sessions},
+        )
+
+    async def _write(self, points: dict, answered: set, states: dict, messages: list) -> list:
+        stats = []
+        async with self.app.database.session() as session:
+            async with session.begin():
+                if points:
+                    stmt = insert(PlayerModel).values([{"id": player_id} for _, player_id in points])
+                    await session.execute(stmt.on_conflict_do_nothing())
+
+                    stmt = insert(PlayersSessions).values([
+                        {"session_id": session_id, "player_id": player_id, "points": increment}
+                        for (session_id, player_id), (_, increment) in points.items()
+                    ])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[PlayersSessions.player_id, PlayersSessions.session_id],
+                        set_={"points": PlayersSessions.points + stmt.excluded.points},
+                    )
+                    await session.execute(stmt)
+
+                    by_chat = defaultdict(list)
+                    for (_, player_id), (chat_id, increment) in points.items():
+                        if increment:
+                            by_chat[chat_id].append((player_id, 0, 0, increment))
+                    for chat_id, rows in by_chat.items():
+                        stats += await self.app.store.leaderboard.add_to_stats(session, chat_id, rows)
+
+                if answered:
+                    stmt = insert(SessionsQuestions).values([
+                        {"session_state_id": session_id, "question_id": question_id, "is_answered": True}
+                        for session_id, question_id in answered
+                    ])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[SessionsQuestions.session_state_id, SessionsQuestions.question_id],
+                        set_={"is_answered": stmt.excluded.is_answered},
+                    )
+                    await session.execute(stmt)
+
+                if states:
+                    stmt = (
+                        update(SessionStateModel.__table__)
+                        .where(SessionStateModel.__table__.c.session_id == bindparam("b_session_id"))
+                        .values(state_name=bindparam("b_state_name"),
+                                sequence=func.coalesce(bindparam("b_sequence"),
+                                                       SessionStateModel.__table__.c.sequence))
+                    )
+                    await session.execute(stmt, [
+                        {"b_session_id": session_id, "b_state_name": SessionStateModel.states[state],
+                         "b_sequence": sequence}
+                        for session_id, (state, sequence) in states.items()
+                    ])
+
+                await OutboxAccessor.add(session, messages)
+        return stats
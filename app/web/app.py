@@ -10,18 +10,23 @@ from aiohttp_session import setup as session_setup
 from aiohttp_session.cookie_storage import EncryptedCookieStorage
 
 from app.admin.models import Admin
-from app.store import Store, setup_store
+from app.store import ALL, ROLES, Store, setup_store
 from app.store.database.database import Database
 from app.web.config import Config, setup_config
 from app.web.logger import setup_logging
 from app.web.middlewares import setup_middlewares
+from app.web.performance import setup_performance
 from app.web.routes import setup_routes
+from app.web.startup import StartupPipeline, setup_startup
 
 
 class Application(AiohttpApplication):
     config: Optional[Config] = None
     store: Optional[Store] = None
     database: Optional[Database] = None
+    startup_pipeline: Optional[StartupPipeline] = None
+    # see app.store.ROLES
+    role: str = ALL
 
 
 class Request(AiohttpRequest):
@@ -54,14 +59,30 @@ class View(AiohttpView):
 app = Application()
 
 
-def setup_app(config_path: str) -> Application:
-    setup_logging(app)
-    setup_config(app, config_path)
-    session_setup(app, EncryptedCookieStorage(app.config.session.key))
-    setup_routes(app)
+def setup_docs(app: Application):
+    """
+    Docs routes are added now, the spec is built from all routes as a deferred startup hook
+    """
+    hooks = len(app.on_startup)
     setup_aiohttp_apispec(
         app, title="Vk Quiz Bot", url="/docs/json", swagger_path="/docs"
     )
+    for hook in app.on_startup[hooks:]:
+        app.startup_pipeline.defer(hook)
+    del app.on_startup[hooks:]
+
+
+def setup_app(config_path: str, role: str = ALL) -> Application:
+    if role not in ROLES:
+        raise ValueError(f"unknown role {role}")
+    app.role = role
+    setup_config(app, config_path)
+    setup_logging(app)
+    setup_performance(app)
+    setup_startup(app)
+    session_setup(app, EncryptedCookieStorage(app.config.session.key))
+    setup_routes(app)
+    setup_docs(app)
     setup_middlewares(app)
     setup_store(app)
     return app
@@ -0,0 +1,77 @@
+import base64
+import hashlib
+import hmac
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.admin.models import Admin
+from app.web import codec
+
+TOKEN_COOKIE_NAME = "ADMIN_TOKEN"
+
+
+class VerifiedSessionCache:
+    """
+    LRU of admins from already decrypted session cookies, keyed by cookie digest,
+    so repeated requests with the same cookie skip Fernet decryption.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._items: OrderedDict[bytes, tuple[Admin, float]] = OrderedDict()
+
+    @staticmethod
+    def digest(cookie: str) -> bytes:
+        return hashlib.blake2b(cookie.encode(), digest_size=16).digest()
+
+    def get(self, cookie: str) -> Optional[Admin]:
+        key = self.digest(cookie)
+        item = self._items.get(key)
+        if item is None:
+            return None
+        admin, expires_at = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return admin
+
+    def put(self, cookie: str, admin: Admin) -> None:
+        if self.size <= 0:
+            return
+        self._items[self.digest(cookie)] = (admin, time.monotonic() + self.ttl)
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign_token(admin: Admin, key: str, ttl: int) -> str:
+    """
+    :return: stateless token "<payload>.<signature>", payload is base64 json with admin id, email and expiry
+    """
+    payload = _b64encode(codec.dumps_bytes({"id": admin.id, "email": admin.email, "exp": int(time.time()) + ttl}))
+    signature = hmac.new(key.encode(), payload.encode(), hashlib.sha256).digest()
+    return f"{payload}.{_b64encode(signature)}"
+
+
+def verify_token(token: str, key: str) -> Optional[Admin]:
+    try:
+        payload, signature = token.split(".")
+        expected = hmac.new(key.encode(), payload.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        data = codec.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if data["exp"] < time.time():
+        return None
+    return Admin(id=data["id"], email=data["email"])
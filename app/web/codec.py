@@ -0,0 +1,57 @@
+import json
+import logging
+from typing import Any, Union
+
+CODECS = ("json", "orjson")
+
+
+def _json_dumps_bytes(obj: Any) -> bytes:
+    return json.dumps(obj).encode()
+
+
+_name = "json"
+_dumps = json.dumps
+_dumps_bytes = _json_dumps_bytes
+_loads = json.loads
+
+
+def dumps(obj: Any) -> str:
+    return _dumps(obj)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    return _dumps_bytes(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return _loads(data)
+
+
+def current() -> str:
+    return _name
+
+
+def setup_codec(name: str) -> str:
+    """
+    Switches JSON encoding/decoding used by web responses, VK client and keyboards.
+    Falls back to stdlib json if the requested library is not installed.
+
+    :param name: one of CODECS
+    :return: name of the codec actually in use
+    """
+    global _name, _dumps, _dumps_bytes, _loads
+    if name not in CODECS:
+        raise ValueError(f"unknown json codec {name}, expected one of {CODECS}")
+
+    if name == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            logging.getLogger("app").warning("orjson is not installed, falling back to json")
+        else:
+            _name, _dumps_bytes, _loads = "orjson", orjson.dumps, orjson.loads
+            _dumps = lambda obj: orjson.dumps(obj).decode()
+            return _name
+
+    _name, _dumps, _dumps_bytes, _loads = "json", json.dumps, _json_dumps_bytes, json.loads
+    return _name
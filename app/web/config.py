@@ -1,5 +1,5 @@
 import typing
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import yaml
 
@@ -10,6 +10,11 @@ if typing.TYPE_CHECKING:
 @dataclass
 class SessionConfig:
     key: str
+    # "cookie" for encrypted session cookie, "token" for stateless signed token
+    mode: str = "cookie"
+    cache_size: int = 1024
+    cache_ttl: int = 300
+    token_ttl: int = 86400
 
 
 @dataclass
@@ -18,10 +23,130 @@ class AdminConfig:
     password: str
 
 
+@dataclass
+class GroupConfig:
+    """
+    VK community served by the bot
+    """
+    token: str
+    group_id: int
+    # stable number of the community, its chats are stored with ids scoped by it, see app.store.vk_api.groups
+    tenant: int = 0
+    # VK API calls per second made with the community token
+    rate_limit: float = 20.0
+
+
 @dataclass
 class BotConfig:
+    """
+    The community of token and group_id is tenant 0, more communities served by the same process go to groups
+    """
     token: str
     group_id: int
+    rate_limit: float = 20.0
+    groups: list[GroupConfig] = field(default_factory=list)
+    # seconds during which repeated clicks of a button by the same user are absorbed
+    click_window: float = 2.0
+    # inline callback buttons (clicks come as message_event) instead of text buttons
+    callback_buttons: bool = False
+    # minimal seconds between edits of a lobby message
+    lobby_edit_interval: float = 1.0
+
+    def __post_init__(self):
+        self.groups = [GroupConfig(**group) if isinstance(group, dict) else group for group in self.groups]
+        tenants = [group.tenant for group in self.all_groups]
+        if len(set(tenants)) != len(tenants):
+            raise ValueError(f"tenants of bot groups must be unique, got {tenants}")
+
+    @property
+    def all_groups(self) -> list[GroupConfig]:
+        return [GroupConfig(token=self.token, group_id=self.group_id, rate_limit=self.rate_limit), *self.groups]
+
+
+@dataclass
+class VkClientConfig:
+    # seconds per VK method, "default" for the rest; a_check holds the request for up to 25 s
+    timeouts: dict[str, float] = field(default_factory=lambda: {"default": 5.0, "a_check": 35.0, "upload": 30.0})
+    # attempts after the first one for retryable errors
+    retries: int = 3
+    backoff_base: float = 0.2
+    backoff_max: float = 5.0
+    # consecutive server or network failures of a community that open its circuit
+    failure_threshold: int = 5
+    # seconds the circuit stays open before a probe
+    reset_timeout: float = 30.0
+    # file of acknowledged sends, see app.store.vk_api.idempotency.SendJournal; None disables it
+    journal: typing.Optional[str] = None
+    # seconds a send is remembered, VK itself drops repeated random_ids for about an hour
+    journal_retention: float = 86400.0
+
+    def timeout(self, method: str) -> float:
+        return self.timeouts.get(method, self.timeouts.get("default", 5.0))
+
+
+@dataclass
+class GameConfig:
+    questions_per_game: int = 10
+
+
+@dataclass
+class StateConfig:
+    # "postgres", "memory" or "kv", see app.store.game_state
+    backend: str = "postgres"
+    # Redis-protocol server for the "kv" backend
+    host: str = "localhost"
+    port: int = 6379
+    db: int = 0
+    prefix: str = "quiz:state:"
+
+
+@dataclass
+class WriteBehindConfig:
+    flush_interval_ms: int = 200
+    # buffered events that trigger a flush before the interval ends
+    max_events: int = 500
+
+
+@dataclass
+class OutboxConfig:
+    # seconds between background deliveries of messages left in the outbox
+    interval: float = 5.0
+    batch_size: int = 100
+    # seconds a sender holds claimed messages before another one may deliver them
+    lease: float = 30.0
+    # failed deliveries after which a message is dropped
+    max_attempts: int = 10
+
+
+@dataclass
+class MediaConfig:
+    # seconds an uploaded attachment is used before the media is uploaded again
+    ttl: float = 7 * 86400.0
+    # uploads running at once when a session's questions are prefetched
+    concurrency: int = 4
+    # seconds to download the source file
+    fetch_timeout: float = 30.0
+    # bytes of the largest source file downloaded, VK takes photos up to 50 MB
+    max_size: int = 20 * 2**20
+
+
+@dataclass
+class SearchConfig:
+    # "postgres" or "memory", see app.store.search
+    backend: str = "postgres"
+    # trigram similarity from which a new question is reported as a near duplicate of an existing one
+    duplicate_threshold: float = 0.6
+    page_size: int = 20
+    max_page_size: int = 100
+
+
+@dataclass
+class ReadCacheConfig:
+    # when disabled, responses are built on every request and still get ETags
+    enabled: bool = True
+    # seconds between checks of the version row, i.e. how long other processes may serve old data
+    check_interval: float = 1.0
+    max_entries: int = 1000
 
 
 @dataclass
@@ -31,6 +156,54 @@ class DatabaseConfig:
     user: str = "postgres"
     password: str = "postgres"
     database: str = "project"
+    echo: bool = False
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False
+
+
+@dataclass
+class ProfilerConfig:
+    enabled: bool = False
+    lag_interval: float = 0.5
+    slow_callback_threshold: float = 0.1
+    max_samples: int = 50
+    max_profile_seconds: float = 60
+
+
+@dataclass
+class PerformanceConfig:
+    uvloop: bool = False
+    # "json" or "orjson"
+    json: str = "json"
+
+
+@dataclass
+class ArchiveConfig:
+    enabled: bool = False
+    # seconds between archival runs
+    interval: float = 300
+    # sessions ended less than min_age seconds ago stay in the hot tables
+    min_age: float = 3600
+    batch_size: int = 500
+    max_batches: int = 20
+    # seconds to sleep between batches
+    pause: float = 0.5
+    lock_timeout_ms: int = 1000
+    # local hours when archival does not run
+    peak_hours: list[int] = field(default_factory=list)
+
+
+@dataclass
+class LoggingConfig:
+    level: str = "INFO"
+    use_queue: bool = True
+    # logger name -> fraction of records below WARNING to keep
+    sampling: dict[str, float] = field(default_factory=dict)
+    # logger name -> max records below WARNING per second
+    rate_limits: dict[str, int] = field(default_factory=dict)
 
 
 @dataclass
@@ -39,6 +212,19 @@ class Config:
     session: SessionConfig = None
     bot: BotConfig = None
     database: DatabaseConfig = None
+    metrics: MetricsConfig = None
+    logging: LoggingConfig = None
+    profiler: ProfilerConfig = None
+    performance: PerformanceConfig = None
+    archive: ArchiveConfig = None
+    game: GameConfig = None
+    state: StateConfig = None
+    write_behind: WriteBehindConfig = None
+    vk_client: VkClientConfig = None
+    outbox: OutboxConfig = None
+    media: MediaConfig = None
+    search: SearchConfig = None
+    read_cache: ReadCacheConfig = None
 
 
 def setup_config(app: "Application", config_path: str):
@@ -46,16 +232,24 @@ def setup_config(app: "Application", config_path: str):
         raw_config = yaml.safe_load(f)
 
     app.config = Config(
-        session=SessionConfig(
-            key=raw_config["session"]["key"],
-        ),
+        session=SessionConfig(**raw_config["session"]),
         admin=AdminConfig(
             email=raw_config["admin"]["email"],
             password=raw_config["admin"]["password"],
         ),
-        bot=BotConfig(
-            token=raw_config["bot"]["token"],
-            group_id=raw_config["bot"]["group_id"],
-        ),
+        bot=BotConfig(**raw_config["bot"]),
         database=DatabaseConfig(**raw_config["database"]),
+        metrics=MetricsConfig(**raw_config.get("metrics", {})),
+        logging=LoggingConfig(**raw_config.get("logging", {})),
+        profiler=ProfilerConfig(**raw_config.get("profiler", {})),
+        performance=PerformanceConfig(**raw_config.get("performance", {})),
+        archive=ArchiveConfig(**raw_config.get("archive", {})),
+        game=GameConfig(**raw_config.get("game", {})),
+        state=StateConfig(**raw_config.get("state", {})),
+        write_behind=WriteBehindConfig(**raw_config.get("write_behind", {})),
+        vk_client=VkClientConfig(**raw_config.get("vk_client", {})),
+        outbox=OutboxConfig(**raw_config.get("outbox", {})),
+        media=MediaConfig(**raw_config.get("media", {})),
+        search=SearchConfig(**raw_config.get("search", {})),
+        read_cache=ReadCacheConfig(**raw_config.get("read_cache", {})),
     )
@@ -1,9 +1,103 @@
 import logging
+import queue
+import random
+import time
 import typing
+from logging.handlers import QueueHandler, QueueListener
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application
 
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# Record attributes passed through `extra=` that are appended to every line as key=value
+STRUCTURED_FIELDS = ("chat_id", "session_id", "update_type")
 
-def setup_logging(_: "Application") -> None:
-    logging.basicConfig(level=logging.INFO)
+
+class StructuredFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [f"{name}={getattr(record, name)}" for name in STRUCTURED_FIELDS if hasattr(record, name)]
+        if fields:
+            line += " " + " ".join(fields)
+        return line
+
+
+class LoopQueueHandler(QueueHandler):
+    """
+    QueueHandler that only merges message args before enqueueing. Stdlib prepare() copies the record
+    and runs a full format on the caller thread, here that is left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of records below WARNING, warnings and errors always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `per_second` records below WARNING through every second, warnings and errors always pass"""
+
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        self._window = 0
+        self._count = 0
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._count = 0
+        self._count += 1
+        if self._count > self.per_second:
+            self.dropped += 1
+            return False
+        return True
+
+
+def setup_logging(app: "Application") -> None:
+    """
+    Root logger writes into an in-memory queue, the actual stream output is done by a QueueListener
+    thread, so the event loop never blocks on log I/O. Sampling and rate limits from config are attached
+    to the named loggers and drop records before they are formatted.
+    """
+    config = app.config.logging
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(config.level)
+    if config.use_queue:
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        root.handlers = [LoopQueueHandler(log_queue)]
+        listener.start()
+
+        async def stop_listener(_: "Application") -> None:
+            listener.stop()
+
+        app.on_cleanup.append(stop_listener)
+    else:
+        root.handlers = [handler]
+
+    for name, rate in config.sampling.items():
+        logging.getLogger(name).addFilter(SamplingFilter(rate))
+    for name, per_second in config.rate_limits.items():
+        logging.getLogger(name).addFilter(RateLimitFilter(per_second))
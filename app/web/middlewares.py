@@ -1,4 +1,3 @@
-import json
 import typing
 
 from aiohttp.web_exceptions import (HTTPException,
@@ -10,22 +9,53 @@ from aiohttp.web_exceptions import (HTTPException,
                                     HTTPNotFound)
 from aiohttp.web_middlewares import middleware
 from aiohttp_apispec import validation_middleware
-from aiohttp_session import get_session, session_middleware
-from aiohttp_session.cookie_storage import EncryptedCookieStorage
+from aiohttp_session import STORAGE_KEY, get_session
 
 from app.admin.models import Admin
+from app.web import codec
+from app.web.auth import TOKEN_COOKIE_NAME, VerifiedSessionCache, verify_token
 from app.web.utils import error_json_response
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application, Request
 
 
-@middleware
-async def auth_middleware(request: "Request", handler: callable):
-    session = await get_session(request)
-    if session:
-        request.admin = Admin.from_session(session)
-    return await handler(request)
+def make_auth_middleware(app: "Application"):
+    """
+    Cookie mode: the session cookie is decrypted at most once per distinct cookie value (until cache ttl),
+    requests repeating a cookie are resolved from VerifiedSessionCache.
+    Token mode: admin is taken from an HMAC-signed token in Authorization header or ADMIN_TOKEN cookie,
+    no encrypted session is involved.
+    """
+    config = app.config.session
+    cache = VerifiedSessionCache(size=config.cache_size, ttl=config.cache_ttl)
+
+    @middleware
+    async def cookie_auth_middleware(request: "Request", handler: callable):
+        cookie = request[STORAGE_KEY].load_cookie(request)
+        if cookie:
+            admin = cache.get(cookie)
+            if admin is None:
+                session = await get_session(request)
+                if session:
+                    admin = Admin.from_session(session)
+                    cache.put(cookie, admin)
+            request.admin = admin
+        return await handler(request)
+
+    @middleware
+    async def token_auth_middleware(request: "Request", handler: callable):
+        token = request.cookies.get(TOKEN_COOKIE_NAME)
+        authorization = request.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            token = authorization[len("Bearer "):]
+        if token:
+            request.admin = verify_token(token, config.key)
+        return await handler(request)
+
+    if config.mode == "token":
+        return token_auth_middleware
+    return cookie_auth_middleware
 
 
 HTTP_ERROR_CODES = {
@@ -49,7 +79,7 @@ async def error_handling_middleware(request: "Request", handler: callable):
             http_status=400,
             status="bad_request",
             message=e.reason,
-            data=json.loads(e.text),
+            data=codec.loads(e.text),
         )
     except HTTPBadRequest as e:
         return error_json_response(
@@ -97,5 +127,4 @@ async def error_handling_middleware(request: "Request", handler: callable):
 def setup_middlewares(app: "Application"):
     app.middlewares.append(error_handling_middleware)
     app.middlewares.append(validation_middleware)
-    app.middlewares.append(session_middleware(EncryptedCookieStorage(app.config.session.key)))
-    app.middlewares.append(auth_middleware)
+    app.middlewares.append(make_auth_middleware(app))
@@ -0,0 +1,30 @@
+import asyncio
+import logging
+import typing
+
+from app.web import codec
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+def install_uvloop() -> bool:
+    """
+    Sets uvloop event loop policy, must be called before the loop is created (i.e. before run_app).
+
+    :return: False if uvloop is not installed and the default loop stays in use
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logging.getLogger("app").warning("uvloop is not installed, using default asyncio loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def setup_performance(app: "Application") -> None:
+    config = app.config.performance
+    codec.setup_codec(config.json)
+    if config.uvloop:
+        install_uvloop()
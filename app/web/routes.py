@@ -1,9 +1,21 @@
 from aiohttp.web_app import Application
 
+from app.store import BOT
+
 
 def setup_routes(app: Application):
     from app.admin.routes import setup_routes as admin_setup_routes
     from app.quiz.routes import setup_routes as quiz_setup_routes
+    from app.game_session.routes import setup_routes as game_session_setup_routes
+    from app.leaderboard.routes import setup_routes as leaderboard_setup_routes
+    from app.metrics.routes import setup_routes as metrics_setup_routes
+    from app.profiler.routes import setup_routes as profiler_setup_routes
 
-    admin_setup_routes(app)
-    quiz_setup_routes(app)
+    # bot workers serve only metrics and profiling of their own process
+    if app.role != BOT:
+        admin_setup_routes(app)
+        quiz_setup_routes(app)
+        game_session_setup_routes(app)
+        leaderboard_setup_routes(app)
+    metrics_setup_routes(app)
+    profiler_setup_routes(app)
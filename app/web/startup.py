@@ -0,0 +1,80 @@
+import asyncio
+import time
+import typing
+from logging import getLogger
+from typing import Awaitable, Callable, Optional
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+Hook = Callable[["Application"], Awaitable[None]]
+
+
+class StartupPipeline:
+    """
+    Startup hooks grouped in phases. Critical phases run one after another in on_startup, hooks of one phase
+    run concurrently. Deferred hooks run in background once on_startup returned, so the server starts
+    listening without waiting for them; they are cancelled on cleanup if still running.
+    """
+    CRITICAL_PHASES = ("database", "accessors")
+
+    def __init__(self):
+        self.logger = getLogger("app")
+        self._hooks: dict[str, list[Hook]] = {phase: [] for phase in self.CRITICAL_PHASES}
+        self._deferred: list[Hook] = []
+        self._task: Optional[asyncio.Task] = None
+        # phase -> seconds it took, "deferred" included once it is done
+        self.timings: dict[str, float] = {}
+
+    def add(self, hook: Hook, phase: str = "accessors") -> None:
+        if phase not in self._hooks:
+            raise ValueError(f"unknown startup phase {phase}")
+        self._hooks[phase].append(hook)
+
+    def defer(self, hook: Hook) -> None:
+        self._deferred.append(hook)
+
+    async def run(self, app: "Application") -> None:
+        started = time.perf_counter()
+        for phase in self.CRITICAL_PHASES:
+            await self._run_phase(app, phase, self._hooks[phase])
+        self.timings["critical"] = time.perf_counter() - started
+        self.logger.info("startup: critical phases done in %.3fs", self.timings["critical"])
+        if self._deferred:
+            self._task = asyncio.create_task(self._run_deferred(app))
+
+    async def _run_phase(self, app: "Application", phase: str, hooks: list[Hook]) -> list:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(hook(app) for hook in hooks), return_exceptions=phase == "deferred")
+        self.timings[phase] = time.perf_counter() - started
+        self.logger.info("startup: %s phase, %d hooks in %.3fs", phase, len(hooks), self.timings[phase])
+        return results
+
+    async def _run_deferred(self, app: "Application") -> None:
+        results = await self._run_phase(app, "deferred", self._deferred)
+        for hook, result in zip(self._deferred, results):
+            if isinstance(result, Exception):
+                self.logger.error("Exception in deferred startup hook %s", _name(hook), exc_info=result)
+
+    async def wait_deferred(self) -> None:
+        if self._task:
+            await self._task
+
+    async def stop(self, app: "Application") -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _name(hook: Hook) -> str:
+    return getattr(hook, "__qualname__", repr(hook))
+
+
+def setup_startup(app: "Application") -> None:
+    app.startup_pipeline = StartupPipeline()
+    app.on_startup.append(app.startup_pipeline.run)
+    # before accessors, so deferred hooks are not running when they disconnect
+    app.on_cleanup.append(app.startup_pipeline.stop)
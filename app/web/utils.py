@@ -1,22 +1,48 @@
-import json
+import re
 from typing import Any, Optional
 
-from aiohttp.web import json_response as aiohttp_json_response
+from aiohttp.web_request import Request
 from aiohttp.web_response import Response
-from app.store.vk_api.dataclasses import Update, UpdateObject, UpdateMessage
+from app.web import codec
+from app.store.vk_api.dataclasses import Update, UpdateEvent, UpdateObject, UpdateMessage
 
+# button label -> command sent in the payload of callback buttons
+BUTTON_COMMANDS = {
+    "Старт": "start",
+    "Рейтинг": "rating",
+    "Участвовать": "participate",
+    "Поехали": "run",
+}
 
-def json_response(data: Any = None, status: str = "ok") -> Response:
+
+def json_body(data: Any = None, status: str = "ok") -> bytes:
     if data is None:
         data = {}
-    return aiohttp_json_response(
-        data={
-            "status": status,
-            "data": data,
-        }
+    return codec.dumps_bytes({
+        "status": status,
+        "data": data,
+    })
+
+
+def json_response(data: Any = None, status: str = "ok") -> Response:
+    return Response(
+        body=json_body(data, status),
+        content_type="application/json",
     )
 
 
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """
+    Response of a pre-serialized body, 304 without the body if the client has it already
+    """
+    # clients revalidate every time, which costs them a 304 at most
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("If-None-Match", "")
+    if if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status=304, headers=headers)
+    return Response(body=body, content_type="application/json", headers=headers)
+
+
 def error_json_response(
     http_status: int,
     status: str = "error",
@@ -25,19 +51,27 @@ def error_json_response(
 ):
     if data is None:
         data = {}
-    return aiohttp_json_response(
+    return Response(
         status=http_status,
-        data={
+        body=codec.dumps_bytes({
             "status": status,
             "message": str(message),
             "data": data,
-        },
+        }),
+        content_type="application/json",
     )
 
 
 def make_update_from_raw(raw_update: dict) -> Update:
         type = raw_update["type"]
         object = raw_update["object"]
+        if type == "message_event":
+            event = UpdateEvent(event_id=object["event_id"],
+                                user_id=object["user_id"],
+                                peer_id=object["peer_id"],
+                                conversation_message_id=object.get("conversation_message_id"),
+                                payload=object.get("payload") or {})
+            return Update(type=type, object=UpdateObject(event=event), group_id=raw_update.get("group_id"))
         message = object["message"]
         message_id = message["id"]
         text = message["text"]
@@ -51,27 +85,48 @@ def make_update_from_raw(raw_update: dict) -> Update:
                                        peer_id=peer_id,
                                        action_type=action_type)
         update_object = UpdateObject(message=update_message)
-        update = Update(type=type, object=update_object)
+        update = Update(type=type, object=update_object, group_id=raw_update.get("group_id"))
         return update
 
 
-def get_keyboard_json(type: str) -> str:
+def get_keyboard_json(type: str, callback: bool = False) -> str:
+    """
+    :param callback: inline keyboard of callback buttons, clicks come as message_event with {"c": command} payload
+    """
     def _button(label: str) -> dict:
+        if callback:
+            payload = codec.dumps({"c": BUTTON_COMMANDS[label]})
+            return {"action": {"type": "callback", "label": label, "payload": payload}}
         return {"action": {"type": "text", "label": label}}
 
     buttons = [[]]
     if type == "initial":
-        buttons = [[_button("Старт")]]
-    elif type == "preparing":
+        buttons = [[_button("Старт")], [_button("Рейтинг")]]
+    elif type in ("preparing", "lobby"):
         buttons = [[_button("Участвовать")], [_button("Поехали")]]
     keyboard = {
-        "one_time": False,
         "buttons": buttons,
-        "inline": False
+        "inline": callback
     }
+    if not callback:
+        keyboard["one_time"] = False
     if buttons != [[]]:
-        return json.dumps(keyboard)
+        return codec.dumps(keyboard)
 
 
 def check_answers(answers: list) -> bool:
     return sum([a["is_correct"] for a in answers]) == 1 and len(answers) > 1
+
+
+_not_word = re.compile(r"[^\w ]+")
+_spaces = re.compile(r"\s+")
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Key for comparing an answer typed in chat with answer titles: case, "ё", punctuation
+    and extra whitespace are ignored.
+    """
+    text = text.casefold().replace("ё", "е")
+    text = _not_word.sub(" ", text)
+    return _spaces.sub(" ", text).strip()
@@ -0,0 +1,89 @@
+"""
+End-to-end throughput of the JSON and event loop options from the `performance` config section.
+
+    python -m benchmarks.bench_codec [rounds]
+
+For every combination of loop (asyncio, uvloop) and codec (json, orjson) a local aiohttp server
+plays both VK long poll and the admin API. Each round a client fetches a batch of updates, parses them
+with make_update_from_raw, builds a keyboard for each and fetches a question list rendered by
+json_response. Options whose library is not installed are skipped.
+"""
+import asyncio
+import sys
+import time
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from app.web import codec
+from app.web.performance import install_uvloop
+from app.web.utils import get_keyboard_json, json_response, make_update_from_raw
+
+CONCURRENCY = 10
+
+UPDATES = {
+    "ts": "1024",
+    "updates": [
+        {
+            "type": "message_new",
+            "object": {"message": {"id": i, "from_id": 1000 + i, "peer_id": 2000000001,
+                                   "text": "[club1|@bot] Участвовать"}},
+        }
+        for i in range(50)
+    ],
+}
+
+QUESTIONS = {
+    "questions": [
+        {"id": i, "theme_id": i % 10, "title": f"Вопрос номер {i}?",
+         "answers": [{"title": f"ответ {j}", "is_correct": j == 0} for j in range(4)]}
+        for i in range(200)
+    ]
+}
+
+
+async def poll_handler(_: web.Request) -> web.Response:
+    return web.Response(body=codec.dumps_bytes(UPDATES), content_type="application/json")
+
+
+async def questions_handler(_: web.Request) -> web.Response:
+    return json_response(data=QUESTIONS)
+
+
+async def worker(session: ClientSession, server: TestServer, rounds: int) -> None:
+    for _ in range(rounds):
+        async with session.get(server.make_url("/poll")) as resp:
+            data = codec.loads(await resp.read())
+        for raw_update in data["updates"]:
+            make_update_from_raw(raw_update)
+            get_keyboard_json("preparing")
+        async with session.get(server.make_url("/questions")) as resp:
+            codec.loads(await resp.read())
+
+
+async def run(rounds: int) -> float:
+    app = web.Application()
+    app.router.add_get("/poll", poll_handler)
+    app.router.add_get("/questions", questions_handler)
+    async with TestServer(app) as server, ClientSession() as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session, server, rounds // CONCURRENCY) for _ in range(CONCURRENCY)))
+        return time.perf_counter() - started
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for loop_name in ("asyncio", "uvloop"):
+        if loop_name == "uvloop" and not install_uvloop():
+            print("uvloop    skipped, not installed")
+            continue
+        for codec_name in codec.CODECS:
+            if codec.setup_codec(codec_name) != codec_name:
+                print(f"{loop_name:<9} {codec_name:<7} skipped, not installed")
+                continue
+            elapsed = asyncio.run(run(rounds))
+            print(f"{loop_name:<9} {codec_name:<7} {rounds / elapsed:8.1f} rounds/s")
+
+
+if __name__ == "__main__":
+    main()
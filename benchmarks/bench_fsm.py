@@ -0,0 +1,26 @@
+"""
+Event dispatch throughput of the game state machine with many concurrent games.
+
+    python -m benchmarks.bench_fsm [games] [events]
+
+Random event streams from random players are fired at games sharing GAME_MACHINE by
+app.game_session.fsm.fire_random_events, the generator the FSM property test uses.
+"""
+import sys
+import time
+
+from app.game_session.fsm import fire_random_events
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    started = time.perf_counter()
+    history = fire_random_events(seed=0, games=games, events=events)
+    elapsed = time.perf_counter() - started
+    changed = sum(1 for game in history for before, _, after in game if before != after)
+    print(f"{games} games, {events} events: {events / elapsed:10.0f} events/s, {changed} transitions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measures event-loop time spent on logging VK long-poll payloads.
+
+    python -m benchmarks.bench_logging [iterations]
+
+Every variant runs the same coroutine that "handles" a poll response and logs it, the number printed
+is the wall time the loop thread spent, i.e. time not available to other chats. "slow sink" variants
+write into a stream that blocks for 100us per write, like a busy pipe or journald under load.
+"""
+import asyncio
+import io
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueListener
+
+from app.web.logger import LOG_FORMAT, LoopQueueHandler, RateLimitFilter, SamplingFilter, StructuredFormatter
+
+PAYLOAD = {
+    "ts": "1024",
+    "updates": [
+        {
+            "type": "message_new",
+            "object": {"message": {"id": i, "from_id": 1000 + i, "peer_id": 2000000001, "text": "[club1|@bot] Участвовать"}},
+        }
+        for i in range(20)
+    ],
+}
+
+
+class SlowStream(io.StringIO):
+    def write(self, s: str) -> int:
+        time.sleep(0.0001)
+        return super().write(s)
+
+
+async def handle(logger: logging.Logger, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        logger.info("poll response: %s", PAYLOAD, extra={"update_type": "message_new"})
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+def stream_handler(slow: bool) -> logging.Handler:
+    handler = logging.StreamHandler(SlowStream() if slow else io.StringIO())
+    handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+    return handler
+
+
+def run(name: str, iterations: int, slow: bool, use_queue: bool = True,
+        level: int = logging.INFO, filters: tuple = ()) -> None:
+    logger = logging.getLogger(f"bench.{name}.{slow}")
+    logger.propagate = False
+    logger.setLevel(level)
+    for f in filters:
+        logger.addFilter(f)
+
+    listener = None
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, stream_handler(slow))
+        logger.handlers = [LoopQueueHandler(log_queue)]
+        listener.start()
+    else:
+        logger.handlers = [stream_handler(slow)]
+
+    elapsed = asyncio.run(handle(logger, iterations))
+    if listener:
+        listener.stop()
+    sink = "slow sink" if slow else "fast sink"
+    print(f"{name:<26} {sink}  {elapsed * 1000:9.1f} ms loop time, {elapsed / iterations * 1e6:7.1f} us per record")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for slow in (False, True):
+        run("sync handler", iterations, slow, use_queue=False)
+        run("queue handler", iterations, slow)
+        run("queue + sampling 1%", iterations, slow, filters=(SamplingFilter(0.01),))
+        run("queue + 100/s rate limit", iterations, slow, filters=(RateLimitFilter(100),))
+        run("queue, payload at DEBUG", iterations, slow, level=logging.WARNING)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
+import argparse
 import os
 
+from app.store import ALL, ROLES
 from app.web.app import setup_app
 from aiohttp.web import run_app
 
 if __name__ == "__main__":
-    run_app(setup_app(config_path=os.path.join(os.path.dirname(os.path.realpath(__file__)), "config.yml")), port=9090)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--role", choices=ROLES, default=ALL,
+                        help="api: admin REST API, bot: VK polling and games, all: both in one process")
+    parser.add_argument("--port", type=int, default=9090)
+    args = parser.parse_args()
+    run_app(setup_app(config_path=os.path.join(os.path.dirname(os.path.realpath(__file__)), "config.yml"),
+                      role=args.role), port=args.port)
@@ -0,0 +1,32 @@
+import json
+
+from app.web.utils import get_keyboard_json, make_update_from_raw
+
+
+class TestCallbackButtons:
+    def test_keyboard(self):
+        keyboard = json.loads(get_keyboard_json("preparing", callback=True))
+        assert keyboard["inline"] is True
+        assert "one_time" not in keyboard
+        actions = [row[0]["action"] for row in keyboard["buttons"]]
+        assert [a["type"] for a in actions] == ["callback", "callback"]
+        assert [json.loads(a["payload"]) for a in actions] == [{"c": "participate"}, {"c": "run"}]
+
+    def test_message_event(self):
+        update = make_update_from_raw({
+            "type": "message_event",
+            "object": {"event_id": "abc", "user_id": 10, "peer_id": 2000000001,
+                       "conversation_message_id": 7, "payload": {"c": "participate"}},
+        })
+        assert update.object.message is None
+        assert update.object.event.payload == {"c": "participate"}
+        assert update.object.event.conversation_message_id == 7
+
+    async def test_event_is_acknowledged(self, store):
+        store.vk_api.send_message_event_answer.reset_mock()
+        update = make_update_from_raw({
+            "type": "message_event",
+            "object": {"event_id": "abc", "user_id": 10, "peer_id": 1, "payload": {"c": "unknown"}},
+        })
+        await store.bots_manager.handle_updates([update])
+        store.vk_api.send_message_event_answer.assert_awaited_once_with("abc", 10, 1, text=None)
@@ -0,0 +1,54 @@
+import asyncio
+
+from app.store.bot.debounce import ClickDebouncer
+
+
+class TestClickDebouncer:
+    async def test_repeats_are_absorbed(self):
+        debouncer = ClickDebouncer(window=60)
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "new_player_added"
+
+        results = await asyncio.gather(*(debouncer.run((1, 10, "Участвовать"), handler) for _ in range(5)))
+        assert calls == [1]
+        assert sorted(handled for _, handled in results) == [False] * 4 + [True]
+        assert {outcome for outcome, _ in results} == {"new_player_added"}
+
+        assert await debouncer.run((1, 10, "Участвовать"), handler) == ("new_player_added", False)
+        assert await debouncer.run((1, 20, "Участвовать"), handler) == ("new_player_added", True)
+        assert len(calls) == 2
+
+    async def test_expired_and_invalidated(self):
+        debouncer = ClickDebouncer(window=0)
+
+        async def handler():
+            return "not_enough_players"
+
+        assert (await debouncer.run((1, 10, "Поехали"), handler))[1]
+        assert (await debouncer.run((1, 10, "Поехали"), handler))[1]
+
+        debouncer.window = 60
+        await debouncer.run((1, 10, "Поехали"), handler)
+        debouncer.invalidate(1, keep=(1, 10, "Поехали"))
+        assert not (await debouncer.run((1, 10, "Поехали"), handler))[1]
+        debouncer.invalidate(1)
+        assert (await debouncer.run((1, 10, "Поехали"), handler))[1]
+
+    async def test_failed_click_is_not_cached(self):
+        debouncer = ClickDebouncer(window=60)
+
+        async def failing():
+            raise RuntimeError
+
+        async def handler():
+            return "started"
+
+        try:
+            await debouncer.run((1, 10, "Старт"), failing)
+        except RuntimeError:
+            pass
+        assert await debouncer.run((1, 10, "Старт"), handler) == ("started", True)
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+import app.store.vk_api.accessor as vk_accessor
+from app.store import BOT
+from app.store.vk_api.groups import RateLimiter, scope_chat_id, split_chat_id
+from app.web.config import BotConfig
+
+
+class TestGroups:
+    def test_chat_ids(self):
+        assert scope_chat_id(0, 2000000001) == 2000000001
+        chat_id = scope_chat_id(3, 2000000001)
+        assert chat_id != 2000000001
+        assert split_chat_id(chat_id) == (3, 2000000001)
+
+    def test_tenants_must_be_unique(self):
+        with pytest.raises(ValueError):
+            BotConfig(token="t", group_id=1, groups=[{"token": "u", "group_id": 2}])
+
+    async def test_rate_limiter(self):
+        limiter = RateLimiter(rate=50, burst=5)
+        started = time.monotonic()
+        waits = await asyncio.gather(*(limiter.acquire() for _ in range(15)))
+        # 5 at once, then 10 spaced by 20 ms
+        assert waits[:5] == [0.0] * 5
+        assert time.monotonic() - started == pytest.approx(0.2, abs=0.05)
+
+    async def test_requests_use_the_group_of_the_chat(self, make_app, aiohttp_server, monkeypatch):
+        requests = []
+        raw = {"type": "message_new", "group_id": 2, "object": {"message": {
+            "id": 1, "from_id": 10, "peer_id": 2000000005, "text": "Старт"}}}
+
+        async def method(request: web.Request):
+            requests.append(dict(request.query))
+            return web.json_response({"response": [{"conversation_message_id": 7}]})
+
+        async def poll(request: web.Request):
+            return web.json_response({"ts": 3, "updates": [raw]})
+
+        vk = web.Application()
+        vk.router.add_get("/method/{name}", method)
+        vk.router.add_get("/poll", poll)
+        server = await aiohttp_server(vk)
+        monkeypatch.setattr(vk_accessor, "API_PATH", str(server.make_url("/method/")))
+
+        app = make_app(BOT, bot={"groups": [{"token": "second_token", "group_id": 2, "tenant": 1}]})
+        store = app.store
+        handled = []
+
+        async def handle_updates(updates):
+            handled.extend(updates)
+
+        store.bots_manager.handle_updates = handle_updates
+        await store.vk_api.connect(app)
+        try:
+            chat_id = scope_chat_id(1, 2000000005)
+            assert await store.vk_api.send_message(chat_id, "hi") == 7
+            assert requests[-1]["access_token"] == "second_token"
+            assert requests[-1]["peer_ids"] == "2000000005"
+
+            await store.vk_api.send_message(2000000005, "hi")
+            assert requests[-1]["access_token"] == "group_token"
+
+            group = store.vk_api.groups[1]
+            group.server = str(server.make_url("/poll"))
+            await store.vk_api.poll(group)
+            assert group.ts == 3
+            assert handled[0].object.message.peer_id == chat_id
+            assert handled[0].group_id == 2
+        finally:
+            await store.vk_api.disconnect(app)
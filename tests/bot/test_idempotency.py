@@ -0,0 +1,62 @@
+import time
+
+from app.store.vk_api.idempotency import RANDOM_ID_MASK, SendJournal, message_random_id
+
+
+class TestMessageRandomId:
+    def test_stable_and_distinct(self):
+        random_id = message_random_id(2000000001, 5, 1, "start_quiz")
+        assert random_id == message_random_id(2000000001, 5, 1, "start_quiz")
+        assert 0 < random_id <= RANDOM_ID_MASK
+        assert len({
+            random_id,
+            message_random_id(2000000002, 5, 1, "start_quiz"),
+            message_random_id(2000000001, 6, 1, "start_quiz"),
+            message_random_id(2000000001, 5, 2, "start_quiz"),
+            message_random_id(2000000001, 5, 1, "started"),
+        }) == 5
+
+
+class TestSendJournal:
+    def test_survives_reopening(self, tmp_path):
+        path = str(tmp_path / "journal")
+        journal = SendJournal(path, retention=60)
+        journal.open()
+        journal.record(2000000001, 42, 7)
+        journal.close()
+
+        journal = SendJournal(path, retention=60)
+        journal.open()
+        assert journal.get(2000000001, 42) == 7
+        assert journal.get(2000000002, 42) is None
+        journal.close()
+
+    def test_expired_and_torn_lines_are_dropped(self, tmp_path):
+        path = tmp_path / "journal"
+        path.write_text(f"1 10 3 {time.time() - 120:.0f}\n1 11 4 {time.time():.0f}\n1 12")
+        journal = SendJournal(str(path), retention=60)
+        journal.open()
+        journal.close()
+        assert journal.get(1, 10) is None
+        assert journal.get(1, 11) == 4
+        assert path.read_text().count("\n") == 1
+
+    def test_expired_entries_are_pruned_on_record(self, tmp_path, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(time, "time", lambda: now[0])
+        monkeypatch.setattr(SendJournal, "COMPACT_SLACK", 0)
+        path = tmp_path / "journal"
+        journal = SendJournal(str(path), retention=60)
+        journal.open()
+        for random_id in (10, 11, 12):
+            journal.record(1, random_id, random_id)
+        now[0] += 30
+        journal.record(1, 13, 13)
+        assert journal.get(1, 10) == 10
+        now[0] += 40
+        journal.record(1, 14, 14)
+        assert [journal.get(1, random_id) for random_id in (10, 13, 14)] == [None, 13, 14]
+        assert len(journal._sent) == 2
+        # rewritten with the live entries once most of its lines are dropped ones
+        assert path.read_text().count("\n") == 2
+        journal.close()
@@ -0,0 +1,31 @@
+import asyncio
+
+from app.store.bot.lobby import LobbyView
+
+
+class TestLobbyView:
+    async def test_edits_are_coalesced(self):
+        posted, edited = [], []
+
+        async def post(chat_id, players):
+            posted.append((chat_id, players))
+            return 77
+
+        async def edit(chat_id, conversation_message_id, players):
+            edited.append((chat_id, conversation_message_id, players))
+
+        lobby = LobbyView(post=post, edit=edit, interval=0.05)
+        await lobby.show(1, [10])
+        for player_id in range(11, 31):
+            await lobby.show(1, list(range(10, player_id + 1)))
+        await asyncio.sleep(0.1)
+        assert posted == [(1, [10])]
+        assert edited == [(1, 77, list(range(10, 31)))]
+
+        await lobby.show(1, [10, 11])
+        lobby.close(1)
+        await asyncio.sleep(0.1)
+        assert len(edited) == 1
+
+        await lobby.show(1, [10])
+        assert len(posted) == 2
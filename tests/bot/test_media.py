@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+
+from app.game_session.models import PlannedQuestion
+from app.quiz.models import Question, QuestionMedia
+from app.store import Store
+from app.store.media.accessor import MediaAccessor
+from app.store.vk_api.resilience import VkApiError
+from app.web.config import MediaConfig
+
+
+def planned(question: Question, media: QuestionMedia) -> PlannedQuestion:
+    return PlannedQuestion(question_id=question.id, title=question.title, points=1, answers=[],
+                           match_keys=frozenset(), media=media)
+
+
+class TestMedia:
+    async def test_uploaded_once(self, server, store: Store, question_1: Question, monkeypatch):
+        media = QuestionMedia(type="photo", url="https://example.com/q.png")
+        question = planned(question_1, media)
+
+        async def fetch(url):
+            await asyncio.sleep(0.01)
+            return b"png"
+
+        store.vk_api.upload_media.reset_mock(side_effect=True)
+        store.vk_api.upload_media.return_value = "photo-1_1_key"
+        monkeypatch.setattr(store.media, "_fetch", fetch)
+        await store.media.prefetch(2000000001, [question, question])
+        assert await store.media.attachment(2000000001, question) == "photo-1_1_key"
+        assert store.vk_api.upload_media.await_count == 1
+
+        # another process finds it in the database
+        other = MediaAccessor(server)
+        assert await other.attachment(2000000001, question) == "photo-1_1_key"
+        assert store.vk_api.upload_media.await_count == 1
+
+        store.vk_api.upload_media.return_value = "photo-1_2_key"
+        store.media.invalidate(2000000001, question.question_id)
+        assert await store.media.attachment(2000000001, question) == "photo-1_2_key"
+        assert store.vk_api.upload_media.await_count == 2
+
+    async def test_rejected_attachment_is_uploaded_again(self, store: Store, question_1: Question, monkeypatch):
+        question = planned(question_1, QuestionMedia(type="photo", url="https://example.com/q.png"))
+
+        async def fetch(url):
+            return b"png"
+
+        monkeypatch.setattr(store.media, "_fetch", fetch)
+        store.vk_api.upload_media.reset_mock(side_effect=True)
+        store.vk_api.upload_media.side_effect = ["photo-1_1_key", "photo-1_2_key"]
+        store.vk_api.send_message.reset_mock(side_effect=True)
+        store.vk_api.send_message.side_effect = [VkApiError("fatal", "invalid attachment", 100), 7]
+
+        assert await store.media.ask(2000000001, question, "Which city?") == 7
+        attachments = [call.kwargs["attachment"] for call in store.vk_api.send_message.await_args_list]
+        assert attachments == ["photo-1_1_key", "photo-1_2_key"]
+
+
+class TestFetch:
+    @pytest.fixture
+    async def media(self, aiohttp_server):
+        async def small(request):
+            return web.Response(body=b"png")
+
+        async def declared(request):
+            return web.Response(body=b"x" * 20)
+
+        async def chunked(request):
+            response = web.StreamResponse()
+            response.enable_chunked_encoding()
+            await response.prepare(request)
+            for _ in range(4):
+                await response.write(b"x" * 5)
+            return response
+
+        app = web.Application()
+        app.router.add_get("/small", small)
+        app.router.add_get("/declared", declared)
+        app.router.add_get("/chunked", chunked)
+        server = await aiohttp_server(app)
+        accessor = MediaAccessor(SimpleNamespace(config=SimpleNamespace(media=MediaConfig(max_size=10))))
+        return accessor, server
+
+    async def test_size_is_bounded(self, media):
+        accessor, server = media
+        assert await accessor._fetch(str(server.make_url("/small"))) == b"png"
+        for path in ("/declared", "/chunked"):
+            with pytest.raises(ValueError):
+                await accessor._fetch(str(server.make_url(path)))
@@ -0,0 +1,64 @@
+from sqlalchemy import select
+
+from app.outbox.models import OutboxMessage, OutboxModel
+from app.store import Store
+from app.store.vk_api.idempotency import message_random_id
+
+
+async def queued(db_session) -> list[tuple]:
+    async with db_session() as session:
+        rows = await session.execute(select(OutboxModel.chat_id, OutboxModel.message, OutboxModel.attempts)
+                                     .order_by(OutboxModel.id))
+    return [tuple(row) for row in rows]
+
+
+class TestOutbox:
+    async def test_messages_are_queued_with_the_session(self, store: Store, db_session):
+        await store.game_sessions.add_chat_to_db(1, messages=[OutboxMessage(1, "hello")])
+        game_session = await store.game_sessions.create_game_session(
+            1, 10, messages=[OutboxMessage(1, "started", template="started")])
+        assert await queued(db_session) == [(1, "hello", 0), (1, "started", 0)]
+
+        async with db_session() as session:
+            random_ids = (await session.execute(select(OutboxModel.random_id).order_by(OutboxModel.id))).scalars()
+            assert list(random_ids) == [None, message_random_id(1, game_session.id, 0, "started")]
+
+    async def test_delivered_in_order_and_deleted(self, store: Store, db_session):
+        store.vk_api.send_message.reset_mock(side_effect=True)
+        store.vk_api.send_message.return_value = 1
+        await store.outbox.enqueue([OutboxMessage(1, "a"), OutboxMessage(2, "b"), OutboxMessage(1, "c")])
+
+        assert await store.outbox.deliver() == 3
+        sent = [(call.kwargs["peer_id"], call.kwargs["message"], call.kwargs["random_id"])
+                for call in store.vk_api.send_message.await_args_list]
+        assert [item for item in sent if item[0] == 1] == [(1, "a", 1), (1, "c", 3)]
+        assert (2, "b", 2) in sent
+        assert await queued(db_session) == []
+
+    async def test_failed_message_stays_and_blocks_its_chat(self, store: Store, db_session, config, monkeypatch):
+        store.vk_api.send_message.reset_mock(side_effect=True)
+        store.vk_api.send_message.side_effect = lambda peer_id, **kwargs: None if peer_id == 1 else 1
+        await store.outbox.enqueue([OutboxMessage(1, "a"), OutboxMessage(1, "b"), OutboxMessage(2, "c")])
+
+        assert await store.outbox.deliver() == 2
+        assert await queued(db_session) == [(1, "a", 1), (1, "b", 0)]
+        # leased until the retry
+        assert await store.outbox.deliver() == 0
+
+        monkeypatch.setattr(config.outbox, "lease", 0)
+        store.vk_api.send_message.side_effect = None
+        store.vk_api.send_message.return_value = 1
+        assert await store.outbox.deliver(chat_id=1) == 2
+        assert await queued(db_session) == []
+
+    async def test_new_message_waits_behind_a_failed_one(self, store: Store, db_session):
+        store.vk_api.send_message.reset_mock(side_effect=True)
+        store.vk_api.send_message.return_value = None
+        await store.outbox.enqueue([OutboxMessage(1, "a")])
+        assert await store.outbox.deliver(chat_id=1) == 1
+
+        store.vk_api.send_message.return_value = 1
+        await store.outbox.enqueue([OutboxMessage(1, "b")])
+        assert await store.outbox.deliver(chat_id=1) == 0
+        assert [call.kwargs["message"] for call in store.vk_api.send_message.await_args_list] == ["a"]
+        assert await queued(db_session) == [(1, "a", 1), (1, "b", 0)]
@@ -0,0 +1,22 @@
+from app.store.bot.router import CommandRouter
+
+
+async def handler(chat_id, player_id, live):
+    return "ok"
+
+
+class TestCommandRouter:
+    def test_resolve(self):
+        router = CommandRouter(1)
+        start = router.add("start", "Старт", handler)
+        rating = router.add("rating", "Рейтинг", handler, prefix=True)
+
+        assert router.resolve("[club1|@bot] Старт") is start
+        assert router.resolve("[club1|Quiz bot],  старт ") is start
+        # single token without a mention
+        assert router.resolve("Старт") is start
+        assert router.resolve("[club2|@other] Старт") is None
+        assert router.resolve("Старт игры") is None
+        assert router.resolve("[club1|@bot] рейтинг   чата") is rating
+        assert router.resolve("Рейтинговый") is None
+        assert router.get("rating") is rating
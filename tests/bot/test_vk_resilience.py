@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+import app.store.vk_api.accessor as vk_accessor
+from app.store import BOT
+from app.store.vk_api.idempotency import SendJournal
+from app.store.vk_api.resilience import CircuitShed, VkApiError
+from tests.vk_simulator import VkSimulator
+
+
+@pytest.fixture
+async def vk(make_app, aiohttp_server, monkeypatch):
+    simulator = VkSimulator(slow=0.3)
+    server = await aiohttp_server(simulator.app)
+    monkeypatch.setattr(vk_accessor, "API_PATH", str(server.make_url("/method/")))
+
+    app = make_app(BOT, vk_client={"timeouts": {"default": 0.1, "a_check": 0.1}, "retries": 2,
+                                   "backoff_base": 0.001, "failure_threshold": 3, "reset_timeout": 0.2})
+
+    handled = []
+
+    async def handle_updates(updates):
+        handled.extend(updates)
+
+    app.store.bots_manager.handle_updates = handle_updates
+    await app.store.vk_api.connect(app)
+    simulator.handled = handled
+    simulator.vk_api = app.store.vk_api
+    yield simulator
+    await app.store.vk_api.disconnect(app)
+
+
+class TestVkResilience:
+    async def test_rate_limit_is_retried(self, vk):
+        vk.fail("messages.send", 6, 6)
+        assert await vk.vk_api.send_message(2000000001, "hi") == 1
+        assert vk.count("messages.send") == 3
+        assert len(vk.messages) == 1
+
+    async def test_retries_are_bounded(self, vk):
+        vk.fail("messages.send", "500", "500", "500", "500")
+        assert await vk.vk_api.send_message(2000000001, "hi") is None
+        assert vk.count("messages.send") == 3
+
+    async def test_fatal_and_flood_errors_are_not_retried(self, vk):
+        for code in (15, 9):
+            vk.fail("messages.edit", code)
+            with pytest.raises(VkApiError):
+                await vk.vk_api._request(vk_accessor.API_PATH, "messages.edit", {"peer_id": 1},
+                                         group=vk.vk_api.primary)
+        assert vk.count("messages.edit") == 2
+
+    async def test_lost_response_is_not_sent_twice(self, vk):
+        # VK got the message but the response came after the timeout, the retry carries the same random_id
+        vk.fail("messages.send", "lost")
+        assert await vk.vk_api.send_message(2000000001, "hi") == 1
+        assert vk.count("messages.send") == 2
+        assert len(vk.messages) == 1
+
+    async def test_user_name_falls_back(self, vk):
+        vk.fail("users.get", 5)
+        assert await vk.vk_api.get_user_name(7) == "id7"
+        assert await vk.vk_api.get_user_name(7) == "User7"
+
+    async def test_circuit_sheds_optional_sends(self, vk):
+        group = vk.vk_api.primary
+        vk.fail("messages.send", *["500"] * 3)
+        assert await vk.vk_api.send_message(2000000001, "hi") is None
+        assert group.breaker.is_open
+
+        calls = len(vk.calls)
+        assert await vk.vk_api.send_message(2000000001, "restart", optional=True) is None
+        with pytest.raises(CircuitShed):
+            await vk.vk_api._request(vk_accessor.API_PATH, "users.get", {"user_ids": "1"},
+                                     group=group, optional=True)
+        assert len(vk.calls) == calls
+
+        # required sends still go and close the circuit once VK answers
+        assert await vk.vk_api.send_message(2000000001, "hi") == 1
+        assert not group.breaker.is_open
+        assert await vk.vk_api.send_message(2000000001, "restart", optional=True) == 2
+
+    async def test_circuit_probe(self, vk):
+        group = vk.vk_api.primary
+        vk.fail("messages.send", *["500"] * 3)
+        await vk.vk_api.send_message(2000000001, "hi")
+        assert group.breaker.is_open
+        await asyncio.sleep(0.25)
+        assert await vk.vk_api.send_message(2000000001, "probe", optional=True) == 1
+        assert not group.breaker.is_open
+
+    async def test_poller_survives_failures(self, vk):
+        group = vk.vk_api.primary
+        vk.fail("groups.getLongPollServer", 10)
+        vk.fail("a_check", "500", "500", "500", "slow", "failed2")
+        vk.updates.append({"type": "message_new", "group_id": 1, "object": {"message": {
+            "id": 1, "from_id": 10, "peer_id": 2000000001, "text": "Старт"}}})
+        await vk.vk_api._start_group(group)
+        for _ in range(100):
+            if vk.handled:
+                break
+            await asyncio.sleep(0.05)
+        assert vk.handled[0].object.message.text == "Старт"
+        assert not group.poller.poll_task.done()
+        # once after the initial failure, then after the expired key
+        assert vk.count("groups.getLongPollServer") >= 3
+
+    async def test_journaled_message_is_not_sent_again(self, vk, tmp_path):
+        vk.vk_api.journal = SendJournal(str(tmp_path / "journal"), retention=60)
+        vk.vk_api.journal.open()
+        try:
+            assert await vk.vk_api.send_message(2000000001, "hi", random_id=42) == 1
+            assert vk.vk_api.journal.get(2000000001, 42) == 1
+            assert await vk.vk_api.send_message(2000000001, "hi", random_id=42) == 1
+            assert vk.count("messages.send") == 1
+
+            vk.fail("messages.send", 100)
+            assert await vk.vk_api.send_message(2000000001, "bye", random_id=43) is None
+            assert vk.vk_api.journal.get(2000000001, 43) is None
+        finally:
+            vk.vk_api.journal.close()
+
+
+class TestVkUploads:
+    async def test_photo_and_audio(self, vk):
+        assert await vk.vk_api.upload_media(2000000001, "photo", b"png", "q.png") == "photo-1_1_key"
+        assert await vk.vk_api.upload_media(2000000001, "audio", b"ogg", "q.ogg") == "doc-1_2_key"
+        assert vk.uploads == ["q.png", "q.ogg"]
+        # the saved photo description is passed back intact
+        assert vk.calls[1] == ("photos.saveMessagesPhoto", {
+            "server": "1", "photo": '[{"p":"x&y"}]', "hash": "h", "access_token": vk.vk_api.primary.config.token,
+            "v": "5.131"})
+
+    async def test_attachment_is_sent(self, vk):
+        assert await vk.vk_api.send_message(2000000001, "what & where?", attachment="photo-1_1_key") == 1
+        message = next(iter(vk.messages.values()))
+        assert (message["message"], message["attachment"]) == ("what & where?", "photo-1_1_key")
@@ -1,2 +1,3 @@
+from .apps import *
 from .common import *
 from .quiz import *
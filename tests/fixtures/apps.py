@@ -0,0 +1,39 @@
+import os
+from typing import Callable
+
+import pytest
+import yaml
+
+from app.store import setup_store
+from app.web.app import Application
+from app.web.config import setup_config
+from app.web.routes import setup_routes
+from app.web.startup import setup_startup
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config.yml")
+
+
+@pytest.fixture
+def make_app(tmp_path) -> Callable[..., Application]:
+    """
+    Builds an application of a role from tests/config.yml without starting it. Keyword arguments
+    are config sections merged into the ones of the file, e.g. bot={"groups": [...]}
+    """
+
+    def make(role: str, **sections: dict) -> Application:
+        with open(CONFIG_PATH) as f:
+            raw_config = yaml.safe_load(f)
+        for name, values in sections.items():
+            raw_config[name] = {**raw_config.get(name, {}), **values}
+        path = tmp_path / f"config_{role}.yml"
+        path.write_text(yaml.safe_dump(raw_config))
+
+        app = Application()
+        app.role = role
+        setup_config(app, str(path))
+        setup_startup(app)
+        setup_routes(app)
+        setup_store(app)
+        return app
+
+    return make
@@ -57,14 +57,16 @@ async def clear_db(server):
         session = AsyncSession(server.database._engine)
         connection = session.connection()
         for table in server.database._db.metadata.tables:
-            await session.execute(text(f"TRUNCATE {table} CASCADE"))
-            await session.execute(text(f"ALTER SEQUENCE {table}_id_seq RESTART WITH 1"))
+            await session.execute(text(f"TRUNCATE {table} RESTART IDENTITY CASCADE"))
 
         await session.commit()
         connection.close()
 
     except Exception as err:
         logging.warning(err)
+    server.store.leaderboard.invalidate()
+    # fixtures write to the tables directly, without bumping the version
+    server.store.read_cache.clear()
 
 
 @pytest.fixture
@@ -0,0 +1,30 @@
+from sqlalchemy import select
+
+from app.game_session.models import ArchivedGameSessionModel, GameSessionModel
+from app.store import Store
+
+
+class TestArchive:
+    async def test_ended_sessions_are_archived(self, store: Store, db_session, config, monkeypatch):
+        await store.game_sessions.add_chat_to_db(1)
+        game_session = await store.game_sessions.create_game_session(1, 10)
+        await store.game_sessions.add_player_to_game_session(10, game_session.id)
+        await store.game_sessions.add_player_to_game_session(20, game_session.id)
+        await store.game_sessions.award_points(game_session.id, 1, 20, 4)
+        await store.game_sessions.finish_game_session(game_session.id, 1)
+        running = await store.game_sessions.create_game_session(1, 10)
+
+        monkeypatch.setattr(config.archive, "min_age", 0)
+        assert await store.archive.archive_ended_sessions() == 1
+
+        async with db_session() as session:
+            hot_ids = (await session.execute(select(GameSessionModel.id))).scalars().all()
+            archived = (await session.execute(select(ArchivedGameSessionModel))).scalars().all()
+        assert hot_ids == [running.id]
+        assert [(a.id, a.chat_id, a.players) for a in archived] == [(game_session.id, 1, {"10": 0, "20": 4})]
+
+        history = await store.leaderboard.get_player_history(20)
+        assert [(g.session_id, g.points) for g in history] == [(game_session.id, 4)]
+
+    async def test_nothing_to_archive(self, store: Store):
+        assert await store.archive.archive_ended_sessions() == 0
@@ -0,0 +1,28 @@
+from app.game_session.fsm import FINAL_STATES, GAME_MACHINE, IDLE, STATES, fire_random_events
+from app.game_session.models import LiveSession, SessionStateModel
+
+
+class TestGameMachine:
+    def test_states_match_model(self):
+        assert set(STATES) - {IDLE} == set(SessionStateModel.states)
+
+    def test_random_event_streams(self):
+        for seed in range(20):
+            for game in fire_random_events(seed, games=50, events=5000):
+                reached_final = False
+                for before, event, after in game:
+                    assert after in STATES
+                    if reached_final:
+                        assert after == before
+                    if after != before:
+                        assert GAME_MACHINE.accepts(before, event)
+                    reached_final = reached_final or after in FINAL_STATES
+
+    def test_guards(self):
+        live = LiveSession(session_id=1, chat_id=1, creator=10, players={10: 0})
+        assert GAME_MACHINE.fire(live, "run", player_id=20).rejected == "not_creator_to_run"
+        assert GAME_MACHINE.fire(live, "run", player_id=10).rejected == "not_enough_players"
+        assert GAME_MACHINE.fire(live, "join", player_id=10).rejected == "player_already_added"
+        assert GAME_MACHINE.fire(live, "ask").rejected == GAME_MACHINE.unhandled
+        live.players[20] = 0
+        assert GAME_MACHINE.fire(live, "run", player_id=10).transition.target == "just_started"
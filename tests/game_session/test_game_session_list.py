@@ -0,0 +1,49 @@
+from app.store import Store
+
+
+class TestGameSessionListView:
+    async def test_unauthorized(self, cli):
+        resp = await cli.get("/game-session.list")
+        assert resp.status == 401
+
+    async def test_empty(self, authed_cli):
+        resp = await authed_cli.get("/game-session.list")
+        assert resp.status == 200
+        data = await resp.json()
+        assert data == {"status": "ok", "data": {"game_sessions": [], "next_after_id": None}}
+
+    async def test_keyset_pages(self, authed_cli, store: Store):
+        for chat_id in (1, 2, 3):
+            await store.game_sessions.add_chat_to_db(chat_id)
+            await store.game_sessions.create_game_session(chat_id, creator_id=chat_id + 100)
+
+        resp = await authed_cli.get("/game-session.list", params={"limit": 2})
+        data = (await resp.json())["data"]
+        assert [s["chat_id"] for s in data["game_sessions"]] == [3, 2]
+        assert data["game_sessions"][0]["state"] == "preparing"
+        assert data["game_sessions"][0]["players_count"] == 0
+
+        resp = await authed_cli.get("/game-session.list", params={"limit": 2, "after_id": data["next_after_id"]})
+        data = (await resp.json())["data"]
+        assert [s["chat_id"] for s in data["game_sessions"]] == [1]
+        assert data["next_after_id"] is None
+
+    async def test_filter_by_chat(self, authed_cli, store: Store):
+        for chat_id in (1, 2):
+            await store.game_sessions.add_chat_to_db(chat_id)
+            await store.game_sessions.create_game_session(chat_id, creator_id=100)
+
+        resp = await authed_cli.get("/game-session.list", params={"chat_id": 2})
+        data = (await resp.json())["data"]
+        assert [s["chat_id"] for s in data["game_sessions"]] == [2]
+
+    async def test_failed_query_is_an_error_response(self, authed_cli, store: Store, monkeypatch):
+        async def iter_game_sessions(**kwargs):
+            raise RuntimeError("connection lost")
+            yield
+
+        monkeypatch.setattr(store.game_sessions, "iter_game_sessions", iter_game_sessions)
+        resp = await authed_cli.get("/game-session.list")
+        assert resp.status == 500
+        data = await resp.json()
+        assert data["status"] == "internal server error"
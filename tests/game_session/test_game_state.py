@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.game_session.models import LiveSession, PlayersSessions, SessionStateModel
+from app.outbox.models import OutboxMessage, OutboxModel
+from app.store import Store
+from app.store.game_state.backends import KeyValueStateBackend
+from app.store.outbox.accessor import OutboxAccessor
+from app.store.vk_api.idempotency import message_random_id
+
+
+async def stored(db_session, session_id: int) -> tuple[str, list[tuple[str, int]]]:
+    """
+    :return: state name of the session and its outbox messages with their random_ids
+    """
+    async with db_session() as session:
+        state_name = (await session.execute(select(SessionStateModel.state_name)
+                                            .where(SessionStateModel.session_id == session_id))).scalar()
+        rows = (await session.execute(select(OutboxModel.message, OutboxModel.random_id)
+                                      .order_by(OutboxModel.id))).all()
+    return SessionStateModel.state_names[state_name], [tuple(row) for row in rows]
+
+
+async def fail_once(monkeypatch) -> None:
+    add = OutboxAccessor.__dict__["add"]
+
+    async def failing(session, messages):
+        monkeypatch.setattr(OutboxAccessor, "add", add)
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(OutboxAccessor, "add", staticmethod(failing))
+
+
+async def serve_kv(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, data: dict) -> None:
+    """
+    Redis-protocol stand-in knowing HSET, HSETNX, HINCRBY, HGETALL and DEL
+    """
+    while line := await reader.readline():
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        command, key = args[0].upper(), args[1]
+        fields = data.setdefault(key, {}) if command.startswith(b"H") else None
+        if command == b"HSET":
+            fields.update(zip(args[2::2], args[3::2]))
+            writer.write(b":%d\r\n" % (len(args) // 2 - 1))
+        elif command == b"HSETNX":
+            added = args[2] not in fields
+            fields.setdefault(args[2], args[3])
+            writer.write(b":%d\r\n" % added)
+        elif command == b"HINCRBY":
+            fields[args[2]] = b"%d" % (int(fields.get(args[2], 0)) + int(args[3]))
+            writer.write(b":%s\r\n" % fields[args[2]])
+        elif command == b"HGETALL":
+            items = [item for pair in fields.items() for item in pair]
+            writer.write(b"*%d\r\n" % len(items) + b"".join(b"$%d\r\n%s\r\n" % (len(item), item) for item in items))
+        else:
+            writer.write(b":%d\r\n" % int(data.pop(key, None) is not None))
+        await writer.drain()
+    writer.close()
+
+
+class TestGameState:
+    async def test_memory_backend_writes_behind(self, server, store: Store, db_session, config):
+        config.state.backend = "memory"
+        await store.game_state.connect(server)
+        try:
+            await store.game_sessions.add_chat_to_db(1)
+            live = await store.game_state.start(1, 10)
+            assert await store.game_state.join(live, 20)
+            assert not await store.game_state.join(live, 20)
+            await store.game_state.award(live, 20, 3)
+            assert (await store.game_state.get(1)).players == {10: 0, 20: 3}
+
+            await store.write_behind.flush()
+            async with db_session() as session:
+                rows = (await session.execute(select(PlayersSessions.player_id, PlayersSessions.points)
+                                              .order_by(PlayersSessions.player_id))).all()
+            assert [tuple(row) for row in rows] == [(10, 0), (20, 3)]
+
+            assert await store.game_state.finish(live) == [20]
+            assert await store.game_state.get(1) is None
+        finally:
+            await store.game_state.disconnect(server)
+            config.state.backend = "postgres"
+
+    async def test_announce_is_flushed_with_the_state(self, server, store: Store, db_session, config,
+                                                      monkeypatch):
+        monkeypatch.setattr(config.state, "backend", "memory")
+        await store.game_state.connect(server)
+        try:
+            await store.game_sessions.add_chat_to_db(1)
+            live = await store.game_state.start(1, 10)
+            await store.game_state.join(live, 20)
+
+            await fail_once(monkeypatch)
+            with pytest.raises(RuntimeError):
+                await store.game_state.fire(live, "run", announce=[OutboxMessage(1, "go", template="start_quiz")],
+                                            player_id=10)
+            assert await stored(db_session, live.session_id) == ("preparing", [])
+
+            # the failed flush kept the state and the message buffered together
+            await store.write_behind.flush()
+            random_id = message_random_id(1, live.session_id, live.sequence, "start_quiz")
+            assert await stored(db_session, live.session_id) == ("just_started", [("go", random_id)])
+        finally:
+            await store.game_state.disconnect(server)
+
+    async def test_announce_is_written_with_the_state(self, server, store: Store, db_session, config,
+                                                      monkeypatch):
+        monkeypatch.setattr(config.state, "backend", "postgres")
+        await store.game_state.connect(server)
+        try:
+            await store.game_sessions.add_chat_to_db(1)
+            live = await store.game_state.start(1, 10)
+            await store.game_state.join(live, 20)
+            announce = [OutboxMessage(1, "go", template="start_quiz")]
+
+            await fail_once(monkeypatch)
+            with pytest.raises(RuntimeError):
+                await store.game_state.fire(live, "run", announce=announce, player_id=10)
+            assert await stored(db_session, live.session_id) == ("preparing", [])
+            assert (live.state, live.sequence) == ("preparing", 0)
+
+            # the handler's retry writes both
+            assert (await store.game_state.fire(live, "run", announce=announce, player_id=10)).changed
+            random_id = message_random_id(1, live.session_id, 1, "start_quiz")
+            assert await stored(db_session, live.session_id) == ("just_started", [("go", random_id)])
+        finally:
+            await store.game_state.disconnect(server)
+
+    async def test_kv_backend(self):
+        data = {}
+        kv_server = await asyncio.start_server(lambda r, w: serve_kv(r, w, data), "127.0.0.1", 0)
+        port = kv_server.sockets[0].getsockname()[1]
+        backend = KeyValueStateBackend("127.0.0.1", port)
+        await backend.connect()
+        try:
+            live = LiveSession(session_id=5, chat_id=1, creator=10, players={10: 0, 20: 2})
+            await backend.put(live)
+            assert await backend.get(1) == live
+
+            # two handlers holding copies of the same session
+            first, second = await backend.get(1), await backend.get(1)
+            assert await backend.add_player(first, 30)
+            assert not await backend.add_player(second, 30)
+            await backend.add_points(first, 20, 1)
+            await backend.add_points(second, 20, 2)
+            second.state = "just_started"
+            await backend.put(second)
+            assert await backend.get(1) == LiveSession(session_id=5, chat_id=1, creator=10, state="just_started",
+                                                       players={10: 0, 20: 5, 30: 0})
+            await backend.delete(1)
+            assert await backend.get(1) is None
+        finally:
+            await backend.disconnect()
+            kv_server.close()
@@ -0,0 +1,42 @@
+from sqlalchemy import select
+
+from app.game_session.models import SessionsQuestions
+from app.quiz.models import AnswerModel, QuestionModel, ThemeModel
+from app.store import Store
+
+
+class TestQuestionPlan:
+    async def test_plan_is_stored_and_restored(self, store: Store, db_session, config, monkeypatch):
+        async with db_session.begin() as session:
+            theme = ThemeModel(title="space")
+            session.add(theme)
+            await session.flush()
+            session.add_all([
+                QuestionModel(title=f"question {i}", theme_id=theme.id, points=i + 1, answers=[
+                    AnswerModel(title="Ёлка, ", is_correct=True),
+                    AnswerModel(title="sun", is_correct=False),
+                ])
+                for i in range(3)
+            ])
+        await store.game_sessions.add_chat_to_db(1)
+        game_session = await store.game_sessions.create_game_session(1, 10)
+
+        monkeypatch.setattr(config.game, "questions_per_game", 2)
+        plan = await store.game_sessions.add_questions_to_session(game_session.id)
+        assert len(plan.questions) == 2
+        assert plan.questions[0].match_keys == frozenset({"елка"})
+
+        first = await store.game_sessions.next_question(game_session.id)
+        assert first is plan.questions[0]
+
+        async with db_session() as session:
+            rows = (await session.execute(
+                select(SessionsQuestions).order_by(SessionsQuestions.ordinal)
+            )).scalars().all()
+        assert [(r.question_id, r.ordinal) for r in rows] == [(q.question_id, i) for i, q in enumerate(plan.questions)]
+
+        store.game_sessions._plans.clear()
+        restored = await store.game_sessions.get_question_plan(game_session.id)
+        assert [q.question_id for q in restored.questions] == [q.question_id for q in plan.questions]
+        assert restored.current is None
+        assert (await store.game_sessions.next_question(game_session.id)).question_id == first.question_id
@@ -0,0 +1,52 @@
+from sqlalchemy import delete, select
+
+from app.game_session.models import GameSessionModel, PlayersSessions, SessionStateModel
+from app.outbox.models import OutboxMessage, OutboxModel
+from app.store import Store
+
+
+class TestWriteBehind:
+    async def test_events_are_coalesced(self, store: Store, db_session):
+        await store.game_sessions.add_chat_to_db(1)
+        game_session = await store.game_sessions.create_game_session(1, 10)
+        store.write_behind.add_player(game_session.id, 1, 10)
+        store.write_behind.add_player(game_session.id, 1, 20)
+        for _ in range(3):
+            store.write_behind.add_points(game_session.id, 1, 20, 2)
+        store.write_behind.set_state(game_session.id, "question_asked")
+        assert store.write_behind.pending == 6
+
+        assert await store.write_behind.flush() == 6
+        assert store.write_behind.pending == 0
+        assert await store.write_behind.flush() == 0
+
+        async with db_session() as session:
+            points = (await session.execute(
+                select(PlayersSessions.player_id, PlayersSessions.points).order_by(PlayersSessions.player_id)
+            )).all()
+            state = await session.get(SessionStateModel, game_session.id)
+        assert [tuple(row) for row in points] == [(10, 0), (20, 6)]
+        assert state.state_name == SessionStateModel.states["question_asked"]
+
+        stats = await store.leaderboard.get_player_stats(20, chat_id=1)
+        assert stats.points == 6
+
+    async def test_rows_of_deleted_session_do_not_drop_the_batch(self, store: Store, db_session):
+        await store.game_sessions.add_chat_to_db(1)
+        await store.game_sessions.add_chat_to_db(2)
+        deleted = await store.game_sessions.create_game_session(1, 10)
+        kept = await store.game_sessions.create_game_session(2, 20)
+        async with db_session() as session:
+            async with session.begin():
+                await session.execute(delete(GameSessionModel).where(GameSessionModel.id == deleted.id))
+
+        store.write_behind.add_points(deleted.id, 1, 10, 3)
+        store.write_behind.add_points(kept.id, 2, 20, 5)
+        store.write_behind.add_message(OutboxMessage(1, "still delivered"))
+        assert await store.write_behind.flush() == 2
+
+        async with db_session() as session:
+            points = (await session.execute(select(PlayersSessions.session_id, PlayersSessions.points))).all()
+            messages = (await session.execute(select(OutboxModel.message))).scalars().all()
+        assert [tuple(row) for row in points] == [(kept.id, 5)]
+        assert messages == ["still delivered"]
@@ -0,0 +1,57 @@
+from app.store import Store
+from app.store.leaderboard.accessor import LeaderboardAccessor
+
+
+async def start_game(store: Store, chat_id: int, players: list[int]) -> int:
+    await store.game_sessions.add_chat_to_db(chat_id)
+    game_session = await store.game_sessions.create_game_session(chat_id, players[0])
+    for player_id in players:
+        await store.game_sessions.add_player_to_game_session(player_id, game_session.id)
+    return game_session.id
+
+
+class TestLeaderboardStore:
+    async def test_award_and_finish(self, store: Store):
+        session_id = await start_game(store, 1, [10, 20])
+        await store.game_sessions.award_points(session_id, 1, 10, 5)
+        await store.game_sessions.award_points(session_id, 1, 20, 3)
+        winners = await store.game_sessions.finish_game_session(session_id, 1)
+        assert winners == [10]
+
+        top = await store.leaderboard.get_top(chat_id=1)
+        assert [(s.player_id, s.games, s.wins, s.points) for s in top] == [(10, 1, 1, 5), (20, 1, 0, 3)]
+        assert await store.leaderboard.get_top() == [
+            s.__class__(chat_id=0, player_id=s.player_id, games=s.games, wins=s.wins, points=s.points) for s in top
+        ]
+
+    async def test_cache_is_patched(self, store: Store):
+        session_id = await start_game(store, 2, [30, 40])
+        assert await store.leaderboard.get_top(chat_id=2) == []
+        await store.game_sessions.award_points(session_id, 2, 40, 7)
+        top = await store.leaderboard.get_top(chat_id=2)
+        assert [(s.player_id, s.points) for s in top] == [(40, 7)]
+
+    async def test_cache_expires(self, store: Store, db_session, monkeypatch):
+        await start_game(store, 3, [50])
+        assert await store.leaderboard.get_top(chat_id=3) == []
+        # points awarded by another bot process never patch this one's cache
+        async with db_session() as session:
+            async with session.begin():
+                await store.leaderboard.add_to_stats(session, 3, [(50, 0, 0, 2)])
+        assert await store.leaderboard.get_top(chat_id=3) == []
+
+        monkeypatch.setattr(LeaderboardAccessor, "TOP_TTL", 0)
+        top = await store.leaderboard.get_top(chat_id=3)
+        assert [(s.player_id, s.points) for s in top] == [(50, 2)]
+
+
+class TestLeaderboardView:
+    async def test_unauthorized(self, cli):
+        resp = await cli.get("/leaderboard.get")
+        assert resp.status == 401
+
+    async def test_empty(self, authed_cli):
+        resp = await authed_cli.get("/leaderboard.get", params={"chat_id": 100})
+        assert resp.status == 200
+        data = await resp.json()
+        assert data == {"status": "ok", "data": {"chat_id": 100, "players": []}}
@@ -63,3 +63,16 @@ class TestAdminLoginView:
         assert resp.status == 405
         data = await resp.json()
         assert data["status"] == "not_implemented"
+
+
+class TestAdminCurrentView:
+    async def test_unauthorized(self, cli):
+        resp = await cli.get("/admin.current")
+        assert resp.status == 401
+
+    async def test_success_repeated(self, authed_cli, config):
+        for _ in range(2):
+            resp = await authed_cli.get("/admin.current")
+            assert resp.status == 200
+            data = await resp.json()
+            assert data == ok_response({"id": 1, "email": config.admin.email})
@@ -0,0 +1,41 @@
+from app.store import Store
+from app.store.metrics.registry import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    def test_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("updates_total", "Updates", ("type",))
+        counter.inc(type="message_new")
+        counter.inc(2, type="message_new")
+        assert 'updates_total{type="message_new"} 3.0' in registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", ("method",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, method="users.get")
+        histogram.observe(0.5, method="users.get")
+        histogram.observe(5, method="users.get")
+        rendered = registry.render()
+        assert 'latency_seconds_bucket{method="users.get",le="0.1"} 1' in rendered
+        assert 'latency_seconds_bucket{method="users.get",le="1.0"} 2' in rendered
+        assert 'latency_seconds_bucket{method="users.get",le="+Inf"} 3' in rendered
+        assert 'latency_seconds_count{method="users.get"} 3' in rendered
+
+
+class TestMetricsView:
+    async def test_disabled(self, cli, store: Store):
+        assert store.metrics.enabled is False
+        resp = await cli.get("/metrics")
+        assert resp.status == 404
+
+    async def test_enabled(self, cli, store: Store):
+        store.metrics.enabled = True
+        try:
+            resp = await cli.get("/metrics")
+        finally:
+            store.metrics.enabled = False
+        assert resp.status == 200
+        text = await resp.text()
+        assert "# TYPE game_sessions_active gauge" in text
+        assert "game_sessions_active 0.0" in text
@@ -0,0 +1,55 @@
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from app.quiz.models import Answer
+from app.store import Store
+from app.web.utils import cached_json_response
+
+
+class TestCachedJsonResponse:
+    @pytest.mark.parametrize("if_none_match, status", [
+        (None, 200), ('"2-ab"', 304), ('W/"2-ab"', 304), ('"1-ff", "2-ab"', 304), ("*", 304), ('"1-ff"', 200),
+    ])
+    def test_if_none_match(self, if_none_match, status):
+        headers = {"If-None-Match": if_none_match} if if_none_match else {}
+        response = cached_json_response(make_mocked_request("GET", "/", headers=headers), b"{}", '"2-ab"')
+        assert response.status == status
+        assert response.headers["ETag"] == '"2-ab"'
+
+
+class TestReadCache:
+    async def test_themes_are_served_from_cache(self, authed_cli, store: Store):
+        await store.quizzes.create_theme(title="backend")
+        resp = await authed_cli.get("/quiz.list_themes")
+        assert resp.status == 200
+        etag = resp.headers["ETag"]
+
+        resp = await authed_cli.get("/quiz.list_themes", headers={"If-None-Match": etag})
+        assert resp.status == 304
+
+        await store.quizzes.create_theme(title="frontend")
+        resp = await authed_cli.get("/quiz.list_themes", headers={"If-None-Match": etag})
+        assert resp.status == 200
+        assert resp.headers["ETag"] != etag
+        data = await resp.json()
+        assert [theme["title"] for theme in data["data"]["themes"]] == ["backend", "frontend"]
+
+    async def test_questions_are_served_from_cache(self, authed_cli, store: Store):
+        theme = await store.quizzes.create_theme(title="backend")
+        answers = [Answer(title="yes", is_correct=True), Answer(title="no", is_correct=False)]
+        await store.quizzes.create_question("Is HTTP stateless?", theme.id, 1, answers)
+        params = {"id": theme.id}
+        resp = await authed_cli.get("/quiz.list_questions", params=params)
+        assert resp.status == 200
+        etag = resp.headers["ETag"]
+
+        resp = await authed_cli.get("/quiz.list_questions", params=params, headers={"If-None-Match": etag})
+        assert resp.status == 304
+
+        await store.quizzes.create_question("Is UDP reliable?", theme.id, 1, answers)
+        resp = await authed_cli.get("/quiz.list_questions", params=params, headers={"If-None-Match": etag})
+        assert resp.status == 200
+        assert resp.headers["ETag"] != etag
+        data = await resp.json()
+        titles = {question["title"] for question in data["data"]["questions"]}
+        assert titles == {"Is HTTP stateless?", "Is UDP reliable?"}
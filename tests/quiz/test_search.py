@@ -0,0 +1,59 @@
+from app.quiz.models import Question, SearchHit, Theme
+from app.store.search.backends import MemorySearchBackend, similarity, trigrams
+
+
+def memory_backend(titles: list[str]) -> MemorySearchBackend:
+    backend = MemorySearchBackend(app=None)
+    backend._loaded = True
+    for id, title in enumerate(titles, start=1):
+        backend.add("questions", SearchHit(id=id, title=title, score=0.0, theme_id=id % 2))
+    return backend
+
+
+class TestTrigrams:
+    def test_same_as_pg_trgm(self):
+        assert similarity(trigrams("word"), trigrams("two words")) == 4 / 11
+        assert trigrams("Cat!") == {"  c", " ca", "cat", "at "}
+
+
+class TestMemorySearch:
+    async def test_ranked_and_paginated(self):
+        backend = memory_backend(["Capital of France", "Capital of Italy", "Largest ocean", "capital"])
+        hits = await backend.search("questions", "capital", None, limit=2, offset=0)
+        # the shorter title is more similar
+        assert [hit.id for hit in hits] == [4, 2]
+        hits = await backend.search("questions", "capital", None, limit=2, offset=2)
+        assert [hit.id for hit in hits] == [1]
+        hits = await backend.search("questions", "capital", 0, limit=10, offset=0)
+        assert [hit.id for hit in hits] == [4, 2]
+
+    async def test_words_match_in_any_order(self):
+        backend = memory_backend(["Which ocean is the largest on Earth?"])
+        assert [hit.id for hit in await backend.search("questions", "earth ocean", None, 10, 0)] == [1]
+
+    async def test_near_duplicates(self):
+        backend = memory_backend(["How many legs does an octopus have?", "How many hearts does an octopus have?"])
+        duplicates = await backend.similar("how many legs does the octopus have", 0.6, 5)
+        assert [hit.id for hit in duplicates] == [1]
+        assert await backend.similar("Largest ocean", 0.6, 5) == []
+
+
+class TestSearchView:
+    async def test_unauthorized(self, cli):
+        resp = await cli.get("/quiz.search", params={"q": "how"})
+        assert resp.status == 401
+
+    async def test_near_duplicate_is_reported(self, authed_cli, question_1: Question, theme_1: Theme):
+        question = {
+            "title": question_1.title.rstrip("?") + "!",
+            "theme_id": theme_1.id,
+            "points": 1,
+            "answers": [{"title": "good", "is_correct": True}, {"title": "bad", "is_correct": False}],
+        }
+        resp = await authed_cli.post("/quiz.add_question", json=question)
+        assert resp.status == 409
+        data = await resp.json()
+        assert [hit["id"] for hit in data["data"]["duplicates"]] == [question_1.id]
+
+        resp = await authed_cli.post("/quiz.add_question", json={**question, "force": True})
+        assert resp.status == 200
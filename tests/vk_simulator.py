@@ -0,0 +1,103 @@
+import asyncio
+from collections import defaultdict
+from typing import Union
+
+from aiohttp import web
+
+# fault: VK error code, "500" for an HTTP error, "slow" to answer after the client timed out,
+# "lost" to apply the call and answer too late, as when a response is lost on the way back
+Fault = Union[int, str]
+
+
+class VkSimulator:
+    """
+    Local stand-in for VK API and the long poll server with fault injection.
+    Faults queued for a method are consumed by its next calls, one per call.
+    Sent messages are deduplicated by random_id like VK does.
+    """
+
+    def __init__(self, slow: float = 0.5):
+        self.slow = slow
+        self.faults: dict[str, list[Fault]] = defaultdict(list)
+        self.calls: list[tuple[str, dict]] = []
+        self.messages: dict[tuple[str, str], dict] = {}
+        self.updates: list[dict] = []
+        # uploaded file names
+        self.uploads: list[str] = []
+        self.ts = 1
+        self.app = web.Application()
+        self.app.router.add_get("/method/{name}", self.method)
+        self.app.router.add_get("/poll", self.poll)
+        self.app.router.add_post("/upload", self.upload)
+
+    def fail(self, method: str, *faults: Fault) -> None:
+        self.faults[method].extend(faults)
+
+    def count(self, method: str) -> int:
+        return sum(1 for name, _ in self.calls if name == method)
+
+    async def _fault(self, method: str):
+        if not self.faults[method]:
+            return None
+        fault = self.faults[method].pop(0)
+        if fault == "500":
+            return web.Response(status=502, text="bad gateway")
+        if fault == "slow":
+            await asyncio.sleep(self.slow)
+            return None
+        if isinstance(fault, int):
+            return web.json_response({"error": {"error_code": fault, "error_msg": f"simulated {fault}"}})
+        return fault
+
+    async def method(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        query = dict(request.query)
+        self.calls.append((name, query))
+        fault = await self._fault(name)
+        if isinstance(fault, web.Response):
+            return fault
+
+        if name == "messages.send":
+            key = (query["peer_ids"], query["random_id"])
+            message = self.messages.setdefault(key, {**query, "conversation_message_id": len(self.messages) + 1})
+            response = {"response": [{"peer_id": int(query["peer_ids"]),
+                                      "conversation_message_id": message["conversation_message_id"]}]}
+        elif name == "users.get":
+            response = {"response": [{"id": int(id), "first_name": f"User{id}"}
+                                     for id in query["user_ids"].split(",")]}
+        elif name in ("photos.getMessagesUploadServer", "docs.getMessagesUploadServer"):
+            response = {"response": {"upload_url": str(request.url.with_path("/upload").with_query({}))}}
+        elif name == "photos.saveMessagesPhoto":
+            response = {"response": [{"owner_id": -1, "id": int(query["server"]), "access_key": "key"}]}
+        elif name == "docs.save":
+            response = {"response": {"type": "audio_message",
+                                     "audio_message": {"owner_id": -1, "id": int(query["file"]), "access_key": "key"}}}
+        elif name == "groups.getLongPollServer":
+            server = str(request.url.with_path("/poll").with_query({}))
+            response = {"response": {"key": "key", "server": server, "ts": self.ts}}
+        else:
+            response = {"response": 1}
+        if fault == "lost":
+            await asyncio.sleep(self.slow)
+        return web.json_response(response)
+
+    async def upload(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        field = "photo" if "photo" in form else "file"
+        self.uploads.append(form[field].filename)
+        if field == "photo":
+            return web.json_response({"server": len(self.uploads), "photo": '[{"p":"x&y"}]', "hash": "h"})
+        return web.json_response({"file": str(len(self.uploads))})
+
+    async def poll(self, request: web.Request) -> web.Response:
+        self.calls.append(("a_check", dict(request.query)))
+        fault = await self._fault("a_check")
+        if isinstance(fault, web.Response):
+            return fault
+        if isinstance(fault, str) and fault.startswith("failed"):
+            return web.json_response({"failed": int(fault[-1]), "ts": self.ts})
+        updates, self.updates = self.updates, []
+        self.ts += len(updates)
+        if not updates:
+            await asyncio.sleep(0.01)
+        return web.json_response({"ts": self.ts, "updates": updates})
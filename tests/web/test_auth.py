@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+from aiohttp import web
+from aiohttp_session import new_session, setup as session_setup
+from aiohttp_session.cookie_storage import EncryptedCookieStorage
+from cryptography import fernet
+
+import app.web.middlewares as middlewares
+from app.admin.models import Admin
+from app.web import codec
+from app.web.app import Application
+from app.web.auth import VerifiedSessionCache, _b64decode, _b64encode, sign_token, verify_token
+from app.web.config import SessionConfig
+
+KEY = "secret"
+ADMIN = Admin(id=1, email="admin@admin.com")
+
+
+class TestToken:
+    def test_issued_token_is_verified(self):
+        token = sign_token(ADMIN, KEY, ttl=60)
+        assert verify_token(token, KEY) == ADMIN
+
+    def test_expired(self):
+        assert verify_token(sign_token(ADMIN, KEY, ttl=-1), KEY) is None
+
+    def test_tampered(self):
+        payload, signature = sign_token(ADMIN, KEY, ttl=60).split(".")
+        forged = _b64encode(codec.dumps_bytes({**codec.loads(_b64decode(payload)), "id": 2}))
+        assert verify_token(f"{forged}.{signature}", KEY) is None
+        assert verify_token(f"{payload}.{signature}", "other key") is None
+        for token in ("", "garbage", f"{payload}.{signature}.x", f"{payload}.!!"):
+            assert verify_token(token, KEY) is None
+
+
+class TestVerifiedSessionCache:
+    def test_expired_and_evicted(self):
+        cache = VerifiedSessionCache(size=2, ttl=60)
+        cache.put("a", ADMIN)
+        cache.put("b", Admin(id=2, email="b@admin.com"))
+        assert cache.get("a") == ADMIN
+        # "b" is the least recently used one
+        cache.put("c", Admin(id=3, email="c@admin.com"))
+        assert cache.get("b") is None
+        assert cache.get("a") == ADMIN
+
+        cache = VerifiedSessionCache(size=2, ttl=-1)
+        cache.put("a", ADMIN)
+        assert cache.get("a") is None
+
+    async def test_cookie_is_decrypted_once(self, aiohttp_client, monkeypatch):
+        key = fernet.Fernet.generate_key().decode()
+        app = Application()
+        app.config = SimpleNamespace(session=SessionConfig(key=key))
+        session_setup(app, EncryptedCookieStorage(key))
+        app.middlewares.append(middlewares.make_auth_middleware(app))
+
+        async def login(request):
+            session = await new_session(request)
+            session["admin"] = {"id": ADMIN.id, "email": ADMIN.email}
+            return web.Response()
+
+        async def current(request):
+            admin = getattr(request, "admin", None)
+            return web.json_response({"email": admin.email if admin else None})
+
+        app.router.add_post("/login", login)
+        app.router.add_get("/current", current)
+        decrypted = []
+        original = middlewares.get_session
+
+        async def get_session(request):
+            decrypted.append(request.path)
+            return await original(request)
+
+        monkeypatch.setattr(middlewares, "get_session", get_session)
+        client = await aiohttp_client(app)
+        await client.post("/login")
+
+        for _ in range(3):
+            resp = await client.get("/current")
+            assert await resp.json() == {"email": ADMIN.email}
+        assert decrypted == ["/current"]
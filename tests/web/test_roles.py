@@ -0,0 +1,29 @@
+import pytest
+
+from app.store import API, BOT
+from app.web.app import Application
+
+
+def paths(app: Application) -> set[str]:
+    return {resource.canonical for resource in app.router.resources()}
+
+
+class TestRoles:
+    def test_api(self, make_app):
+        app = make_app(API)
+        assert {"/admin.login", "/quiz.add_question", "/metrics"} <= paths(app)
+        assert "archive" in vars(app.store)
+        assert app.store.quizzes is app.store.quizzes
+        with pytest.raises(AttributeError, match="not wired in the api role"):
+            app.store.vk_api
+        assert not hasattr(app.store, "bots_manager")
+
+    def test_bot(self, make_app):
+        app = make_app(BOT)
+        assert "/admin.login" not in paths(app)
+        assert {"/metrics", "/profiler.stats"} <= paths(app)
+        assert {"vk_api", "bots_manager", "game_state", "write_behind"} <= set(vars(app.store))
+        with pytest.raises(AttributeError):
+            app.store.admins
+        with pytest.raises(AttributeError):
+            app.store.quizzes
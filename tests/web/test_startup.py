@@ -0,0 +1,47 @@
+import asyncio
+
+from app.web.startup import StartupPipeline
+
+
+class TestStartupPipeline:
+    async def test_phases(self):
+        pipeline = StartupPipeline()
+        calls = []
+
+        def hook(name, delay=0.05, fail=False):
+            async def run(app):
+                calls.append(f"{name} started")
+                await asyncio.sleep(delay)
+                if fail:
+                    raise RuntimeError(name)
+                calls.append(f"{name} done")
+            return run
+
+        pipeline.add(hook("db"), phase="database")
+        pipeline.add(hook("a"))
+        pipeline.add(hook("b"))
+        pipeline.defer(hook("late"))
+        pipeline.defer(hook("broken", fail=True))
+
+        await pipeline.run(None)
+        # accessors run concurrently after the database, deferred hooks have not run yet
+        assert calls == ["db started", "db done", "a started", "b started", "a done", "b done"]
+        assert pipeline.timings["accessors"] < 0.09
+
+        await pipeline.wait_deferred()
+        assert calls[-3:] == ["late started", "broken started", "late done"]
+        assert set(pipeline.timings) == {"database", "accessors", "critical", "deferred"}
+
+    async def test_stop_cancels_deferred(self):
+        pipeline = StartupPipeline()
+        finished = []
+
+        async def slow(app):
+            await asyncio.sleep(10)
+            finished.append(True)
+
+        pipeline.defer(slow)
+        await pipeline.run(None)
+        await asyncio.sleep(0)
+        await pipeline.stop(None)
+        assert not finished